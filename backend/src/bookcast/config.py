@@ -1,3 +1,4 @@
+import json
 import os
 
 from dotenv import load_dotenv
@@ -17,8 +18,71 @@ GOOGLE_CLOUD_PROJECT = os.getenv("GOOGLE_CLOUD_PROJECT")
 CLOUD_RUN_SERVICE_URL = os.getenv("CLOUD_RUN_SERVICE_URL")
 BOOKCAST_WORKER_QUEUE = "bookcast-worker"
 BOOKCAST_TTS_WORKER_QUEUE = "bookcast-tts-worker"
+
+# "cloud_tasks" or "local"
+TASK_DISPATCHER_BACKEND = os.getenv("TASK_DISPATCHER_BACKEND") or "cloud_tasks"
+LOCAL_TASK_DB_PATH = os.getenv("LOCAL_TASK_DB_PATH") or "downloads/tasks.sqlite3"
+LOCAL_TASK_CONCURRENCY = int(os.getenv("LOCAL_TASK_CONCURRENCY") or "4")
+
+# ワーカーが心拍を止めてからこの秒数が経つと、処理中の章は回収される
+STAGE_LEASE_SECONDS = int(os.getenv("STAGE_LEASE_SECONDS") or "600")
+STAGE_HEARTBEAT_SECONDS = int(os.getenv("STAGE_HEARTBEAT_SECONDS") or "60")
+LEASE_SWEEP_INTERVAL_SECONDS = int(os.getenv("LEASE_SWEEP_INTERVAL_SECONDS") or "300")
+# リースが切れて再実行した回数がこれに達した章は、再実行せずに失敗とする
+STAGE_MAX_ATTEMPTS = int(os.getenv("STAGE_MAX_ATTEMPTS") or "3")
+
+# OCRで描画済みのページを溜めておく数と、ページを処理するワーカー数
+OCR_PAGE_QUEUE_SIZE = int(os.getenv("OCR_PAGE_QUEUE_SIZE") or "4")
+OCR_PAGE_WORKERS = int(os.getenv("OCR_PAGE_WORKERS") or "32")
+# 1回のOCRリクエストにまとめるページ数。1にするとページごとにリクエストする
+OCR_BATCH_SIZE = int(os.getenv("OCR_BATCH_SIZE") or "4")
+# まとめるページが揃うのを待つ秒数。過ぎたら揃ったページだけで処理する
+OCR_BATCH_WAIT_SECONDS = float(os.getenv("OCR_BATCH_WAIT_SECONDS") or "0.05")
+# PDFの描画とPNGエンコードを行うプロセス数。Cloud RunのvCPU数に合わせる
+RENDER_PROCESS_WORKERS = int(os.getenv("RENDER_PROCESS_WORKERS") or "2")
+# PDFのテキストレイヤーをOCRの代わりに使う品質スコアの下限。1より大きくすると常にOCRする
+TEXT_LAYER_MIN_QUALITY = float(os.getenv("TEXT_LAYER_MIN_QUALITY") or "0.95")
+# 目次を探すときに一度に判定するページ数と、目次が見つからない場合に諦めるページ、目次が続く場合の上限
+TOC_SCAN_WINDOW = int(os.getenv("TOC_SCAN_WINDOW") or "4")
+TOC_SCAN_PAGES = int(os.getenv("TOC_SCAN_PAGES") or "20")
+TOC_SCAN_MAX_PAGES = int(os.getenv("TOC_SCAN_MAX_PAGES") or "60")
+# これより長い章は節に分けて台本を並列に作成し、つなぎの会話でまとめる
+SCRIPT_SECTION_CHARS = int(os.getenv("SCRIPT_SECTION_CHARS") or "12000")
+# 台本の作成中に、確定した部分から音声を先に合成しておく。台本の作成は合成を待たず、TTSの段階で合成済みの音声を使う
+# 台本の作成を終えたインスタンスが停止すると合成は失われ、TTSの段階で合成し直すので、既定では無効にする
+TTS_PREFETCH = (os.getenv("TTS_PREFETCH") or "false") == "true"
+# 合成した音声をチャンクのハッシュをキーにGCSに保存し、同じチャンクでは再利用する
+# 先読みした音声はここから取り出すので、TTS_PREFETCHを有効にした場合は常に有効になる
+TTS_CACHE_ENABLED = (os.getenv("TTS_CACHE_ENABLED") or "false") == "true" or TTS_PREFETCH
+# 台本作成のLLMの応答を保存しておき、同じプロンプトでは再利用する。期限の秒数と保存する件数の上限
+# 保存先はローカルのSQLiteなので、ディスクが一時的でインスタンス間で共有されないCloud Runでは有効にしない
+LLM_CACHE_ENABLED = (os.getenv("LLM_CACHE_ENABLED") or "false") == "true"
+LLM_CACHE_DB_PATH = os.getenv("LLM_CACHE_DB_PATH") or "downloads/llm_cache.sqlite3"
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS") or str(7 * 24 * 60 * 60))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES") or "10000")
+# "live"、"record"（LLMとTTSの応答を記録する）、"replay"（記録した応答を返し、プロバイダーを呼ばない）
+LLM_PROVIDER_MODE = os.getenv("LLM_PROVIDER_MODE") or "live"
+LLM_RECORDING_DIR = os.getenv("LLM_RECORDING_DIR") or "downloads/llm_recordings"
+# replayで記録した応答時間に掛ける倍率。0にすると待たずに返す
+LLM_REPLAY_LATENCY_SCALE = float(os.getenv("LLM_REPLAY_LATENCY_SCALE") or "1.0")
+
+# モデルごとの同時実行数、RPM、TPMの上限。MODEL_RATE_LIMITSにJSONを指定すると、モデルごとに項目を上書きする
+# 例: {"gemini-2.5-pro": {"requests_per_minute": 300}, "gemini-3-pro": {"max_concurrency": 4, ...}}
+DEFAULT_RATE_LIMIT = {"max_concurrency": 10, "requests_per_minute": 1000, "tokens_per_minute": 1_000_000}
+MODEL_RATE_LIMITS = {
+    "gemini-2.0-flash": {"max_concurrency": 32, "requests_per_minute": 2000, "tokens_per_minute": 4_000_000},
+    "gemini-2.5-flash": {"max_concurrency": 10, "requests_per_minute": 1000, "tokens_per_minute": 1_000_000},
+    "gemini-2.5-pro": {"max_concurrency": 5, "requests_per_minute": 150, "tokens_per_minute": 2_000_000},
+    "gemini-2.5-flash-preview-tts": {"max_concurrency": 16, "requests_per_minute": 100, "tokens_per_minute": 100_000},
+    "gpt-5": {"max_concurrency": 10, "requests_per_minute": 500, "tokens_per_minute": 500_000},
+}
+for _model, _limit in json.loads(os.getenv("MODEL_RATE_LIMITS") or "{}").items():
+    MODEL_RATE_LIMITS[_model] = {**MODEL_RATE_LIMITS.get(_model, DEFAULT_RATE_LIMIT), **_limit}
+
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# 起動時にLLMクライアントを作成し、接続を確立しておく
+LLM_PREWARM = (os.getenv("LLM_PREWARM") or "true") == "true"
 
 if ENV == "production":
     SUPABASE_PROJECT_URL = os.getenv("SUPABASE_PROJECT_URL")
@@ -1,5 +1,5 @@
 from .chapter import Chapter, ChapterStatus
-from .project import Project, ProjectStatus
+from .project import Project, ProjectStatus, TableOfContents, TableOfContentsItem
 from .worker import OCRWorkerResult
 
 __all__ = [
@@ -7,5 +7,7 @@ __all__ = [
     "ChapterStatus",
     "Project",
     "ProjectStatus",
+    "TableOfContents",
+    "TableOfContentsItem",
     "OCRWorkerResult",
 ]
@@ -14,6 +14,7 @@ class ChapterStatus(StrEnum):
     tts_completed = "tts_completed"
     start_creating_audio = "start_creating_audio"
     creating_audio_completed = "creating_audio_completed"
+    failed = "failed"
 
 
 class Chapter(BaseModel):
@@ -28,3 +29,8 @@ class Chapter(BaseModel):
     status: ChapterStatus = Field(default=ChapterStatus.not_started, description="The current status of the chapter")
     created_at: dt.datetime | None = Field(default=None, description="The timestamp when the project was created")
     updated_at: dt.datetime | None = Field(default=None, description="The timestamp when the project was last updated")
+    heartbeat_at: dt.datetime | None = Field(default=None, description="The last heartbeat of the worker processing it")
+    lease_expires_at: dt.datetime | None = Field(
+        default=None, description="The time after which a worker stage in progress is considered dead"
+    )
+    attempts: int = Field(default=0, description="The number of worker stages that died and were retried")
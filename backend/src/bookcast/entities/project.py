@@ -14,6 +14,21 @@ class ProjectStatus(StrEnum):
     tts_completed = "tts_completed"
     start_creating_audio = "start_creating_audio"
     creating_audio_completed = "creating_audio_completed"
+    failed = "failed"
+
+
+class TableOfContentsItem(BaseModel):
+    page_number: int
+    title: str
+    is_physical_page: bool = Field(
+        default=False, description="page_numberがPDFのページ番号か。Falseの場合は書籍に印刷されたページ番号"
+    )
+
+
+class TableOfContents(BaseModel):
+    items: list[TableOfContentsItem] = Field(default=[], description="The chapters found in the table of contents")
+    model: str = Field(..., description="The model used for the extraction, or pdf_outline")
+    extracted_at: dt.datetime = Field(..., description="The timestamp when the table of contents was extracted")
 
 
 class Project(BaseModel):
@@ -22,3 +37,4 @@ class Project(BaseModel):
     status: ProjectStatus = Field(default=ProjectStatus.not_started, description="The current status of the project")
     created_at: dt.datetime | None = Field(default=None, description="The timestamp when the project was created")
     updated_at: dt.datetime | None = Field(default=None, description="The timestamp when the project was last updated")
+    table_of_contents: TableOfContents | None = Field(default=None, description="The last extracted table of contents")
@@ -1,25 +1,51 @@
 import asyncio
+import os
 import pathlib
+import uuid
+from functools import lru_cache
 from typing import List
 
+from google.api_core.exceptions import NotFound
 from google.cloud import storage
 
 from bookcast.config import GOOGLE_CLOUD_PROJECT, GOOGLE_CLOUD_STORAGE_BUCKET
+from bookcast.metrics import GCS_TRANSFER_BYTES, GCS_TRANSFER_DURATION, observe_duration
 
 
 def _remove_prefix(filename: pathlib.Path) -> pathlib.Path:
     return filename.relative_to("downloads")
 
 
+@lru_cache
+def get_storage_bucket() -> storage.Bucket:
+    # クライアントを作成するたびに認証と接続をやり直すので、プロセス全体で1つのクライアントを使い回す
+    storage_client = storage.Client(project=GOOGLE_CLOUD_PROJECT)
+    return storage_client.bucket(GOOGLE_CLOUD_STORAGE_BUCKET)
+
+
 class GCSFileUploadable:
     @classmethod
     def _download_from_gcs(cls, source_file_name: pathlib.Path) -> None:
         destination_key = _remove_prefix(source_file_name)
 
-        storage_client = storage.Client(project=GOOGLE_CLOUD_PROJECT)
-        bucket = storage_client.bucket(GOOGLE_CLOUD_STORAGE_BUCKET)
-        blob = bucket.blob(str(destination_key))
-        blob.download_to_filename(str(source_file_name))
+        blob = get_storage_bucket().blob(str(destination_key))
+        # 他のリクエストが読んでいるファイルを書き換えないよう、一時ファイルに保存してから置き換える
+        temp_file_name = source_file_name.with_name(f".{source_file_name.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            with observe_duration(GCS_TRANSFER_DURATION, direction="download"):
+                blob.download_to_filename(str(temp_file_name))
+            os.replace(temp_file_name, source_file_name)
+        finally:
+            temp_file_name.unlink(missing_ok=True)
+        GCS_TRANSFER_BYTES.labels(direction="download").inc(source_file_name.stat().st_size)
+
+    @classmethod
+    def _download_from_gcs_if_exists(cls, source_file_name: pathlib.Path) -> bool:
+        try:
+            cls._download_from_gcs(source_file_name)
+        except NotFound:
+            return False
+        return True
 
     @classmethod
     async def _bulk_download_from_gcs(cls, source_file_names: List[pathlib.Path]) -> None:
@@ -33,7 +59,7 @@ class GCSFileUploadable:
 
     @classmethod
     def _upload_gcs_from_file(cls, source_file_name: pathlib.Path, destination_key: pathlib.Path) -> None:
-        storage_client = storage.Client(project=GOOGLE_CLOUD_PROJECT)
-        bucket = storage_client.bucket(GOOGLE_CLOUD_STORAGE_BUCKET)
-        blob = bucket.blob(str(destination_key))
-        blob.upload_from_filename(str(source_file_name))
+        blob = get_storage_bucket().blob(str(destination_key))
+        with observe_duration(GCS_TRANSFER_DURATION, direction="upload"):
+            blob.upload_from_filename(str(source_file_name))
+        GCS_TRANSFER_BYTES.labels(direction="upload").inc(pathlib.Path(source_file_name).stat().st_size)
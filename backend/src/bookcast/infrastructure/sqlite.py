@@ -0,0 +1,12 @@
+import contextlib
+import pathlib
+import sqlite3
+from typing import Iterator
+
+
+@contextlib.contextmanager
+def sqlite_connection(db_path: pathlib.Path) -> Iterator[sqlite3.Connection]:
+    """トランザクションを1つ実行する接続。抜けるときにコミットして接続を閉じる"""
+    # 接続のwithはコミットするだけで閉じないので、トランザクションを終えたら接続も閉じる
+    with contextlib.closing(sqlite3.connect(db_path)) as conn, conn:
+        yield conn
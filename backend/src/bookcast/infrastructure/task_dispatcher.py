@@ -0,0 +1,202 @@
+import abc
+import asyncio
+import json
+import pathlib
+import traceback
+from functools import lru_cache
+from logging import getLogger
+from typing import Awaitable, Callable
+
+from google.cloud import tasks_v2
+
+from bookcast.config import (
+    CLOUD_RUN_SERVICE_URL,
+    GOOGLE_CLOUD_LOCATION,
+    GOOGLE_CLOUD_PROJECT,
+    LOCAL_TASK_CONCURRENCY,
+    LOCAL_TASK_DB_PATH,
+    TASK_DISPATCHER_BACKEND,
+)
+from bookcast.infrastructure.sqlite import sqlite_connection
+
+logger = getLogger(__name__)
+
+TaskHandler = Callable[[dict], Awaitable[object]]
+
+
+class TaskDispatcher(abc.ABC):
+    def __init__(self):
+        self.handlers: dict[str, TaskHandler] = {}
+
+    def register(self, fn_name: str, handler: TaskHandler) -> None:
+        self.handlers[fn_name] = handler
+
+    @abc.abstractmethod
+    async def dispatch(self, fn_name: str, payload: dict, queue: str) -> dict: ...
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+
+class CloudTasksDispatcher(TaskDispatcher):
+    def __init__(self):
+        super().__init__()
+        self._client: tasks_v2.CloudTasksClient | None = None
+
+    @property
+    def client(self) -> tasks_v2.CloudTasksClient:
+        if self._client is None:
+            self._client = tasks_v2.CloudTasksClient()
+        return self._client
+
+    async def dispatch(self, fn_name: str, payload: dict, queue: str) -> dict:
+        parent = self.client.queue_path(project=GOOGLE_CLOUD_PROJECT, location=GOOGLE_CLOUD_LOCATION, queue=queue)
+        task = {
+            "http_request": {
+                "http_method": tasks_v2.HttpMethod.POST,
+                "url": f"{CLOUD_RUN_SERVICE_URL}/internal/api/v1/workers/{fn_name}",
+                "headers": {"Content-Type": "application/json"},
+                "body": json.dumps(payload).encode(),
+            },
+            "dispatch_deadline": {"seconds": 60 * 30},  # 30 minutes
+        }
+        response = await asyncio.to_thread(self.client.create_task, request={"parent": parent, "task": task})
+        return {"task_name": response.name, "status": "queued"}
+
+
+class LocalTaskDispatcher(TaskDispatcher):
+    """登録されたハンドラをプロセス内のasyncioキューで実行する。未完了のタスクはSQLiteに保存され、再起動後に再実行される。"""
+
+    def __init__(self, db_path: pathlib.Path, concurrency: int = 4):
+        super().__init__()
+        self.db_path = db_path
+        self.concurrency = concurrency
+        self._queue: asyncio.Queue[int] | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._consumers: list[asyncio.Task] = []
+        self._init_db()
+
+    def _init_db(self) -> None:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with sqlite_connection(self.db_path) as conn:
+            conn.execute(
+                """
+                create table if not exists task (
+                  id integer primary key autoincrement,
+                  fn_name text not null,
+                  queue text not null,
+                  payload text not null,
+                  status text not null default 'queued',
+                  error text not null default '',
+                  created_at timestamp default current_timestamp not null
+                )
+                """
+            )
+
+    def _insert(self, fn_name: str, payload: dict, queue: str) -> int:
+        with sqlite_connection(self.db_path) as conn:
+            cursor = conn.execute(
+                "insert into task (fn_name, queue, payload) values (?, ?, ?)",
+                (fn_name, queue, json.dumps(payload)),
+            )
+            return cursor.lastrowid
+
+    def _find(self, task_id: int) -> tuple[str, dict] | None:
+        with sqlite_connection(self.db_path) as conn:
+            row = conn.execute("select fn_name, payload from task where id = ?", (task_id,)).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def _update_status(self, task_id: int, status: str, error: str = "") -> None:
+        with sqlite_connection(self.db_path) as conn:
+            conn.execute("update task set status = ?, error = ? where id = ?", (status, error, task_id))
+
+    def _delete(self, task_id: int) -> None:
+        with sqlite_connection(self.db_path) as conn:
+            conn.execute("delete from task where id = ?", (task_id,))
+
+    def _select_unfinished(self) -> list[int]:
+        with sqlite_connection(self.db_path) as conn:
+            rows = conn.execute("select id from task where status in ('queued', 'running') order by id").fetchall()
+        return [row[0] for row in rows]
+
+    def _in_event_loop(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    async def dispatch(self, fn_name: str, payload: dict, queue: str) -> dict:
+        task_id = await asyncio.to_thread(self._insert, fn_name, payload, queue)
+        if self._loop is not None:
+            if self._in_event_loop():
+                self._queue.put_nowait(task_id)
+            else:
+                self._loop.call_soon_threadsafe(self._queue.put_nowait, task_id)
+        return {"task_name": f"local/{queue}/{task_id}", "status": "queued"}
+
+    async def _run(self, task_id: int) -> None:
+        found = await asyncio.to_thread(self._find, task_id)
+        if found is None:
+            return
+
+        fn_name, payload = found
+        handler = self.handlers.get(fn_name)
+        if handler is None:
+            logger.error(f"No local handler registered for task: {fn_name}")
+            await asyncio.to_thread(self._update_status, task_id, "failed", f"No handler registered for {fn_name}")
+            return
+
+        logger.info(f"Running local task {task_id}: {fn_name} {payload}")
+        await asyncio.to_thread(self._update_status, task_id, "running")
+        try:
+            await handler(payload)
+        except Exception:
+            logger.error(f"Local task {task_id} failed: {fn_name}")
+            logger.error(traceback.format_exc())
+            await asyncio.to_thread(self._update_status, task_id, "failed", traceback.format_exc())
+            return
+
+        await asyncio.to_thread(self._delete, task_id)
+
+    async def _consume(self) -> None:
+        while True:
+            task_id = await self._queue.get()
+            try:
+                await self._run(task_id)
+            finally:
+                self._queue.task_done()
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+
+        unfinished = await asyncio.to_thread(self._select_unfinished)
+        if unfinished:
+            logger.info(f"Resuming {len(unfinished)} unfinished local tasks")
+        for task_id in unfinished:
+            self._queue.put_nowait(task_id)
+
+        self._consumers = [asyncio.create_task(self._consume()) for _ in range(self.concurrency)]
+
+    async def join(self) -> None:
+        await self._queue.join()
+
+    async def stop(self) -> None:
+        for consumer in self._consumers:
+            consumer.cancel()
+        await asyncio.gather(*self._consumers, return_exceptions=True)
+        self._consumers = []
+        self._loop = None
+        self._queue = None
+
+
+@lru_cache
+def get_task_dispatcher() -> TaskDispatcher:
+    if TASK_DISPATCHER_BACKEND == "local":
+        return LocalTaskDispatcher(pathlib.Path(LOCAL_TASK_DB_PATH), concurrency=LOCAL_TASK_CONCURRENCY)
+    return CloudTasksDispatcher()
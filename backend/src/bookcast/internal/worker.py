@@ -1,22 +1,17 @@
 import asyncio
-import json
 import logging
 import time
 import traceback
+from typing import Awaitable, Callable
 
 from fastapi import APIRouter, Depends, HTTPException
-from google.cloud import tasks_v2
 from pydantic import BaseModel
 
-from bookcast.config import (
-    BOOKCAST_TTS_WORKER_QUEUE,
-    BOOKCAST_WORKER_QUEUE,
-    CLOUD_RUN_SERVICE_URL,
-    GOOGLE_CLOUD_LOCATION,
-    GOOGLE_CLOUD_PROJECT,
-)
+from bookcast.config import BOOKCAST_TTS_WORKER_QUEUE, BOOKCAST_WORKER_QUEUE
 from bookcast.dependencies import get_chapter_service, get_project_service
-from bookcast.entities import ChapterStatus, ProjectStatus
+from bookcast.entities import Chapter, ChapterStatus, Project, ProjectStatus
+from bookcast.infrastructure.task_dispatcher import get_task_dispatcher
+from bookcast.metrics import WORKER_STAGE_DURATION, observe_duration
 from bookcast.services.audio_service import AudioService
 from bookcast.services.chapter_service import ChapterService
 from bookcast.services.ocr_service import OCRService
@@ -42,23 +37,97 @@ def success_response(message: str, data: dict) -> dict:
 
 class FormData(BaseModel):
     project_id: int
+    chapter_id: int | None = None
 
 
-def invoke_task(project_id: int, fn_name: str, queue: str) -> dict:
-    client = tasks_v2.CloudTasksClient()
-    parent = client.queue_path(project=GOOGLE_CLOUD_PROJECT, location=GOOGLE_CLOUD_LOCATION, queue=queue)
+async def invoke_task(project_id: int, fn_name: str, queue: str, chapter_id: int | None = None) -> dict:
     task_payload = {"project_id": project_id}
-    task = {
-        "http_request": {
-            "http_method": tasks_v2.HttpMethod.POST,
-            "url": f"{CLOUD_RUN_SERVICE_URL}/internal/api/v1/workers/{fn_name}",
-            "headers": {"Content-Type": "application/json"},
-            "body": json.dumps(task_payload).encode(),
+    if chapter_id is not None:
+        task_payload["chapter_id"] = chapter_id
+    return await get_task_dispatcher().dispatch(fn_name, task_payload, queue)
+
+
+async def invoke_next_task(project_id: int, fn_name: str, queue: str, chapter_id: int | None = None) -> dict:
+    try:
+        logger.info(f"Invoking {fn_name} worker for project ID: {project_id}, chapter ID: {chapter_id}...")
+        return await invoke_task(project_id, fn_name, queue, chapter_id)
+    except Exception:
+        logger.error(traceback.format_exc())
+        raise HTTPException(
+            status_code=500,
+            detail={"success": False, "message": "Failed to invoke worker", "error_code": "WORKER_INVOCATION_FAILED"},
+        )
+
+
+async def process_chapters(
+    stage: str,
+    project: Project,
+    chapters: list[Chapter],
+    process_chapter: Callable[[Project, Chapter], Awaitable[None]],
+    project_service: ProjectService,
+    chapter_service: ChapterService,
+    next_task: tuple[str, str] | None = None,
+) -> list[dict]:
+    """章ごとに処理し、終わった章から次のステージを起動する。章同士が待ち合わせることはない。"""
+
+    async def run(chapter: Chapter) -> dict | None:
+        with observe_duration(WORKER_STAGE_DURATION, stage=stage):
+            async with chapter_service.hold_lease(chapter):
+                await process_chapter(project, chapter)
+        project_service.refresh_project_status(project)
+        if next_task is None:
+            return None
+
+        fn_name, queue = next_task
+        return await invoke_next_task(project.id, fn_name, queue, chapter.id)
+
+    results = await asyncio.gather(*[run(chapter) for chapter in chapters], return_exceptions=True)
+
+    errors = [result for result in results if isinstance(result, BaseException)]
+    for error in errors:
+        logger.error("".join(traceback.format_exception(error)))
+
+    for error in errors:
+        if isinstance(error, HTTPException):
+            raise error
+    if errors:
+        raise HTTPException(
+            status_code=500,
+            detail={
+                "success": False,
+                "message": f"Failed to process {len(errors)} of {len(chapters)} chapters",
+                "error_code": "CHAPTER_PROCESSING_FAILED",
+            },
+        )
+
+    return [result for result in results if result is not None]
+
+
+def select_target_chapters(chapter_service: ChapterService, data: FormData) -> list[Chapter]:
+    chapters = chapter_service.select_chapter_by_project_id(data.project_id)
+    return [chapter for chapter in chapters if chapter.id == data.chapter_id]
+
+
+async def fan_out(
+    project_id: int, chapter_service: ChapterService, ready_status: ChapterStatus, fn_name: str, queue: str
+) -> dict:
+    """章ごとに1つのタスクを登録し、各章を別のインスタンスで処理できるようにする"""
+    chapters = chapter_service.select_chapter_by_project_id(project_id)
+    task_results = [
+        await invoke_next_task(project_id, fn_name, queue, chapter.id)
+        for chapter in chapters
+        if chapter.status == ready_status
+    ]
+    logger.info(f"Dispatched {len(task_results)} {fn_name} tasks for project ID: {project_id}")
+
+    return success_response(
+        message="Chapter tasks dispatched successfully",
+        data={
+            "project_id": project_id,
+            "dispatched_chapters": len(task_results),
+            "next_task": {"name": fn_name, "task_ids": [task.get("task_name") for task in task_results]},
         },
-        "dispatch_deadline": {"seconds": 60 * 30},  # 30 minutes
-    }
-    response = client.create_task(request={"parent": parent, "task": task})
-    return {"task_name": response.name, "status": "queued"}
+    )
 
 
 @router.post("/start_ocr")
@@ -72,48 +141,38 @@ async def start_ocr(
     logger.info(f"Starting OCR for project ID: {data.project_id}...")
 
     project = project_service.find_project(data.project_id)
-    chapters = chapter_service.select_chapter_by_project_id(data.project_id)
-    if project.status != ProjectStatus.not_started:
-        raise HTTPException(
-            status_code=400,
-            detail={
-                "success": False,
-                "message": f"Project is not ready for OCR. Current status: {project.status.value}",
-                "error_code": "INVALID_PROJECT_STATUS",
-            },
+    if data.chapter_id is None:
+        return await fan_out(
+            data.project_id, chapter_service, ChapterStatus.not_started, "start_ocr", BOOKCAST_WORKER_QUEUE
         )
 
-    logger.info(f"Updating project status to start OCR for project ID: {data.project_id}...")
-    project_service.update_project_status(project, ProjectStatus.start_ocr)
-    chapter_service.update_chapters_status_by_condition(chapters, ChapterStatus.not_started, ChapterStatus.start_ocr)
+    chapters = select_target_chapters(chapter_service, data)
+    chapters = chapter_service.claim_chapters(chapters, ChapterStatus.not_started, ChapterStatus.start_ocr)
+    logger.info(f"Claimed {len(chapters)} chapters for OCR for project ID: {data.project_id}")
+    project_service.refresh_project_status(project)
 
     start_time = time.time()
-    await ocr_service.process(project, chapters)
+    next_tasks = await process_chapters(
+        "ocr",
+        project,
+        chapters,
+        ocr_service.process_chapter,
+        project_service,
+        chapter_service,
+        next_task=("start_script_writing", BOOKCAST_WORKER_QUEUE),
+    )
     execution_time = time.time() - start_time
 
-    logger.info(f"Updating project status to OCR completed for project ID: {data.project_id}...")
-    project_service.update_project_status(project, ProjectStatus.ocr_completed)
-
-    try:
-        logger.info("Invoking script writing worker...")
-        task_result = invoke_task(data.project_id, "start_script_writing", BOOKCAST_WORKER_QUEUE)
-    except Exception:
-        logger.error(traceback.print_exc())
-        raise HTTPException(
-            status_code=500,
-            detail={"success": False, "message": "Failed to invoke worker", "error_code": "WORKER_INVOCATION_FAILED"},
-        )
-
     return success_response(
         message="OCR processing completed successfully",
         data={
             "project_id": data.project_id,
-            "project_status": ProjectStatus.ocr_completed.value,
+            "project_status": project.status.value,
             "processed_chapters": len(chapters),
             "execution_time_seconds": round(execution_time, 2),
             "next_task": {
                 "name": "start_script_writing",
-                "task_id": task_result.get("task_name"),
+                "task_ids": [task.get("task_name") for task in next_tasks],
             },
         },
     )
@@ -130,48 +189,36 @@ async def start_script_writing(
     logger.info(f"Starting script writing for project ID: {data.project_id}...")
 
     project = project_service.find_project(data.project_id)
-    chapters = chapter_service.select_chapter_by_project_id(data.project_id)
-    if project.status != ProjectStatus.ocr_completed:
-        raise HTTPException(
-            status_code=400,
-            detail={
-                "success": False,
-                "message": f"Project is not ready for script writing. Current status: {project.status.value}",
-                "error_code": "INVALID_PROJECT_STATUS",
-            },
+    if data.chapter_id is None:
+        return await fan_out(
+            data.project_id, chapter_service, ChapterStatus.ocr_completed, "start_script_writing", BOOKCAST_WORKER_QUEUE
         )
 
-    logger.info(f"Updating project status to start writing script for project ID: {data.project_id}...")
-    project_service.update_project_status(project, ProjectStatus.start_writing_script)
-    chapter_service.update_chapters_status_by_condition(
-        chapters, ChapterStatus.ocr_completed, ChapterStatus.start_writing_script
-    )
+    chapters = select_target_chapters(chapter_service, data)
+    chapters = chapter_service.claim_chapters(chapters, ChapterStatus.ocr_completed, ChapterStatus.start_writing_script)
+    logger.info(f"Claimed {len(chapters)} chapters for script writing for project ID: {data.project_id}")
+    project_service.refresh_project_status(project)
 
     start_time = time.time()
-    await script_writing_service.process(project, chapters)
+    next_tasks = await process_chapters(
+        "script_writing",
+        project,
+        chapters,
+        script_writing_service.process_chapter,
+        project_service,
+        chapter_service,
+        next_task=("start_tts", BOOKCAST_TTS_WORKER_QUEUE),
+    )
     execution_time = time.time() - start_time
 
-    logger.info(f"Updating project status to script writing completed for project ID: {data.project_id}...")
-    project_service.update_project_status(project, ProjectStatus.writing_script_completed)
-
-    try:
-        logger.info("Invoking TTS worker...")
-        task_result = invoke_task(data.project_id, "start_tts", BOOKCAST_TTS_WORKER_QUEUE)
-    except Exception:
-        logger.error(traceback.print_exc())
-        raise HTTPException(
-            status_code=500,
-            detail={"success": False, "message": "Failed to invoke worker", "error_code": "WORKER_INVOCATION_FAILED"},
-        )
-
     return success_response(
         message="Script writing completed successfully",
         data={
             "project_id": data.project_id,
-            "project_status": ProjectStatus.writing_script_completed.value,
+            "project_status": project.status.value,
             "processed_chapters": len(chapters),
             "execution_time_seconds": round(execution_time, 2),
-            "next_task": {"name": "start_tts", "task_id": task_result.get("task_name")},
+            "next_task": {"name": "start_tts", "task_ids": [task.get("task_name") for task in next_tasks]},
         },
     )
 
@@ -187,53 +234,48 @@ async def start_tts(
     logger.info(f"Starting TTS for project ID: {data.project_id}...")
 
     project = project_service.find_project(data.project_id)
-    chapters = chapter_service.select_chapter_by_project_id(data.project_id)
-    if project.status != ProjectStatus.writing_script_completed:
-        raise HTTPException(
-            status_code=400,
-            detail={
-                "success": False,
-                "message": f"Project is not ready for TTS. Current status: {project.status.value}",
-                "error_code": "INVALID_PROJECT_STATUS",
-            },
+    if data.chapter_id is None:
+        return await fan_out(
+            data.project_id,
+            chapter_service,
+            ChapterStatus.writing_script_completed,
+            "start_tts",
+            BOOKCAST_TTS_WORKER_QUEUE,
         )
 
-    logger.info(f"Updating project status to start TTS for project ID: {data.project_id}...")
-    project_service.update_project_status(project, ProjectStatus.start_tts)
-    chapter_service.update_chapters_status_by_condition(
-        chapters, ChapterStatus.writing_script_completed, ChapterStatus.start_tts
-    )
+    chapters = select_target_chapters(chapter_service, data)
+    chapters = chapter_service.claim_chapters(chapters, ChapterStatus.writing_script_completed, ChapterStatus.start_tts)
+    logger.info(f"Claimed {len(chapters)} chapters for TTS for project ID: {data.project_id}")
+    project_service.refresh_project_status(project)
+
+    async def generate_chapter_audio(project: Project, chapter: Chapter):
+        await asyncio.wait_for(
+            tts_service.process_chapter(project, chapter),
+            timeout=60 * 60,  # 60 minutes timeout
+        )
 
     start_time = time.time()
-    await asyncio.wait_for(
-        tts_service.generate_audio(project, chapters),
-        timeout=60 * 60,  # 60 minutes timeout
+    next_tasks = await process_chapters(
+        "tts",
+        project,
+        chapters,
+        generate_chapter_audio,
+        project_service,
+        chapter_service,
+        next_task=("start_creating_audio", BOOKCAST_WORKER_QUEUE),
     )
     execution_time = time.time() - start_time
 
-    logger.info(f"Updating project status to TTS completed for project ID: {data.project_id}...")
-    project_service.update_project_status(project, ProjectStatus.tts_completed)
-
-    try:
-        logger.info("Invoking audio creation worker...")
-        task_result = invoke_task(data.project_id, "start_creating_audio", BOOKCAST_WORKER_QUEUE)
-    except Exception:
-        logger.error(traceback.print_exc())
-        raise HTTPException(
-            status_code=500,
-            detail={"success": False, "message": "Failed to invoke worker", "error_code": "WORKER_INVOCATION_FAILED"},
-        )
-
     return success_response(
         message="TTS processing completed successfully",
         data={
             "project_id": data.project_id,
-            "project_status": ProjectStatus.tts_completed.value,
+            "project_status": project.status.value,
             "processed_chapters": len(chapters),
             "execution_time_seconds": round(execution_time, 2),
             "next_task": {
                 "name": "start_creating_audio",
-                "task_id": task_result.get("task_name"),
+                "task_ids": [task.get("task_name") for task in next_tasks],
             },
         },
     )
@@ -246,35 +288,113 @@ async def start_creating_audio(
     chapter_service: ChapterService = Depends(get_chapter_service),
 ):
     project = project_service.find_project(data.project_id)
-    chapters = chapter_service.select_chapter_by_project_id(data.project_id)
-    if project.status != ProjectStatus.tts_completed:
-        raise HTTPException(
-            status_code=400,
-            detail={
-                "success": False,
-                "message": f"Project is not ready for audio creation. Current status: {project.status.value}",
-                "error_code": "INVALID_PROJECT_STATUS",
-            },
+    if data.chapter_id is None:
+        return await fan_out(
+            data.project_id, chapter_service, ChapterStatus.tts_completed, "start_creating_audio", BOOKCAST_WORKER_QUEUE
         )
 
-    project_service.update_project_status(project, ProjectStatus.start_creating_audio)
-    chapter_service.update_chapters_status_by_condition(
-        chapters, ChapterStatus.tts_completed, ChapterStatus.start_creating_audio
-    )
+    chapters = select_target_chapters(chapter_service, data)
+    chapters = chapter_service.claim_chapters(chapters, ChapterStatus.tts_completed, ChapterStatus.start_creating_audio)
+    logger.info(f"Claimed {len(chapters)} chapters for audio creation for project ID: {data.project_id}")
+    project_service.refresh_project_status(project)
+
+    async def create_chapter_audio(project: Project, chapter: Chapter):
+        await audio_service.generate_chapter_audio(project, chapter)
+        chapter_service.update_chapters_status([chapter], ChapterStatus.creating_audio_completed)
 
     start_time = time.time()
-    await audio_service.generate_audio(project, chapters)
+    await process_chapters("creating_audio", project, chapters, create_chapter_audio, project_service, chapter_service)
     execution_time = time.time() - start_time
 
-    project_service.update_project_status(project, ProjectStatus.creating_audio_completed)
-    chapter_service.update_chapters_status(chapters, ChapterStatus.creating_audio_completed)
+    # fan-in: 最後の章が終わった時点でプロジェクトが完了する
+    project_completed = project.status == ProjectStatus.creating_audio_completed
+    if project_completed:
+        logger.info(f"All chapters completed for project ID: {data.project_id}")
 
     return success_response(
         message="Audio creation completed successfully",
         data={
             "project_id": data.project_id,
-            "project_status": ProjectStatus.creating_audio_completed.value,
+            "project_status": project.status.value,
             "processed_chapters": len(chapters),
+            "project_completed": project_completed,
             "execution_time_seconds": round(execution_time, 2),
         },
     )
+
+
+# 処理中のステータス -> (処理前のステータス, 再実行するタスク, キュー)
+RECOVERABLE_STAGES: dict[ChapterStatus, tuple[ChapterStatus, str, str]] = {
+    ChapterStatus.start_ocr: (ChapterStatus.not_started, "start_ocr", BOOKCAST_WORKER_QUEUE),
+    ChapterStatus.start_writing_script: (ChapterStatus.ocr_completed, "start_script_writing", BOOKCAST_WORKER_QUEUE),
+    ChapterStatus.start_tts: (ChapterStatus.writing_script_completed, "start_tts", BOOKCAST_TTS_WORKER_QUEUE),
+    ChapterStatus.start_creating_audio: (ChapterStatus.tts_completed, "start_creating_audio", BOOKCAST_WORKER_QUEUE),
+}
+
+
+@router.post("/sweep_expired_leases")
+async def sweep_expired_leases(
+    project_service: ProjectService = Depends(get_project_service),
+    chapter_service: ChapterService = Depends(get_chapter_service),
+):
+    """リースが切れた処理中の章を処理前のステータスに戻し、その章だけを再実行する。
+
+    再実行した回数が上限に達した章は失敗にして、それ以上は再実行しない。
+    """
+    chapters = chapter_service.select_expired_chapters(list(RECOVERABLE_STAGES))
+
+    recovered = []
+    failed = []
+    for chapter in chapters:
+        ready_status, fn_name, queue = RECOVERABLE_STAGES[chapter.status]
+        if chapter_service.release_expired_chapter(chapter, ready_status) is None:
+            continue
+
+        if chapter.status == ChapterStatus.failed:
+            logger.error(
+                f"Lease expired {chapter.attempts} times for chapter ID: {chapter.id}, "
+                f"project ID: {chapter.project_id}, giving up {fn_name}"
+            )
+            failed.append({"project_id": chapter.project_id, "chapter_id": chapter.id})
+            continue
+
+        logger.warning(
+            f"Lease expired for chapter ID: {chapter.id}, project ID: {chapter.project_id}, retrying {fn_name}"
+        )
+        task = await invoke_next_task(chapter.project_id, fn_name, queue, chapter.id)
+        recovered.append({"project_id": chapter.project_id, "chapter_id": chapter.id, "task_id": task.get("task_name")})
+
+    for project_id in {item["project_id"] for item in recovered + failed}:
+        project_service.refresh_project_status(project_service.find_project(project_id))
+
+    return success_response(
+        message="Expired leases swept successfully",
+        data={"recovered_chapters": recovered, "failed_chapters": failed},
+    )
+
+
+async def sweep_expired_leases_periodically(interval_seconds: int) -> None:
+    """Cloud Schedulerを使わないローカル実行向けに、一定間隔でリースを回収する"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await sweep_expired_leases(project_service=get_project_service(), chapter_service=get_chapter_service())
+        except Exception:
+            logger.error(traceback.format_exc())
+
+
+def _as_local_handler(endpoint):
+    async def handler(payload: dict):
+        return await endpoint(
+            FormData(**payload),
+            project_service=get_project_service(),
+            chapter_service=get_chapter_service(),
+        )
+
+    return handler
+
+
+def register_task_handlers() -> None:
+    task_dispatcher = get_task_dispatcher()
+    for endpoint in (start_ocr, start_script_writing, start_tts, start_creating_audio):
+        task_dispatcher.register(endpoint.__name__, _as_local_handler(endpoint))
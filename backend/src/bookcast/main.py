@@ -1,10 +1,40 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
+from bookcast.config import LEASE_SWEEP_INTERVAL_SECONDS, LLM_PREWARM, TASK_DISPATCHER_BACKEND
+from bookcast.infrastructure.task_dispatcher import get_task_dispatcher
 from bookcast.internal import worker
-from bookcast.routers import chapter, project
+from bookcast.routers import chapter, metrics, project
+from bookcast.services.llm_registry import prewarm_llm_clients
+from bookcast.services.page_renderer import shutdown_render_pool
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    worker.register_task_handlers()
+    task_dispatcher = get_task_dispatcher()
+    await task_dispatcher.start()
+    if LLM_PREWARM:
+        await prewarm_llm_clients()
+
+    sweeper = None
+    if TASK_DISPATCHER_BACKEND == "local":
+        sweeper = asyncio.create_task(worker.sweep_expired_leases_periodically(LEASE_SWEEP_INTERVAL_SECONDS))
+
+    yield
+
+    if sweeper is not None:
+        sweeper.cancel()
+        await asyncio.gather(sweeper, return_exceptions=True)
+    await task_dispatcher.stop()
+    shutdown_render_pool()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(project.router)
 app.include_router(chapter.router)
 app.include_router(worker.router)
+app.include_router(metrics.router)
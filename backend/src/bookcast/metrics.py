@@ -0,0 +1,79 @@
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from prometheus_client import Counter, Gauge, Histogram
+
+__all__ = ["Counter", "Gauge", "Histogram", "observe_duration"]
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+
+
+@contextmanager
+def observe_duration(histogram: Histogram, **labels: str) -> Iterator[None]:
+    """処理時間をhistogramに記録する。例外が発生した場合はoutcome="error"として記録する"""
+    start_time = time.perf_counter()
+    outcome = "success"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        histogram.labels(**labels, outcome=outcome).observe(time.perf_counter() - start_time)
+
+
+WORKER_STAGE_DURATION = Histogram(
+    "bookcast_worker_stage_duration_seconds",
+    "Time spent processing one chapter in a worker stage.",
+    ("stage", "outcome"),
+    buckets=DEFAULT_BUCKETS,
+)
+LLM_CALL_DURATION = Histogram(
+    "bookcast_llm_call_duration_seconds",
+    "Latency of a single LLM call.",
+    ("call", "outcome"),
+    buckets=DEFAULT_BUCKETS,
+)
+LLM_CALL_RETRIES = Counter(
+    "bookcast_llm_call_retries",
+    "Number of LLM calls retried by tenacity.",
+    ("call",),
+)
+GCS_TRANSFER_DURATION = Histogram(
+    "bookcast_gcs_transfer_duration_seconds",
+    "Latency of a GCS upload or download.",
+    ("direction", "outcome"),
+    buckets=DEFAULT_BUCKETS,
+)
+GCS_TRANSFER_BYTES = Counter(
+    "bookcast_gcs_transfer_bytes",
+    "Bytes transferred to and from GCS.",
+    ("direction",),
+)
+CACHE_REQUESTS = Counter(
+    "bookcast_cache_requests",
+    "Cache lookups by cache and result (hit or miss).",
+    ("cache", "result"),
+)
+LLM_PROMPT_TOKENS = Counter(
+    "bookcast_llm_prompt_tokens",
+    "Prompt tokens sent to LLMs by call and whether the provider read them from its prompt cache (hit or miss).",
+    ("call", "cache"),
+)
+SCRIPT_PROMPT_CACHE_HIT_RATIO = Histogram(
+    "bookcast_script_prompt_cache_hit_ratio",
+    "Share of a chapter's script-writing prompt tokens that the provider read from its prompt cache.",
+    buckets=(0.1, 0.25, 0.5, 0.75, 0.9, 1.0),
+)
+OCR_PAGES = Counter(
+    "bookcast_ocr_pages",
+    "Pages transcribed by source (text_layer, cache or vision).",
+    ("source",),
+)
+SUPABASE_QUERY_DURATION = Histogram(
+    "bookcast_supabase_query_duration_seconds",
+    "Latency of a Supabase query.",
+    ("table", "operation", "outcome"),
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
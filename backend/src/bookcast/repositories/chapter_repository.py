@@ -1,4 +1,7 @@
-from bookcast.entities.chapter import Chapter
+import datetime as dt
+
+from bookcast.entities.chapter import Chapter, ChapterStatus
+from bookcast.metrics import SUPABASE_QUERY_DURATION, observe_duration
 
 
 class ChapterRepository:
@@ -6,37 +9,114 @@ class ChapterRepository:
         self.db = db
 
     def find(self, chapter_id: int) -> Chapter:
-        response = self.db.table("chapter").select("*").eq("id", chapter_id).execute()
+        with observe_duration(SUPABASE_QUERY_DURATION, table="chapter", operation="select"):
+            response = self.db.table("chapter").select("*").eq("id", chapter_id).execute()
         if len(response.data):
             return Chapter(**response.data[0])
         raise ValueError(f"Chapter id {chapter_id} not found")
 
     def select_chapter_by_project_id(self, project_id: int) -> list[Chapter]:
-        response = self.db.table("chapter").select("*").eq("project_id", project_id).execute()
+        with observe_duration(SUPABASE_QUERY_DURATION, table="chapter", operation="select"):
+            response = self.db.table("chapter").select("*").eq("project_id", project_id).execute()
+        if len(response.data):
+            return [Chapter(**item) for item in response.data]
+        return []
+
+    def select_expired_chapters(self, statuses: list[ChapterStatus], now: dt.datetime) -> list[Chapter]:
+        with observe_duration(SUPABASE_QUERY_DURATION, table="chapter", operation="select"):
+            response = (
+                self.db.table("chapter")
+                .select("*")
+                .in_("status", [status.value for status in statuses])
+                .or_(f"lease_expires_at.is.null,lease_expires_at.lt.{now.isoformat()}")
+                .execute()
+            )
         if len(response.data):
             return [Chapter(**item) for item in response.data]
         return []
 
     def create(self, chapter: Chapter) -> Chapter:
-        exclude_fields = {"id", "extracted_text", "created_at", "updated_at"}
-        response = self.db.table("chapter").insert(chapter.model_dump(exclude=exclude_fields)).execute()
+        exclude_fields = {
+            "id",
+            "extracted_text",
+            "created_at",
+            "updated_at",
+            "heartbeat_at",
+            "lease_expires_at",
+            "attempts",
+        }
+        with observe_duration(SUPABASE_QUERY_DURATION, table="chapter", operation="insert"):
+            response = self.db.table("chapter").insert(chapter.model_dump(exclude=exclude_fields)).execute()
         if len(response.data):
             return Chapter(**response.data[0])
         raise RuntimeError(f"Failed to create chapter: {chapter}, response: {response}")
 
     def bulk_create(self, chapters: list[Chapter]) -> list[Chapter]:
-        exclude_fields = {"id", "extracted_text", "created_at", "updated_at"}
+        exclude_fields = {
+            "id",
+            "extracted_text",
+            "created_at",
+            "updated_at",
+            "heartbeat_at",
+            "lease_expires_at",
+            "attempts",
+        }
         data = [chapter.model_dump(exclude=exclude_fields) for chapter in chapters]
-        response = self.db.table("chapter").insert(data).execute()
+        with observe_duration(SUPABASE_QUERY_DURATION, table="chapter", operation="insert"):
+            response = self.db.table("chapter").insert(data).execute()
         if len(response.data):
             return [Chapter(**item) for item in response.data]
         return []
 
     def update(self, chapter: Chapter) -> Chapter:
-        exclude_fields = {"id", "created_at", "updated_at"}
-        response = (
-            self.db.table("chapter").update(chapter.model_dump(exclude=exclude_fields)).eq("id", chapter.id).execute()
-        )
+        # リースは心拍でのみ更新する。古い値で上書きしないよう除外する
+        exclude_fields = {"id", "created_at", "updated_at", "heartbeat_at", "lease_expires_at", "attempts"}
+        with observe_duration(SUPABASE_QUERY_DURATION, table="chapter", operation="update"):
+            response = (
+                self.db.table("chapter")
+                .update(chapter.model_dump(exclude=exclude_fields))
+                .eq("id", chapter.id)
+                .execute()
+            )
         if len(response.data):
             return Chapter(**response.data[0])
         raise RuntimeError(f"Failed to update chapter: {chapter}, response: {response}")
+
+    def update_status_by_condition(
+        self,
+        chapter_id: int,
+        before: ChapterStatus,
+        after: ChapterStatus,
+        lease_expires_at: dt.datetime | None = None,
+    ) -> Chapter | None:
+        values = {"status": after.value, "lease_expires_at": lease_expires_at.isoformat() if lease_expires_at else None}
+        with observe_duration(SUPABASE_QUERY_DURATION, table="chapter", operation="update"):
+            response = self.db.table("chapter").update(values).eq("id", chapter_id).eq("status", before.value).execute()
+        if len(response.data):
+            return Chapter(**response.data[0])
+        return None
+
+    def update_lease(self, chapter_id: int, heartbeat_at: dt.datetime, lease_expires_at: dt.datetime | None) -> None:
+        values = {
+            "heartbeat_at": heartbeat_at.isoformat(),
+            "lease_expires_at": lease_expires_at.isoformat() if lease_expires_at else None,
+        }
+        with observe_duration(SUPABASE_QUERY_DURATION, table="chapter", operation="update"):
+            self.db.table("chapter").update(values).eq("id", chapter_id).execute()
+
+    def release_expired_lease(
+        self, chapter_id: int, in_progress: ChapterStatus, ready: ChapterStatus, now: dt.datetime, attempts: int
+    ) -> Chapter | None:
+        """リースが切れたままの章だけをreadyに戻す。心拍が再開していれば何もしない。"""
+        with observe_duration(SUPABASE_QUERY_DURATION, table="chapter", operation="update"):
+            response = (
+                self.db.table("chapter")
+                .update({"status": ready.value, "lease_expires_at": None, "attempts": attempts})
+                .eq("id", chapter_id)
+                .eq("status", in_progress.value)
+                .or_(f"lease_expires_at.is.null,lease_expires_at.lt.{now.isoformat()}")
+                .execute()
+            )
+        if len(response.data):
+            return Chapter(**response.data[0])
+        return None
@@ -1,4 +1,5 @@
-from bookcast.entities.project import Project
+from bookcast.entities.project import Project, ProjectStatus, TableOfContents
+from bookcast.metrics import SUPABASE_QUERY_DURATION, observe_duration
 
 
 class ProjectRepository:
@@ -6,29 +7,56 @@ class ProjectRepository:
         self.db = db
 
     def find(self, project_id: int) -> Project:
-        response = self.db.table("project").select("*").eq("id", project_id).execute()
+        with observe_duration(SUPABASE_QUERY_DURATION, table="project", operation="select"):
+            response = self.db.table("project").select("*").eq("id", project_id).execute()
         if len(response.data):
             return Project(**response.data[0])
         raise ValueError(f"Project id {project_id} not found")
 
     def select_all(self) -> list[Project]:
-        response = self.db.table("project").select("*").execute()
+        with observe_duration(SUPABASE_QUERY_DURATION, table="project", operation="select"):
+            response = self.db.table("project").select("*").execute()
         if len(response.data):
             return [Project(**item) for item in response.data]
         return []
 
     def create(self, project: Project) -> Project:
-        exclude_fields = {"id", "created_at", "updated_at"}
-        response = self.db.table("project").insert(project.model_dump(exclude=exclude_fields)).execute()
+        exclude_fields = {"id", "created_at", "updated_at", "table_of_contents"}
+        with observe_duration(SUPABASE_QUERY_DURATION, table="project", operation="insert"):
+            response = self.db.table("project").insert(project.model_dump(exclude=exclude_fields)).execute()
         if len(response.data) == 1:
             return Project(**response.data[0])
         raise RuntimeError(f"Failed to create project: {project}, response: {response}")
 
     def update(self, project: Project) -> Project:
-        exclude_fields = {"id", "created_at", "updated_at"}
-        response = (
-            self.db.table("project").update(project.model_dump(exclude=exclude_fields)).eq("id", project.id).execute()
-        )
+        exclude_fields = {"id", "created_at", "updated_at", "table_of_contents"}
+        with observe_duration(SUPABASE_QUERY_DURATION, table="project", operation="update"):
+            response = (
+                self.db.table("project")
+                .update(project.model_dump(exclude=exclude_fields))
+                .eq("id", project.id)
+                .execute()
+            )
         if len(response.data):
             return Project(**response.data[0])
         raise RuntimeError(f"Failed to update project: {project}, response: {response}")
+
+    def update_status_by_condition(
+        self, project_id: int, before: ProjectStatus, after: ProjectStatus
+    ) -> Project | None:
+        with observe_duration(SUPABASE_QUERY_DURATION, table="project", operation="update"):
+            response = (
+                self.db.table("project")
+                .update({"status": after.value})
+                .eq("id", project_id)
+                .eq("status", before.value)
+                .execute()
+            )
+        if len(response.data):
+            return Project(**response.data[0])
+        return None
+
+    def update_table_of_contents(self, project_id: int, table_of_contents: TableOfContents) -> None:
+        values = {"table_of_contents": table_of_contents.model_dump(mode="json")}
+        with observe_duration(SUPABASE_QUERY_DURATION, table="project", operation="update"):
+            self.db.table("project").update(values).eq("id", project_id).execute()
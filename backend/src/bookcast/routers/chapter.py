@@ -58,6 +58,6 @@ async def create_chapters(
 
     logger.info(f"Chapters created successfully for project {project.project_id}")
     logger.info(f"Invoking OCR worker for project {project.project_id}")
-    result = invoke_task(project.project_id, "start_ocr", BOOKCAST_WORKER_QUEUE)
+    result = await invoke_task(project.project_id, "start_ocr", BOOKCAST_WORKER_QUEUE)
 
     return {"success": True, "message": "Chapters created and OCR worker invoked", "data": result}
@@ -2,12 +2,13 @@ import traceback
 from logging import getLogger
 from urllib.parse import quote
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile
+from fastapi.responses import FileResponse, StreamingResponse
 
 from bookcast.dependencies import get_project_service
-from bookcast.entities import Project
-from bookcast.services.chapter_search_service import ChapterSearchService
+from bookcast.entities import Project, TableOfContentsItem
+from bookcast.services.page_renderer import RENDER_DPI
+from bookcast.services.page_store import PageStore
 from bookcast.services.project_service import ProjectService
 
 logger = getLogger(__name__)
@@ -19,6 +20,23 @@ router = APIRouter(
 )
 
 
+def find_project_or_404(project_service: ProjectService, project_id: int) -> Project:
+    try:
+        project = project_service.find_project(project_id)
+    except ValueError:
+        project = None
+    if not project:
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "success": False,
+                "message": "Project not found",
+                "error_code": "PROJECT_NOT_FOUND",
+            },
+        )
+    return project
+
+
 @router.get("/")
 async def index(project_service: ProjectService = Depends(get_project_service)) -> list[Project]:
     return project_service.fetch_all_projects()
@@ -86,25 +104,46 @@ async def download_project(project_id: int, project_service: ProjectService = De
     )
 
 
-@router.post("/{project_id}/extract_table_of_contents")
-async def extract_table_of_contents(project_id: int, project_service: ProjectService = Depends(get_project_service)):
-    logger.info(f"Extract table of contents for project ID: {project_id}")
+@router.get("/{project_id}/pages")
+async def page_count(project_id: int, project_service: ProjectService = Depends(get_project_service)):
+    project = find_project_or_404(project_service, project_id)
+    return {"page_count": await PageStore(project.filename).count_pages()}
 
-    try:
-        project = project_service.find_project(project_id)
-    except ValueError:
+
+@router.get("/{project_id}/pages/{page_number}")
+async def show_page(
+    project_id: int,
+    page_number: int,
+    dpi: int = Query(default=RENDER_DPI, ge=50, le=300),
+    project_service: ProjectService = Depends(get_project_service),
+):
+    project = find_project_or_404(project_service, project_id)
+
+    # 描画済みのページはpopplerを呼ばずに返す
+    image_path = await PageStore(project.filename).get_page_path(page_number, dpi)
+    if image_path is None:
         raise HTTPException(
             status_code=404,
             detail={
                 "success": False,
-                "message": "Project not found",
-                "error_code": "PROJECT_NOT_FOUND",
+                "message": "Page not found",
+                "error_code": "PAGE_NOT_FOUND",
             },
         )
 
-    chapter_search_service = ChapterSearchService()
+    return FileResponse(image_path, media_type="image/png")
+
+
+@router.post("/{project_id}/extract_table_of_contents")
+async def extract_table_of_contents(
+    project_id: int, refresh: bool = False, project_service: ProjectService = Depends(get_project_service)
+) -> list[TableOfContentsItem]:
+    logger.info(f"Extract table of contents for project ID: {project_id}")
+
+    project = find_project_or_404(project_service, project_id)
+
     try:
-        table_of_contents = await chapter_search_service.process(project)
+        table_of_contents = await project_service.extract_table_of_contents(project, refresh)
     except Exception as e:
         logger.error(f"Error extracting table of contents for project ID {project_id}: {e}")
         logger.error(traceback.format_exc())
@@ -117,4 +156,4 @@ async def extract_table_of_contents(project_id: int, project_service: ProjectSer
             },
         )
 
-    return table_of_contents
+    return table_of_contents.items
@@ -31,6 +31,7 @@ class AudioService:
         self.jingle_path = self.audio_resource_directory / "jingle.mp3"
         self.opening_call_path = self.audio_resource_directory / "opening_call.wav"
         self.bgm_path = self.audio_resource_directory / "bgm.mp3"
+        self._jingle_audio: AudioSegment | None = None
 
     def _coordinate_jingle(self) -> AudioSegment:
         jingle_audio = AudioSegment.from_mp3(self.jingle_path)
@@ -45,6 +46,12 @@ class AudioService:
 
         return opening
 
+    @property
+    def jingle_audio(self) -> AudioSegment:
+        if self._jingle_audio is None:
+            self._jingle_audio = self._coordinate_jingle()
+        return self._jingle_audio
+
     @staticmethod
     async def _coordinate_script(project: Project, chapter: Chapter) -> AudioSegment:
         logger.info(f"Downloading TTS file for chapter {chapter.chapter_number}")
@@ -71,22 +78,23 @@ class AudioService:
         bgm_quiet = bgm_looped - 13
         return bgm_quiet
 
+    async def generate_chapter_audio(self, project: Project, chapter: Chapter) -> None:
+        script_audio = await self._coordinate_script(project, chapter)
+        bgm_audio = self._coordinate_bgm(len(script_audio))
+        script_with_bgm = script_audio.overlay(bgm_audio)
+        output_audio = self.jingle_audio + script_with_bgm
+
+        source_file_path = CompletedAudioFileService.write(project.filename, chapter.chapter_number, output_audio)
+        CompletedAudioFileService.upload_gcs_from_file(source_file_path)
+
+        del script_audio, bgm_audio, script_with_bgm, output_audio
+        gc.collect()
+
     async def generate_audio(self, project: Project, chapters: list[Chapter]) -> None:
         logger.info("Generating audio for chapters")
 
         logger.info("Starting audio generation")
-        jingle_audio = self._coordinate_jingle()
-
         for chapter in chapters:
-            script_audio = await self._coordinate_script(project, chapter)
-            bgm_audio = self._coordinate_bgm(len(script_audio))
-            script_with_bgm = script_audio.overlay(bgm_audio)
-            output_audio = jingle_audio + script_with_bgm
-
-            source_file_path = CompletedAudioFileService.write(project.filename, chapter.chapter_number, output_audio)
-            CompletedAudioFileService.upload_gcs_from_file(source_file_path)
-
-            del script_audio, bgm_audio, script_with_bgm, output_audio
-            gc.collect()
+            await self.generate_chapter_audio(project, chapter)
 
         logger.info("Audio generation completed successfully.")
@@ -1,24 +1,26 @@
 import asyncio
-import base64
-import io
-import pathlib
+import datetime as dt
 from logging import getLogger
 
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables.config import RunnableConfig
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langgraph.func import entrypoint, task
-from pdf2image import convert_from_path
-from PIL import Image
 from pydantic import BaseModel, ConfigDict, Field
 
-from bookcast.config import GEMINI_API_KEY
-from bookcast.entities import Project
-from bookcast.services.file_service import OCRImageFileService
+from bookcast.config import TOC_SCAN_MAX_PAGES, TOC_SCAN_PAGES, TOC_SCAN_WINDOW
+from bookcast.entities import Project, TableOfContents, TableOfContentsItem
+from bookcast.metrics import LLM_CALL_DURATION, observe_duration
+from bookcast.services.llm_registry import get_gemini_chat_model
+from bookcast.services.page_store import PageStore
+from bookcast.services.pdf_outline import OutlineItem, read_outline
+from bookcast.services.rate_limiter import PAGE_IMAGE_TOKENS, estimate_tokens, get_llm_rate_limiter
 
 logger = getLogger(__name__)
 
 GEMINI_MODEL = "gemini-2.5-flash"
+# PDFのしおりから目次を取得した場合に、TableOfContents.modelに記録する値
+OUTLINE_MODEL = "pdf_outline"
 
 
 class ChapterStartPageNumber(BaseModel):
@@ -62,7 +64,9 @@ async def execute_ocr(llm, base64_image: str) -> OCRResult:
     )
 
     chain = message | llm.with_structured_output(OCRResult)
-    result: OCRResult = await chain.ainvoke({})
+    async with get_llm_rate_limiter(llm).acquire(tokens=estimate_tokens(prompt_text) + PAGE_IMAGE_TOKENS):
+        with observe_duration(LLM_CALL_DURATION, call="table_of_contents"):
+            result: OCRResult = await chain.ainvoke({})
     return result
 
 
@@ -72,59 +76,93 @@ async def ocr_workflow(inputs: OCRWorkflowInput) -> OCRResult:
 
 
 class Page(BaseModel):
-    model_config = ConfigDict(arbitrary_types_allowed=True)
     page_number: int
-    image: Image.Image
+    base64_image: str
 
 
 class ChapterSearchService:
-    def __init__(self):
-        self.semaphore = asyncio.Semaphore(10)
-
-    @staticmethod
-    def image_to_base64_png(image: Image.Image) -> str:
-        with io.BytesIO() as buf:
-            image.save(buf, format="PNG")
-            return base64.b64encode(buf.getvalue()).decode()
-
     async def _extract(self, page: Page) -> OCRResult:
-        async with self.semaphore:
-            base64_image = self.image_to_base64_png(page.image)
-            llm = ChatGoogleGenerativeAI(model=GEMINI_MODEL, google_api_key=GEMINI_API_KEY, temperature=0.01)
-            response = await ocr_workflow.ainvoke(
-                OCRWorkflowInput(
-                    base64_image=base64_image,
-                    llm=llm,
-                ),
-                config=RunnableConfig(run_name="OCRAgent"),
-            )
+        llm = get_gemini_chat_model(GEMINI_MODEL, temperature=0.01)
+        response = await ocr_workflow.ainvoke(
+            OCRWorkflowInput(
+                base64_image=page.base64_image,
+                llm=llm,
+            ),
+            config=RunnableConfig(run_name="OCRAgent"),
+        )
 
         return response
 
-    async def _extract_table_of_contents(self, pages: list[Page]) -> list[ChapterStartPageNumber]:
-        tasks = []
-        for page in pages:
-            tasks.append(self._extract(page))
+    async def _render_window(self, page_store: PageStore, first_page: int, last_page: int) -> list[Page]:
+        rendered_pages = await asyncio.gather(
+            *[page_store.get_page(page_number) for page_number in range(first_page, last_page + 1)]
+        )
+        return [
+            Page(page_number=page_number, base64_image=page.base64_image)
+            for page_number, page in zip(range(first_page, last_page + 1), rendered_pages)
+            if page is not None
+        ]
 
-        logger.info("Starting OCR for the first 20 pages...")
-        results: list[OCRResult] = await asyncio.gather(*tasks)
+    async def _process(self, page_store: PageStore) -> list[ChapterStartPageNumber]:
+        """先頭から少しずつページを判定し、目次が始まって終わった時点で打ち切る。
+
+        TOC_SCAN_PAGESまでに目次が見つからなければ諦め、目次が続いている間はTOC_SCAN_MAX_PAGESまで読み進める。
+        """
+        chapter_pages: list[ChapterStartPageNumber] = []
+        found = False
+        first_page = 1
+        while first_page <= (scan_limit := TOC_SCAN_MAX_PAGES if found else TOC_SCAN_PAGES):
+            last_page = min(first_page + TOC_SCAN_WINDOW - 1, scan_limit)
+            pages = await self._render_window(page_store, first_page, last_page)
+            logger.info(f"Searching table of contents in pages {first_page}-{last_page}")
+
+            results: list[OCRResult] = await asyncio.gather(*[self._extract(page) for page in pages])
+            for result in results:
+                if result.is_table_of_contents_page:
+                    found = True
+                    chapter_pages.extend(result.chapter_pages)
+                elif found:
+                    return chapter_pages
+
+            # 書籍の最後のページまで読んだ
+            if len(pages) < last_page - first_page + 1:
+                break
+            first_page = last_page + 1
 
-        chapter_pages = []
-        for r in results:
-            if r.is_table_of_contents_page:
-                chapter_pages.extend(r.chapter_pages)
         return chapter_pages
 
-    async def _process(self, book_path: pathlib.Path) -> list[ChapterStartPageNumber]:
-        images = convert_from_path(book_path, first_page=0, last_page=20, dpi=150, fmt="RGB")
-        pages = [Page(page_number=1, image=images[i]) for i in range(len(images))]
-        return await self._extract_table_of_contents(pages)
+    @staticmethod
+    def _read_outline(page_store: PageStore) -> list[OutlineItem]:
+        book_path = page_store.get_book_path()
+        try:
+            return read_outline(book_path)
+        except Exception:
+            logger.warning(f"Failed to read PDF outline, falling back to OCR: {book_path}")
+            return []
+
+    async def process(self, project: Project) -> TableOfContents:
+        page_store = PageStore(project.filename)
+
+        # しおりがあるPDFはLLMを使わずに、PDFのページ番号で章を返す
+        outline = await asyncio.to_thread(self._read_outline, page_store)
+        if outline:
+            logger.info(f"Using PDF outline with {len(outline)} items: {project.filename}")
+            return TableOfContents(
+                items=[
+                    TableOfContentsItem(page_number=item.page_number, title=item.title, is_physical_page=True)
+                    for item in outline
+                ],
+                model=OUTLINE_MODEL,
+                extracted_at=dt.datetime.now(dt.timezone.utc),
+            )
 
-    async def process(self, project: Project) -> list[ChapterStartPageNumber]:
         logger.info(f"Starting OCR: {project.filename}")
 
-        book_path = OCRImageFileService.download_from_gcs(project.filename)
-        result = await self._process(book_path)
+        chapter_pages = await self._process(page_store)
 
         logger.info(f"Completed OCR: {project.filename}")
-        return result
+        return TableOfContents(
+            items=[TableOfContentsItem(page_number=item.page_number, title=item.title) for item in chapter_pages],
+            model=GEMINI_MODEL,
+            extracted_at=dt.datetime.now(dt.timezone.utc),
+        )
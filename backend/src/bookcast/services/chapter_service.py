@@ -1,6 +1,20 @@
+import asyncio
+import datetime as dt
+import logging
+import traceback
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from bookcast.config import STAGE_HEARTBEAT_SECONDS, STAGE_LEASE_SECONDS, STAGE_MAX_ATTEMPTS
 from bookcast.entities import Chapter, ChapterStatus
 from bookcast.repositories import ChapterRepository, ProjectRepository
 
+logger = logging.getLogger(__name__)
+
+
+def lease_expires_at(now: dt.datetime) -> dt.datetime:
+    return now + dt.timedelta(seconds=STAGE_LEASE_SECONDS)
+
 
 class ChapterService:
     def __init__(self, chapter_repo: ChapterRepository, project_repo: ProjectRepository):
@@ -34,3 +48,60 @@ class ChapterService:
                 self.chapter_repo.update(chapter)
 
         return chapters
+
+    def claim_chapters(self, chapters: list[Chapter], before: ChapterStatus, after: ChapterStatus) -> list[Chapter]:
+        """beforeのステータスの章をafterに遷移させる。他のワーカーが先に遷移させた章は含まれない。"""
+        claimed = []
+        for chapter in chapters:
+            if chapter.status != before:
+                continue
+
+            now = dt.datetime.now(dt.timezone.utc)
+            updated = self.chapter_repo.update_status_by_condition(chapter.id, before, after, lease_expires_at(now))
+            if updated is not None:
+                chapter.status = after
+                claimed.append(chapter)
+
+        return claimed
+
+    def renew_lease(self, chapter: Chapter) -> None:
+        now = dt.datetime.now(dt.timezone.utc)
+        expires_at = lease_expires_at(now)
+        self.chapter_repo.update_lease(chapter.id, now, expires_at)
+
+    async def _heartbeat(self, chapter: Chapter) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.renew_lease, chapter)
+            except Exception:
+                # 一時的な失敗でリースを手放さないよう、次の心拍で再試行する
+                logger.warning(f"Failed to renew lease for chapter ID: {chapter.id}")
+                logger.warning(traceback.format_exc())
+            await asyncio.sleep(STAGE_HEARTBEAT_SECONDS)
+
+    @asynccontextmanager
+    async def hold_lease(self, chapter: Chapter) -> AsyncIterator[None]:
+        """処理中は定期的にリースを延長する。処理が終われば心拍を止める。"""
+        heartbeat = asyncio.create_task(self._heartbeat(chapter))
+        try:
+            yield
+        finally:
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+
+    def select_expired_chapters(self, statuses: list[ChapterStatus]) -> list[Chapter]:
+        return self.chapter_repo.select_expired_chapters(statuses, dt.datetime.now(dt.timezone.utc))
+
+    def release_expired_chapter(self, chapter: Chapter, ready: ChapterStatus) -> Chapter | None:
+        """リースが切れた章をreadyに戻す。再実行した回数が上限に達していれば失敗にする。"""
+        attempts = chapter.attempts + 1
+        if attempts >= STAGE_MAX_ATTEMPTS:
+            ready = ChapterStatus.failed
+        released = self.chapter_repo.release_expired_lease(
+            chapter.id, chapter.status, ready, dt.datetime.now(dt.timezone.utc), attempts
+        )
+        if released is not None:
+            chapter.status = ready
+            chapter.lease_expires_at = None
+            chapter.attempts = attempts
+        return released
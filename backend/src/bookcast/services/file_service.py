@@ -40,12 +40,25 @@ def build_completed_audio_directory(filename: str) -> pathlib.Path:
     return base_path / "completed_audio"
 
 
+def build_ocr_cache_directory() -> pathlib.Path:
+    return build_downloads_path("ocr_cache")
+
+
+def build_tts_cache_directory() -> pathlib.Path:
+    return build_downloads_path("tts_cache")
+
+
 def resolve_book_path(filename: str) -> pathlib.Path:
     return build_book_directory(filename) / filename
 
 
-def resolve_image_path(filename: str, page_number: int) -> pathlib.Path:
-    image_dir = build_image_directory(filename)
+def build_page_image_directory(filename: str, dpi: int) -> pathlib.Path:
+    base_path = build_image_directory(filename)
+    return base_path / f"{dpi}dpi"
+
+
+def resolve_image_path(filename: str, page_number: int, dpi: int) -> pathlib.Path:
+    image_dir = build_page_image_directory(filename, dpi)
     return image_dir / f"page_{page_number:03d}.png"
 
 
@@ -54,6 +67,16 @@ def resolve_text_path(filename: str, page_number: int) -> pathlib.Path:
     return text_dir / f"page_{page_number:03d}.txt"
 
 
+def resolve_ocr_cache_path(cache_key: str) -> pathlib.Path:
+    cache_dir = build_ocr_cache_directory()
+    return cache_dir / cache_key[:2] / f"{cache_key}.txt"
+
+
+def resolve_tts_cache_path(cache_key: str) -> pathlib.Path:
+    cache_dir = build_tts_cache_directory()
+    return cache_dir / cache_key[:2] / f"{cache_key}.pcm"
+
+
 def resolve_script_path(filename: str, chapter_num: int) -> pathlib.Path:
     script_dir = build_script_directory(filename)
     return script_dir / f"chapter_{chapter_num:03d}_script.txt"
@@ -97,6 +120,29 @@ class OCRImageFileService(GCSFileUploadable):
         return book_path
 
 
+class PageImageFileService(GCSFileUploadable):
+    """解像度ごとに描画済みのページ画像。OCR、目次抽出、フロントエンドのビューアで共有される"""
+
+    @classmethod
+    def read(cls, filename: str, page_number: int, dpi: int) -> bytes:
+        image_path = resolve_image_path(filename, page_number, dpi)
+        with open(image_path, "rb") as f:
+            return f.read()
+
+    @classmethod
+    def build_path(cls, filename: str, page_number: int, dpi: int) -> pathlib.Path:
+        image_dir = build_page_image_directory(filename, dpi)
+        image_dir.mkdir(parents=True, exist_ok=True)
+        return resolve_image_path(filename, page_number, dpi)
+
+    @classmethod
+    def download_from_gcs(cls, filename: str, page_number: int, dpi: int) -> pathlib.Path | None:
+        image_path = cls.build_path(filename, page_number, dpi)
+        if image_path.exists() or cls._download_from_gcs_if_exists(image_path):
+            return image_path
+        return None
+
+
 class OCRTextFileService(GCSFileUploadable):
     @classmethod
     def read(cls, filename: str, page_number: int) -> str:
@@ -116,6 +162,35 @@ class OCRTextFileService(GCSFileUploadable):
         return text_path
 
 
+class OCRCacheFileService(GCSFileUploadable):
+    """ページ画像とプロンプト、モデルのハッシュをキーにしたOCR結果。書籍をまたいで共有される"""
+
+    @classmethod
+    def read(cls, cache_key: str) -> str:
+        cache_path = resolve_ocr_cache_path(cache_key)
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    @classmethod
+    def write(cls, cache_key: str, content: str) -> pathlib.Path:
+        cache_path = resolve_ocr_cache_path(cache_key)
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+
+        with open(cache_path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+        return cache_path
+
+    @classmethod
+    def download_from_gcs(cls, cache_key: str) -> pathlib.Path | None:
+        cache_path = resolve_ocr_cache_path(cache_key)
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+
+        if cache_path.exists() or cls._download_from_gcs_if_exists(cache_path):
+            return cache_path
+        return None
+
+
 class ScriptFileService(GCSFileUploadable):
     @classmethod
     def read(cls, filename: str, chapter_number: int) -> str:
@@ -180,6 +255,35 @@ class TTSFileService(GCSFileUploadable):
         return audio_paths
 
 
+class TTSCacheFileService(GCSFileUploadable):
+    """台本のチャンクと声、モデルのハッシュをキーにした合成済みの音声（PCM）"""
+
+    @classmethod
+    def read(cls, cache_key: str) -> bytes:
+        cache_path = resolve_tts_cache_path(cache_key)
+        with open(cache_path, "rb") as f:
+            return f.read()
+
+    @classmethod
+    def write(cls, cache_key: str, pcm_data: bytes) -> pathlib.Path:
+        cache_path = resolve_tts_cache_path(cache_key)
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+
+        with open(cache_path, "wb") as f:
+            f.write(pcm_data)
+
+        return cache_path
+
+    @classmethod
+    def download_from_gcs(cls, cache_key: str) -> pathlib.Path | None:
+        cache_path = resolve_tts_cache_path(cache_key)
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+
+        if cache_path.exists() or cls._download_from_gcs_if_exists(cache_path):
+            return cache_path
+        return None
+
+
 class CompletedAudioFileService(GCSFileUploadable):
     @classmethod
     def read(cls, filename: str, chapter_number: int) -> AudioSegment:
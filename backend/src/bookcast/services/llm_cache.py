@@ -0,0 +1,121 @@
+import asyncio
+import hashlib
+import json
+import pathlib
+import time
+from functools import lru_cache
+from logging import getLogger
+from typing import Awaitable, Callable
+
+from langchain_core.prompt_values import PromptValue
+
+from bookcast.config import (
+    LLM_CACHE_DB_PATH,
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_TTL_SECONDS,
+)
+from bookcast.infrastructure.sqlite import sqlite_connection
+from bookcast.metrics import CACHE_REQUESTS
+
+logger = getLogger(__name__)
+
+
+def build_llm_cache_key(llm, prompt: PromptValue, output: str) -> str:
+    """モデル、temperature、出力の形式、展開済みのプロンプトが同じなら同じキーになる"""
+    model = getattr(llm, "model_name", None) or getattr(llm, "model", "")
+    temperature = getattr(llm, "temperature", None)
+    messages = [(message.type, message.content) for message in prompt.to_messages()]
+
+    digest = hashlib.sha256()
+    for part in (model, str(temperature), output, json.dumps(messages, ensure_ascii=False)):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class LLMResponseCache:
+    """LLMの応答をSQLiteに保存する。期限切れの応答と、上限を超えた分の最後に使われたのが古い応答から削除する"""
+
+    def __init__(self, db_path: pathlib.Path, ttl_seconds: int, max_entries: int):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._init_db()
+
+    def _init_db(self) -> None:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with sqlite_connection(self.db_path) as conn:
+            conn.execute(
+                """
+                create table if not exists llm_response (
+                  key text primary key,
+                  call text not null,
+                  response text not null,
+                  created_at real not null,
+                  accessed_at real not null
+                )
+                """
+            )
+            conn.execute("create index if not exists llm_response_accessed_at on llm_response (accessed_at)")
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with sqlite_connection(self.db_path) as conn:
+            row = conn.execute(
+                "select response from llm_response where key = ? and created_at > ?",
+                (key, now - self.ttl_seconds),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("update llm_response set accessed_at = ? where key = ?", (now, key))
+        return row[0]
+
+    def put(self, key: str, call: str, response: str) -> None:
+        now = time.time()
+        with sqlite_connection(self.db_path) as conn:
+            conn.execute(
+                "insert or replace into llm_response (key, call, response, created_at, accessed_at) "
+                "values (?, ?, ?, ?, ?)",
+                (key, call, response, now, now),
+            )
+            conn.execute("delete from llm_response where created_at <= ?", (now - self.ttl_seconds,))
+            conn.execute(
+                "delete from llm_response where key not in "
+                "(select key from llm_response order by accessed_at desc limit ?)",
+                (self.max_entries,),
+            )
+
+
+@lru_cache
+def get_llm_response_cache() -> LLMResponseCache:
+    return LLMResponseCache(
+        pathlib.Path(LLM_CACHE_DB_PATH), ttl_seconds=LLM_CACHE_TTL_SECONDS, max_entries=LLM_CACHE_MAX_ENTRIES
+    )
+
+
+async def cached_llm_response(
+    call: str,
+    llm,
+    prompt: PromptValue,
+    generate: Callable[[], Awaitable[str]],
+    output: str = "text",
+    use_cache: bool = True,
+) -> str:
+    """同じプロンプトの応答が保存されていれば、LLMを呼ばずにそれを返す。use_cache=Falseでは常にLLMを呼ぶ"""
+    if not (LLM_CACHE_ENABLED and use_cache):
+        return await generate()
+
+    # 初回はテーブルを作成するので、SQLiteの操作はすべてイベントループの外で行う
+    cache = await asyncio.to_thread(get_llm_response_cache)
+    key = build_llm_cache_key(llm, prompt, output)
+    cached_response = await asyncio.to_thread(cache.get, key)
+    if cached_response is not None:
+        CACHE_REQUESTS.labels(cache="llm_response", result="hit").inc()
+        logger.info(f"Using cached LLM response for call: {call}")
+        return cached_response
+    CACHE_REQUESTS.labels(cache="llm_response", result="miss").inc()
+
+    response = await generate()
+    await asyncio.to_thread(cache.put, key, call, response)
+    return response
@@ -0,0 +1,189 @@
+import asyncio
+import hashlib
+import json
+import pathlib
+import time
+from functools import lru_cache
+from logging import getLogger
+from typing import Any, Awaitable, Callable, TypeVar
+
+from google import genai
+from google.genai import types
+from langchain_core.messages import BaseMessage, messages_from_dict, messages_to_dict
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_openai import ChatOpenAI
+from pydantic import BaseModel
+
+from bookcast.config import LLM_PROVIDER_MODE, LLM_RECORDING_DIR, LLM_REPLAY_LATENCY_SCALE
+
+logger = getLogger(__name__)
+
+T = TypeVar("T")
+
+LIVE = "live"
+RECORD = "record"
+REPLAY = "replay"
+
+
+def _to_jsonable(value: Any) -> Any:
+    if isinstance(value, type) and issubclass(value, BaseModel):
+        return value.model_json_schema()
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json", exclude_none=True)
+    if isinstance(value, bytes):
+        return hashlib.sha256(value).hexdigest()
+    return str(value)
+
+
+def build_recording_key(*parts: Any) -> str:
+    """プロバイダー、モデル、リクエストの内容が同じなら同じキーになる"""
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=_to_jsonable)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ProviderRecorder:
+    """LLMとTTSのリクエストと応答の組をファイルに記録し、ネットワークなしで再生する。
+
+    recordではプロバイダーを呼び、応答とかかった時間を保存する。
+    replayではプロバイダーを呼ばず、記録した時間にlatency_scaleを掛けた分だけ待ってから応答を返す。
+    """
+
+    def __init__(self, mode: str, directory: pathlib.Path, latency_scale: float = 1.0):
+        if mode not in (LIVE, RECORD, REPLAY):
+            raise ValueError(f"Unknown LLM provider mode: {mode}")
+        self.mode = mode
+        self.directory = directory
+        self.latency_scale = latency_scale
+
+    def _resolve_path(self, key: str) -> pathlib.Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _read(self, key: str) -> dict:
+        path = self._resolve_path(key)
+        if not path.exists():
+            raise LookupError(f"No recorded response for key: {key}")
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write(self, key: str, recording: dict) -> None:
+        path = self._resolve_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # 並行して同じキーを記録しても、壊れたファイルを読まないように置き換える
+        tmp_path = path.with_suffix(f".{time.monotonic_ns()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(recording, f, ensure_ascii=False, default=str)
+        tmp_path.replace(path)
+
+    async def call(
+        self,
+        key: str,
+        description: str,
+        generate: Callable[[], Awaitable[T]],
+        dump: Callable[[T], Any],
+        load: Callable[[Any], T],
+    ) -> T:
+        if self.mode == REPLAY:
+            recording = await asyncio.to_thread(self._read, key)
+            await asyncio.sleep(recording["duration_seconds"] * self.latency_scale)
+            return load(recording["response"])
+
+        start = time.perf_counter()
+        response = await generate()
+        duration = time.perf_counter() - start
+
+        if self.mode == RECORD:
+            recording = {"description": description, "duration_seconds": duration, "response": dump(response)}
+            await asyncio.to_thread(self._write, key, recording)
+        return response
+
+
+@lru_cache
+def get_provider_recorder() -> ProviderRecorder:
+    return ProviderRecorder(LLM_PROVIDER_MODE, pathlib.Path(LLM_RECORDING_DIR), latency_scale=LLM_REPLAY_LATENCY_SCALE)
+
+
+def _dump_chat_result(result: ChatResult) -> dict:
+    return {
+        "generations": [
+            {"message": messages_to_dict([generation.message])[0], "generation_info": generation.generation_info}
+            for generation in result.generations
+        ],
+        "llm_output": result.llm_output,
+    }
+
+
+def _load_chat_result(data: dict) -> ChatResult:
+    return ChatResult(
+        generations=[
+            ChatGeneration(
+                message=messages_from_dict([generation["message"]])[0],
+                generation_info=generation["generation_info"],
+            )
+            for generation in data["generations"]
+        ],
+        llm_output=data["llm_output"],
+    )
+
+
+class _RecordingChatModelMixin:
+    async def _agenerate(
+        self, messages: list[BaseMessage], stop: list[str] | None = None, run_manager=None, **kwargs: Any
+    ) -> ChatResult:
+        model = getattr(self, "model_name", None) or getattr(self, "model", "")
+        key = build_recording_key(self._llm_type, model, self.temperature, messages_to_dict(messages), stop, kwargs)
+        return await get_provider_recorder().call(
+            key,
+            f"{type(self).__name__} {model}",
+            lambda: super(_RecordingChatModelMixin, self)._agenerate(messages, stop, run_manager, **kwargs),
+            _dump_chat_result,
+            _load_chat_result,
+        )
+
+
+class RecordingChatGoogleGenerativeAI(_RecordingChatModelMixin, ChatGoogleGenerativeAI):
+    pass
+
+
+class RecordingChatOpenAI(_RecordingChatModelMixin, ChatOpenAI):
+    pass
+
+
+class _RecordingAsyncModels:
+    def __init__(self, models):
+        self._models = models
+
+    def __getattr__(self, name: str):
+        return getattr(self._models, name)
+
+    async def generate_content(
+        self, *, model: str, contents, config: types.GenerateContentConfig | None = None
+    ) -> types.GenerateContentResponse:
+        key = build_recording_key("genai", model, contents, config)
+        return await get_provider_recorder().call(
+            key,
+            f"genai {model}",
+            lambda: self._models.generate_content(model=model, contents=contents, config=config),
+            lambda response: response.model_dump(mode="json", exclude_none=True),
+            types.GenerateContentResponse.model_validate,
+        )
+
+
+class _RecordingAsyncClient:
+    def __init__(self, aio):
+        self._aio = aio
+        self.models = _RecordingAsyncModels(aio.models)
+
+    def __getattr__(self, name: str):
+        return getattr(self._aio, name)
+
+
+class RecordingGenaiClient:
+    """genai.Clientのaio.models.generate_contentを記録、再生する。それ以外はそのままクライアントに渡す"""
+
+    def __init__(self, client: genai.Client):
+        self._client = client
+        self.aio = _RecordingAsyncClient(client.aio)
+
+    def __getattr__(self, name: str):
+        return getattr(self._client, name)
@@ -0,0 +1,107 @@
+import asyncio
+import threading
+import traceback
+from logging import getLogger
+from typing import Awaitable, Callable, TypeVar
+
+from google import genai
+from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_openai import ChatOpenAI
+
+from bookcast.config import GEMINI_API_KEY, LLM_PROVIDER_MODE
+from bookcast.services.llm_recorder import (
+    LIVE,
+    REPLAY,
+    RecordingChatGoogleGenerativeAI,
+    RecordingChatOpenAI,
+    RecordingGenaiClient,
+)
+
+logger = getLogger(__name__)
+
+T = TypeVar("T")
+
+# 起動時に接続を確立しておくモデル。各サービスで使うモデルとtemperatureに合わせる
+PREWARM_GEMINI_CHAT_MODELS: list[tuple[str, float]] = [
+    ("gemini-2.0-flash", 0.01),
+    ("gemini-2.5-flash", 0.01),
+    ("gemini-2.5-flash", 0.2),
+    ("gemini-2.5-pro", 0.2),
+]
+PREWARM_OPENAI_CHAT_MODELS: list[tuple[str, float]] = [("gpt-5", 0.2)]
+PREWARM_GENAI_MODELS: list[str] = ["gemini-2.5-flash-preview-tts"]
+PREWARM_TIMEOUT_SECONDS = 10
+
+_lock = threading.Lock()
+_clients: dict[tuple, object] = {}
+
+
+def _get_or_create(key: tuple, factory: Callable[[], T]) -> T:
+    # クライアントごとにHTTPの接続プールを持つため、同じ設定のクライアントはプロセス内で1つだけ作る
+    with _lock:
+        if key not in _clients:
+            _clients[key] = factory()
+        return _clients[key]
+
+
+def get_gemini_chat_model(model: str, temperature: float) -> ChatGoogleGenerativeAI:
+    # live以外では、プロバイダーの呼び出しを記録または再生するクライアントを使う
+    chat_model_class = ChatGoogleGenerativeAI if LLM_PROVIDER_MODE == LIVE else RecordingChatGoogleGenerativeAI
+    return _get_or_create(
+        ("gemini", model, temperature),
+        lambda: chat_model_class(model=model, google_api_key=GEMINI_API_KEY, temperature=temperature),
+    )
+
+
+def get_openai_chat_model(model: str, temperature: float) -> ChatOpenAI:
+    chat_model_class = ChatOpenAI if LLM_PROVIDER_MODE == LIVE else RecordingChatOpenAI
+    return _get_or_create(
+        ("openai", model, temperature), lambda: chat_model_class(model=model, temperature=temperature)
+    )
+
+
+def _create_genai_client() -> genai.Client:
+    client = genai.Client(api_key=GEMINI_API_KEY)
+    return client if LLM_PROVIDER_MODE == LIVE else RecordingGenaiClient(client)
+
+
+def get_genai_client() -> genai.Client:
+    return _get_or_create(("genai",), _create_genai_client)
+
+
+async def _prewarm(name: str, request: Callable[..., Awaitable[object]], *args) -> None:
+    # クライアントの作成もここで行い、APIキーがない場合などの失敗はこのモデルだけで止める
+    try:
+        await asyncio.wait_for(request(*args), timeout=PREWARM_TIMEOUT_SECONDS)
+    except Exception:
+        logger.warning(f"Failed to prewarm LLM client: {name}")
+        logger.warning(traceback.format_exc())
+
+
+async def _get_gemini_chat_model_info(model: str, temperature: float) -> None:
+    await get_gemini_chat_model(model, temperature).async_client.models.get(model=model)
+
+
+async def _get_openai_chat_model_info(model: str, temperature: float) -> None:
+    await get_openai_chat_model(model, temperature).root_async_client.models.retrieve(model)
+
+
+async def _get_genai_model_info(model: str) -> None:
+    await get_genai_client().aio.models.get(model=model)
+
+
+async def prewarm_llm_clients() -> None:
+    """クライアントを作成し、モデル情報の取得でTLS接続を確立しておく。失敗しても起動は止めない"""
+    if LLM_PROVIDER_MODE == REPLAY:
+        # 記録を再生する場合はプロバイダーに接続しない
+        return
+    requests = []
+    for model, temperature in PREWARM_GEMINI_CHAT_MODELS:
+        requests.append(_prewarm(model, _get_gemini_chat_model_info, model, temperature))
+    for model, temperature in PREWARM_OPENAI_CHAT_MODELS:
+        requests.append(_prewarm(model, _get_openai_chat_model_info, model, temperature))
+    for model in PREWARM_GENAI_MODELS:
+        requests.append(_prewarm(model, _get_genai_model_info, model))
+
+    await asyncio.gather(*requests)
+    logger.info(f"Prewarmed {len(requests)} LLM clients")
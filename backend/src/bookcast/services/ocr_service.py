@@ -1,20 +1,31 @@
 import asyncio
-import base64
-import io
+import hashlib
 import pathlib
+import re
+import traceback
+from contextlib import asynccontextmanager
 from logging import getLogger
+from typing import AsyncIterator, Awaitable, Callable
 
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langgraph.func import entrypoint, task
-from pdf2image import convert_from_path
-from PIL import Image
 from pydantic import BaseModel, ConfigDict, Field
 
-from bookcast.config import GEMINI_API_KEY
+from bookcast.config import OCR_BATCH_SIZE, OCR_BATCH_WAIT_SECONDS, OCR_PAGE_QUEUE_SIZE, OCR_PAGE_WORKERS
 from bookcast.entities import Chapter, ChapterStatus, OCRWorkerResult, Project
+from bookcast.metrics import CACHE_REQUESTS, LLM_CALL_DURATION, OCR_PAGES, observe_duration
 from bookcast.services.chapter_service import ChapterService
-from bookcast.services.file_service import OCRImageFileService
+from bookcast.services.file_service import OCRCacheFileService
+from bookcast.services.llm_registry import get_gemini_chat_model
+from bookcast.services.page_store import PageStore
+from bookcast.services.rate_limiter import (
+    PAGE_IMAGE_TOKENS,
+    estimate_tokens,
+    get_adaptive_limiter,
+    get_llm_rate_limiter,
+)
+from bookcast.services.text_layer import extract_text_layers, is_usable_text_layer, unexpected_char_ratio
 
 logger = getLogger(__name__)
 
@@ -26,15 +37,21 @@ class OCRResult(BaseModel):
     error_reason: str = Field(default="", description="画像から文字を読み取れなかった理由")
 
 
+class PageOCRResult(OCRResult):
+    page_index: int = Field(..., description="画像に添えられたページ番号")
+
+
+class BatchOCRResult(BaseModel):
+    pages: list[PageOCRResult] = Field(..., description="画像ごとのOCR結果")
+
+
 class EvaluateResult(BaseModel):
     is_valid: bool = Field(..., description="OCRの結果が適切か否か。適切な場合はtrue。不適切ならfalse")
     calibrated_string: str = Field(..., description="校正後の文字列")
     calibration_reason: str = Field(default="", description="校正理由")
 
 
-@task
-async def execute_ocr(llm, base64_image: str) -> str:
-    prompt_text = """
+OCR_PROMPT = """
 あなたはOCRを行うAIです。この画像に含まれる文字を抽出してください。
 抽出したいもの:
 - 本文
@@ -47,12 +64,62 @@ async def execute_ocr(llm, base64_image: str) -> str:
 画像から読み取れない場合は理由を記述してください。
 """
 
+BATCH_OCR_PROMPT = """
+あなたはOCRを行うAIです。書籍の複数のページの画像が、ページ番号を添えて順番に与えられます。
+各画像に含まれる文字を、画像ごとに抽出してください。
+抽出したいもの:
+- 本文
+- 章や節のタイトル
+抽出しなくていいもの:
+- 脚注などの注
+- 図や、図中の文章
+- キャプション
+- ページ番号
+画像から読み取れない場合は理由を記述してください。
+"""
+
+CALIBRATION_PROMPT = """
+あなたはOCRの結果の校正を行うAIです。
+このOCRの結果は次のものを対象としています。
+抽出したいもの:
+- 本文
+- 章や節のタイトル
+抽出しなくていいもの:
+- 脚注などの注
+- 図や、図中の文章
+- キャプション
+- ページ番号
+あなたはまず画像から文章を読み取り、その後に受け取った文章と照らし合わせてください。
+適切であればtrueを返してください。
+不適切であれば、校正を行い、その文字列を返してください。その際に校正理由も記述してください。
+OCR結果: {extracted_string}
+"""
+
+
+def build_ocr_cache_key(base64_image: str) -> str:
+    """ページ画像、プロンプト、モデルが同じなら同じキーになる。いずれかが変われば結果は再利用されない"""
+    digest = hashlib.sha256()
+    for part in (base64_image, OCR_PROMPT, BATCH_OCR_PROMPT, CALIBRATION_PROMPT, GEMINI_MODEL):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class OCRWorkflowInput(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+    base64_image: str = Field(..., description="画像")
+    ink_ratio: float = Field(..., description="ページ全体に占める暗いピクセルの割合")
+    llm: ChatGoogleGenerativeAI
+
+
+@task
+async def execute_ocr(llm, base64_image: str) -> OCRResult:
     message = ChatPromptTemplate(
         [
             (
                 "human",
                 [
-                    {"type": "text", "text": prompt_text},
+                    {"type": "text", "text": OCR_PROMPT},
                     {
                         "type": "image",
                         "source_type": "base64",
@@ -65,35 +132,40 @@ async def execute_ocr(llm, base64_image: str) -> str:
     )
 
     chain = message | llm.with_structured_output(OCRResult)
-    result: OCRResult = await chain.ainvoke({})
-    return result.extracted_string
+    async with get_llm_rate_limiter(llm).acquire(tokens=estimate_tokens(OCR_PROMPT) + PAGE_IMAGE_TOKENS):
+        with observe_duration(LLM_CALL_DURATION, call="ocr"):
+            result: OCRResult = await chain.ainvoke({})
+    return result
 
 
 @task
-async def calibrate_result(llm, base64_image: str, extracted_string: str) -> tuple[bool, str]:
-    prompt_text = """
-あなたはOCRの結果の校正を行うAIです。
-このOCRの結果は次のものを対象としています。
-抽出したいもの:
-- 本文
-- 章や節のタイトル
-抽出しなくていいもの:
-- 脚注などの注
-- 図や、図中の文章
-- キャプション
-- ページ番号
-あなたはまず画像から文章を読み取り、その後に受け取った文章と照らし合わせてください。
-適切であればtrueを返してください。
-不適切であれば、校正を行い、その文字列を返してください。その際に校正理由も記述してください。
-OCR結果: {extracted_string}
-"""
+async def execute_batch_ocr(llm, base64_images: list[str]) -> list[OCRResult]:
+    content = [{"type": "text", "text": BATCH_OCR_PROMPT}]
+    for index, base64_image in enumerate(base64_images, start=1):
+        content.append({"type": "text", "text": f"ページ番号: {index}"})
+        content.append({"type": "image", "source_type": "base64", "data": base64_image, "mime_type": "image/png"})
+    message = ChatPromptTemplate([("human", content)])
+
+    chain = message | llm.with_structured_output(BatchOCRResult)
+    tokens = estimate_tokens(BATCH_OCR_PROMPT) + PAGE_IMAGE_TOKENS * len(base64_images)
+    async with get_llm_rate_limiter(llm).acquire(tokens=tokens):
+        with observe_duration(LLM_CALL_DURATION, call="ocr_batch"):
+            result: BatchOCRResult = await chain.ainvoke({})
+
+    results = {page.page_index: page for page in result.pages}
+    if sorted(results) != list(range(1, len(base64_images) + 1)):
+        raise ValueError(f"Batch OCR returned pages {sorted(results)} for {len(base64_images)} images")
+    return [results[index] for index in range(1, len(base64_images) + 1)]
 
+
+@task
+async def calibrate_result(llm, base64_image: str, extracted_string: str) -> tuple[bool, str]:
     message = ChatPromptTemplate(
         [
             (
                 "human",
                 [
-                    {"type": "text", "text": prompt_text},
+                    {"type": "text", "text": CALIBRATION_PROMPT},
                     {
                         "type": "image",
                         "source_type": "base64",
@@ -106,80 +178,363 @@ OCR結果: {extracted_string}
     )
 
     chain = message | llm.with_structured_output(EvaluateResult)
-    result: EvaluateResult = await chain.ainvoke({"extracted_string": extracted_string})
+    tokens = estimate_tokens(CALIBRATION_PROMPT) + estimate_tokens(extracted_string) + PAGE_IMAGE_TOKENS
+    async with get_llm_rate_limiter(llm).acquire(tokens=tokens):
+        with observe_duration(LLM_CALL_DURATION, call="calibrate"):
+            result: EvaluateResult = await chain.ainvoke({"extracted_string": extracted_string})
 
     return result.is_valid, result.calibrated_string if not result.is_valid else extracted_string
 
 
+# 150dpiの本文ページでは、インク1%あたりおよそ100文字になる。大きく外れたページだけを校正する
+MIN_CHARS_PER_INK_PERCENT = 30
+MAX_CHARS_PER_INK_PERCENT = 400
+BLANK_PAGE_INK_RATIO = 0.005
+MAX_UNEXPECTED_CHAR_RATIO = 0.02
+REPEATED_TEXT = re.compile(r"(.{4,}?)\1{4,}", re.DOTALL)
+
+
+def needs_calibration(result: OCRResult, ink_ratio: float) -> bool:
+    """OCRの結果が疑わしいページだけ、校正の呼び出しを行う"""
+    text = result.extracted_string
+    if result.error_reason:
+        return True
+    # 同じ文字列の繰り返しや文字化けは、モデルの出力が崩れている兆候
+    if REPEATED_TEXT.search(text) or unexpected_char_ratio(text) > MAX_UNEXPECTED_CHAR_RATIO:
+        return True
+
+    chars = len("".join(text.split()))
+    ink_percent = ink_ratio * 100
+    if ink_ratio >= BLANK_PAGE_INK_RATIO and chars < ink_percent * MIN_CHARS_PER_INK_PERCENT:
+        return True
+    return chars > max(100, ink_percent * MAX_CHARS_PER_INK_PERCENT)
+
+
 @entrypoint()
-async def ocr_workflow(base64_image: str, llm) -> str:
-    extracted_string = await execute_ocr(llm, base64_image)
-    is_valid, final_string = await calibrate_result(llm, base64_image, extracted_string)
+async def ocr_workflow(inputs: OCRWorkflowInput) -> str:
+    result = await execute_ocr(inputs.llm, inputs.base64_image)
+    if not needs_calibration(result, inputs.ink_ratio):
+        return result.extracted_string
 
+    is_valid, final_string = await calibrate_result(inputs.llm, inputs.base64_image, result.extracted_string)
     return final_string
 
 
-class Page(BaseModel):
+class BatchOCRWorkflowInput(BaseModel):
     model_config = ConfigDict(arbitrary_types_allowed=True)
+    base64_images: list[str] = Field(..., description="ページ順の画像")
+    ink_ratios: list[float] = Field(..., description="画像ごとの暗いピクセルの割合")
+    llm: ChatGoogleGenerativeAI
+
+
+@entrypoint()
+async def batch_ocr_workflow(inputs: BatchOCRWorkflowInput) -> list[str]:
+    results = await execute_batch_ocr(inputs.llm, inputs.base64_images)
+
+    async def finalize(base64_image: str, ink_ratio: float, result: OCRResult) -> str:
+        if not needs_calibration(result, ink_ratio):
+            return result.extracted_string
+        is_valid, final_string = await calibrate_result(inputs.llm, base64_image, result.extracted_string)
+        return final_string
+
+    return list(await asyncio.gather(*map(finalize, inputs.base64_images, inputs.ink_ratios, results)))
+
 
+class Page(BaseModel):
     page_number: int
-    image: Image.Image
+    base64_image: str = ""
+    ink_ratio: float = 0.0
+    text_layer: str | None = Field(default=None, description="OCRの代わりに使える品質のテキストレイヤー")
+
+
+ExtractPagesText = Callable[[Project, list[Page]], Awaitable[list[str]]]
+
+
+class ChapterOCRJob:
+    """章の全ページのOCR結果を集め、最後のページが終わった時点でdoneを完了させる"""
+
+    def __init__(self, project: Project, chapter: Chapter, extract_pages_text: ExtractPagesText):
+        self.project = project
+        self.chapter = chapter
+        self.extract_pages_text = extract_pages_text
+        self.remaining = max(chapter.end_page - chapter.start_page, 0)
+        self.results: list[OCRWorkerResult] = []
+        self.done: asyncio.Future[list[OCRWorkerResult]] = asyncio.get_running_loop().create_future()
+        self._complete_if_finished()
+
+    def _complete_if_finished(self) -> None:
+        if self.remaining == 0 and not self.done.done():
+            self.done.set_result(sorted(self.results, key=lambda x: x.page_number))
+
+    def add_result(self, page_number: int, extracted_text: str) -> None:
+        if self.done.done():
+            return
+        self.results.append(
+            OCRWorkerResult(chapter_id=self.chapter.id, page_number=page_number, extracted_text=extracted_text)
+        )
+        self.remaining -= 1
+        self._complete_if_finished()
+
+    def skip_page(self) -> None:
+        self.remaining -= 1
+        self._complete_if_finished()
+
+    def fail(self, error: BaseException) -> None:
+        if not self.done.done():
+            self.done.set_exception(error)
+
+
+class OCRPagePool:
+    """プロセス内で処理中の全ての章が共有するページのキューと、それを処理するワーカー。
+
+    章ごとのリクエストが同時に届いても、OCRのワーカー数とキューに溜まるページ数はプロセス全体で一定に保たれる。
+    """
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue[tuple[ChapterOCRJob, Page]] | None = None
+        self.workers: list[asyncio.Task] = []
+        self.active_jobs = 0
+        # キューからページを受け取るワーカーを1つに絞り、空いているワーカーにページが1枚ずつ分散しないようにする
+        self.collecting = asyncio.Lock()
+
+    async def _extract_jobs_pages(self, items: list[tuple[ChapterOCRJob, Page]]) -> None:
+        job = items[0][0]
+        try:
+            texts = await job.extract_pages_text(job.project, [page for _, page in items])
+        except Exception as e:
+            for job, _ in items:
+                job.fail(e)
+            return
+
+        for (job, page), extracted_text in zip(items, texts):
+            job.add_result(page.page_number, extracted_text)
+
+    async def _collect_pages(
+        self, queue: asyncio.Queue[tuple[ChapterOCRJob, Page]]
+    ) -> list[tuple[ChapterOCRJob, Page]]:
+        """章をまたいでOCR_BATCH_SIZEまでページを集める。揃わなくてもOCR_BATCH_WAIT_SECONDSが過ぎたら返す"""
+        async with self.collecting:
+            items = [await queue.get()]
+            try:
+                async with asyncio.timeout(OCR_BATCH_WAIT_SECONDS):
+                    while len(items) < OCR_BATCH_SIZE:
+                        items.append(await queue.get())
+            except TimeoutError:
+                pass
+            return items
+
+    async def _consume_pages(self, queue: asyncio.Queue[tuple[ChapterOCRJob, Page]]):
+        while True:
+            items = await self._collect_pages(queue)
+
+            # 失敗した章の残りのページは処理しない
+            groups: dict[tuple[ExtractPagesText, str], list[tuple[ChapterOCRJob, Page]]] = {}
+            for job, page in items:
+                if not job.done.done():
+                    groups.setdefault((job.extract_pages_text, job.project.filename), []).append((job, page))
+            for group in groups.values():
+                await self._extract_jobs_pages(group)
+
+    @asynccontextmanager
+    async def attach(self) -> AsyncIterator[asyncio.Queue[tuple[ChapterOCRJob, Page]]]:
+        """処理中の章がある間だけワーカーを動かす"""
+        if self.active_jobs == 0:
+            self.queue = asyncio.Queue(maxsize=OCR_PAGE_QUEUE_SIZE)
+            self.workers = [asyncio.create_task(self._consume_pages(self.queue)) for _ in range(OCR_PAGE_WORKERS)]
+        self.active_jobs += 1
+        try:
+            yield self.queue
+        finally:
+            self.active_jobs -= 1
+            if self.active_jobs == 0:
+                # 止めるのを待つ間に次の章が始まると新しいワーカーが作られるので、待つ前に手放しておく
+                workers, self.workers, self.queue = self.workers, [], None
+                for worker in workers:
+                    worker.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+
+
+_ocr_page_pool: OCRPagePool | None = None
+
+
+def get_ocr_page_pool() -> OCRPagePool:
+    global _ocr_page_pool
+    if _ocr_page_pool is None or _ocr_page_pool.loop is not asyncio.get_running_loop():
+        _ocr_page_pool = OCRPagePool()
+    return _ocr_page_pool
 
 
 class OCRService:
     def __init__(self, chapter_service: ChapterService):
-        self.semaphore = asyncio.Semaphore(10)
         self.chapter_service = chapter_service
 
     @staticmethod
-    def image_to_base64_png(image: Image.Image) -> str:
-        with io.BytesIO() as buf:
-            image.save(buf, format="PNG")
-            return base64.b64encode(buf.getvalue()).decode()
-
-    async def _extract(self, image: Image.Image) -> str:
-        base64_image = self.image_to_base64_png(image)
-        llm = ChatGoogleGenerativeAI(model=GEMINI_MODEL, google_api_key=GEMINI_API_KEY, temperature=0.01)
-        response = await ocr_workflow.ainvoke(
-            {"base64_image": base64_image, "llm": llm}, config={"run_name": "OCRAgent"}
-        )
-        return response
+    def _load_cache(cache_key: str) -> str | None:
+        if OCRCacheFileService.download_from_gcs(cache_key) is None:
+            return None
+        return OCRCacheFileService.read(cache_key)
 
-    async def _extract_page_text(self, project: Project, chapter: Chapter, page: Page) -> OCRWorkerResult:
-        async with self.semaphore:
-            extracted_text = await self._extract(page.image)
+    @staticmethod
+    def _save_cache(cache_key: str, extracted_text: str) -> None:
+        cache_path = OCRCacheFileService.write(cache_key, extracted_text)
+        OCRCacheFileService.upload_gcs_from_file(cache_path)
+
+    async def _extract(self, base64_image: str, ink_ratio: float) -> str:
+        llm = get_gemini_chat_model(GEMINI_MODEL, temperature=0.01)
+        async with get_adaptive_limiter("ocr").acquire():
+            return await ocr_workflow.ainvoke(
+                OCRWorkflowInput(base64_image=base64_image, ink_ratio=ink_ratio, llm=llm),
+                config={"run_name": "OCRAgent"},
+            )
 
-        return OCRWorkerResult(chapter_id=chapter.id, page_number=page.page_number, extracted_text=extracted_text)
+    async def _extract_batch(self, pages: list[Page]) -> list[str]:
+        """複数ページを1回のリクエストでOCRする。まとめたリクエストが失敗した場合は1ページずつOCRする"""
+        if len(pages) == 1:
+            return [await self._extract(pages[0].base64_image, pages[0].ink_ratio)]
+
+        llm = get_gemini_chat_model(GEMINI_MODEL, temperature=0.01)
+        try:
+            async with get_adaptive_limiter("ocr").acquire():
+                return await batch_ocr_workflow.ainvoke(
+                    BatchOCRWorkflowInput(
+                        base64_images=[page.base64_image for page in pages],
+                        ink_ratios=[page.ink_ratio for page in pages],
+                        llm=llm,
+                    ),
+                    config={"run_name": "BatchOCRAgent"},
+                )
+        except Exception:
+            logger.warning(f"Batch OCR failed for {len(pages)} pages, falling back to single pages")
+            logger.warning(traceback.format_exc())
+            return list(await asyncio.gather(*[self._extract(page.base64_image, page.ink_ratio) for page in pages]))
 
-    async def _extract_chapter_text(self, project: Project, chapter: Chapter, pages: list[Page]):
-        tasks = []
+    async def _extract_pages_text(self, project: Project, pages: list[Page]) -> list[str]:
+        texts: dict[int, str] = {}
         for page in pages:
-            tasks.append(self._extract_page_text(project, chapter, page))
+            if page.text_layer is not None:
+                OCR_PAGES.labels(source="text_layer").inc()
+                texts[page.page_number] = page.text_layer
+
+        # OCRの結果はページ画像のハッシュをキーに保存する。再実行時は保存済みの同じ画像を描画するので、
+        # 完了済みのページはこのキャッシュから読まれ、他の書籍と同じページもOCRを省略できる
+        pending = [page for page in pages if page.page_number not in texts]
+        cache_keys = {page.page_number: build_ocr_cache_key(page.base64_image) for page in pending}
+        cached_texts = await asyncio.gather(
+            *[asyncio.to_thread(self._load_cache, cache_keys[page.page_number]) for page in pending]
+        )
+        for page, extracted_text in zip(pending, cached_texts):
+            if extracted_text is not None:
+                OCR_PAGES.labels(source="cache").inc()
+                CACHE_REQUESTS.labels(cache="ocr", result="hit").inc()
+                logger.info(f"Skipping OCR for page {page.page_number} (cached result found): {project.filename}")
+                texts[page.page_number] = extracted_text
+
+        pending = [page for page in pending if page.page_number not in texts]
+        if pending:
+            OCR_PAGES.labels(source="vision").inc(len(pending))
+            CACHE_REQUESTS.labels(cache="ocr", result="miss").inc(len(pending))
+            extracted_texts = await self._extract_batch(pending)
+            await asyncio.gather(
+                *[
+                    asyncio.to_thread(self._save_cache, cache_keys[page.page_number], extracted_text)
+                    for page, extracted_text in zip(pending, extracted_texts)
+                ]
+            )
+            for page, extracted_text in zip(pending, extracted_texts):
+                texts[page.page_number] = extracted_text
 
-        logger.info(f"Starting OCR for chapter: {str(chapter)} with {len(tasks)} pages")
-        results = await asyncio.gather(*tasks)
+        return [texts[page.page_number] for page in pages]
+
+    @staticmethod
+    def _extract_text_layers(book_path: pathlib.Path, chapter: Chapter) -> dict[int, str]:
+        if chapter.end_page <= chapter.start_page:
+            return {}
+        try:
+            text_layers = extract_text_layers(book_path, chapter.start_page, chapter.end_page - 1)
+        except Exception:
+            logger.warning(f"Failed to extract text layer, falling back to OCR: {book_path}")
+            return {}
+        return {chapter.start_page + i: text for i, text in enumerate(text_layers) if is_usable_text_layer(text)}
+
+    async def _render_pages(
+        self,
+        page_store: PageStore,
+        book_path: pathlib.Path,
+        job: ChapterOCRJob,
+        queue: asyncio.Queue[tuple[ChapterOCRJob, Page]],
+    ):
+        chapter = job.chapter
+        try:
+            # テキストレイヤーの品質が十分なページは、描画もOCRもしない
+            text_layers = await asyncio.to_thread(self._extract_text_layers, book_path, chapter)
+            logger.info(f"Using text layer for {len(text_layers)} pages of chapter: {str(chapter)}")
+
+            # キューが埋まっている間は描画を止めるので、章の長さに関わらずメモリ上のページ数は一定に保たれる
+            for page_number in range(chapter.start_page, chapter.end_page):
+                if page_number in text_layers:
+                    await queue.put((job, Page(page_number=page_number, text_layer=text_layers[page_number])))
+                    continue
+                rendered_page = await page_store.get_page(page_number)
+                if rendered_page is None:
+                    job.skip_page()
+                    continue
+                page = Page(
+                    page_number=page_number,
+                    base64_image=rendered_page.base64_image,
+                    ink_ratio=rendered_page.ink_ratio,
+                )
+                await queue.put((job, page))
+        except Exception as e:
+            job.fail(e)
+
+    async def _extract_chapter_text(self, project: Project, chapter: Chapter, book_path: pathlib.Path):
+        logger.info(f"Starting OCR for chapter: {str(chapter)} with {chapter.end_page - chapter.start_page} pages")
+
+        job = ChapterOCRJob(project, chapter, self._extract_pages_text)
+        page_store = PageStore(project.filename, book_path)
+        async with get_ocr_page_pool().attach() as queue:
+            producer = asyncio.create_task(self._render_pages(page_store, book_path, job, queue))
+            try:
+                results = await job.done
+            finally:
+                producer.cancel()
+                await asyncio.gather(producer, return_exceptions=True)
 
-        results.sort(key=lambda x: x.page_number)
         chapter.status = ChapterStatus.ocr_completed
         chapter.extracted_text = "\n".join([result.extracted_text for result in results])
         self.chapter_service.update(chapter)
         logger.info(f"OCR completed for chapter: {str(chapter)}")
 
     async def _process(self, project: Project, chapters: list[Chapter], book_path: pathlib.Path):
+        targets = []
         for chapter in chapters:
             if chapter.status == ChapterStatus.start_ocr:
-                images = convert_from_path(
-                    book_path, first_page=chapter.start_page, last_page=chapter.end_page - 1, dpi=150, fmt="RGB"
-                )
-                pages = [Page(page_number=chapter.start_page + i, image=images[i]) for i in range(len(images))]
-                await self._extract_chapter_text(project, chapter, pages)
+                targets.append(chapter)
             else:
                 logger.info(f"Skipping OCR for chapter (already completed): {str(chapter)}")
 
+        # 全ての章のページをプロセスで共有するキューで処理し、短い章が続いてもワーカーを遊ばせない
+        try:
+            async with asyncio.TaskGroup() as task_group:
+                for chapter in targets:
+                    task_group.create_task(self._extract_chapter_text(project, chapter, book_path))
+        except ExceptionGroup as e:
+            raise e.exceptions[0]
+
+    @staticmethod
+    async def _download_book(project: Project) -> pathlib.Path:
+        # 章ごとのリクエストが同じPDFを読むので、ダウンロード済みであれば使い回す
+        return await asyncio.to_thread(PageStore(project.filename).get_book_path)
+
+    async def process_chapter(self, project: Project, chapter: Chapter):
+        book_path = await self._download_book(project)
+        await self._process(project, [chapter], book_path)
+
     async def process(self, project: Project, chapters: list[Chapter]):
         logger.info(f"Starting OCR: {project.filename}")
 
-        book_path = OCRImageFileService.download_from_gcs(project.filename)
+        book_path = await self._download_book(project)
         await self._process(project, chapters, book_path)
 
         logger.info(f"Completed OCR: {project.filename}")
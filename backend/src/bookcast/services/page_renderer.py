@@ -0,0 +1,76 @@
+import base64
+import io
+import multiprocessing
+import os
+import pathlib
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from pdf2image import convert_from_path, pdfinfo_from_path
+from PIL import Image
+from pydantic import BaseModel, Field
+
+from bookcast.config import RENDER_PROCESS_WORKERS
+
+RENDER_DPI = 150
+# グレースケールでこの値より暗いピクセルを、文字や図のインクとして数える
+INK_THRESHOLD = 128
+
+
+class RenderedPage(BaseModel):
+    base64_image: str = Field(..., description="PNGをbase64でエンコードした文字列")
+    ink_ratio: float = Field(..., description="ページ全体に占める暗いピクセルの割合")
+
+
+def image_to_base64_png(image: Image.Image) -> str:
+    with io.BytesIO() as buf:
+        image.save(buf, format="PNG")
+        return base64.b64encode(buf.getvalue()).decode()
+
+
+def measure_ink_ratio(image: Image.Image) -> float:
+    histogram = image.convert("L").histogram()
+    return sum(histogram[:INK_THRESHOLD]) / sum(histogram)
+
+
+def render_page_to_file(book_path: str, page_number: int, dpi: int, output_path: str) -> RenderedPage | None:
+    """1ページを描画してPNGとして保存する。ページが存在しない場合はNoneを返す"""
+    images = convert_from_path(book_path, first_page=page_number, last_page=page_number, dpi=dpi, fmt="RGB")
+    if not images:
+        return None
+
+    image = images[0]
+    # 同じページを読み込むリクエストに書きかけのPNGを返さないよう、書き終えてから置き換える
+    temp_path = pathlib.Path(output_path).with_name(f".{pathlib.Path(output_path).name}.{uuid.uuid4().hex}.tmp")
+    try:
+        image.save(temp_path, format="PNG")
+        os.replace(temp_path, output_path)
+    finally:
+        temp_path.unlink(missing_ok=True)
+    return RenderedPage(base64_image=image_to_base64_png(image), ink_ratio=measure_ink_ratio(image))
+
+
+def load_rendered_page(image_path: str) -> RenderedPage:
+    """保存済みのPNGを読み込む。インク量を測るためにデコードが必要なので、プロセスプール内で実行する"""
+    with open(image_path, "rb") as f:
+        data = f.read()
+    with Image.open(io.BytesIO(data)) as image:
+        ink_ratio = measure_ink_ratio(image)
+    return RenderedPage(base64_image=base64.b64encode(data).decode(), ink_ratio=ink_ratio)
+
+
+def count_pages(book_path: pathlib.Path) -> int:
+    return int(pdfinfo_from_path(str(book_path))["Pages"])
+
+
+@lru_cache
+def get_render_pool() -> ProcessPoolExecutor:
+    # asyncioのスレッドやgRPCの状態を子プロセスに引き継がないよう、forkではなくspawnを使う
+    return ProcessPoolExecutor(max_workers=RENDER_PROCESS_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+
+def shutdown_render_pool() -> None:
+    if get_render_pool.cache_info().currsize:
+        get_render_pool().shutdown(cancel_futures=True)
+        get_render_pool.cache_clear()
@@ -0,0 +1,93 @@
+import asyncio
+import pathlib
+from logging import getLogger
+
+from bookcast.metrics import CACHE_REQUESTS
+from bookcast.services.file_service import (
+    OCRImageFileService,
+    PageImageFileService,
+    resolve_book_path,
+    resolve_image_path,
+)
+from bookcast.services.page_renderer import (
+    RENDER_DPI,
+    RenderedPage,
+    count_pages,
+    get_render_pool,
+    load_rendered_page,
+    render_page_to_file,
+)
+from bookcast.services.single_flight import SingleFlight
+
+logger = getLogger(__name__)
+
+# 同じページを同時に要求された場合に、描画を1回にまとめるための実行中の描画
+_rendering: SingleFlight[pathlib.Path, RenderedPage | None] = SingleFlight()
+
+
+class PageStore:
+    """プロジェクトのページ画像を解像度ごとに一度だけ描画し、ローカルとGCSに保存する。
+
+    保存済みのページはpopplerを呼ばずに返す。PDFは描画が必要になったときにだけダウンロードする。
+    """
+
+    def __init__(self, filename: str, book_path: pathlib.Path | None = None):
+        self.filename = filename
+        self.book_path = book_path
+
+    def get_book_path(self) -> pathlib.Path:
+        if self.book_path is None:
+            book_path = resolve_book_path(self.filename)
+            self.book_path = book_path if book_path.exists() else OCRImageFileService.download_from_gcs(self.filename)
+        return self.book_path
+
+    async def count_pages(self) -> int:
+        book_path = await asyncio.to_thread(self.get_book_path)
+        return await asyncio.to_thread(count_pages, book_path)
+
+    async def _render(self, page_number: int, dpi: int, image_path: pathlib.Path) -> RenderedPage | None:
+        book_path = await asyncio.to_thread(self.get_book_path)
+        loop = asyncio.get_running_loop()
+        rendered_page = await loop.run_in_executor(
+            get_render_pool(), render_page_to_file, str(book_path), page_number, dpi, str(image_path)
+        )
+        if rendered_page is not None:
+            await asyncio.to_thread(PageImageFileService.upload_gcs_from_file, image_path)
+        return rendered_page
+
+    async def _render_once(self, page_number: int, dpi: int, image_path: pathlib.Path) -> RenderedPage | None:
+        return await _rendering.run(image_path, lambda: self._render(page_number, dpi, image_path))
+
+    async def _find_saved_page(self, page_number: int, dpi: int) -> pathlib.Path | None:
+        """保存済みのページ画像のパスを返す。描画中のページは描画の完了を待つので、保存済みとみなさない"""
+        if resolve_image_path(self.filename, page_number, dpi) not in _rendering:
+            image_path = await asyncio.to_thread(
+                PageImageFileService.download_from_gcs, self.filename, page_number, dpi
+            )
+            if image_path is not None:
+                CACHE_REQUESTS.labels(cache="page_image", result="hit").inc()
+                return image_path
+
+        CACHE_REQUESTS.labels(cache="page_image", result="miss").inc()
+        return None
+
+    async def get_page_path(self, page_number: int, dpi: int = RENDER_DPI) -> pathlib.Path | None:
+        """ページ画像のパスを返す。未描画であれば描画して保存する。ページが存在しない場合はNone"""
+        image_path = await self._find_saved_page(page_number, dpi)
+        if image_path is not None:
+            return image_path
+
+        image_path = PageImageFileService.build_path(self.filename, page_number, dpi)
+        if await self._render_once(page_number, dpi, image_path) is None:
+            return None
+        return image_path
+
+    async def get_page(self, page_number: int, dpi: int = RENDER_DPI) -> RenderedPage | None:
+        """ページ画像をbase64のPNGとインク量として返す。ページが存在しない場合はNone"""
+        image_path = await self._find_saved_page(page_number, dpi)
+        if image_path is not None:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(get_render_pool(), load_rendered_page, str(image_path))
+
+        image_path = PageImageFileService.build_path(self.filename, page_number, dpi)
+        return await self._render_once(page_number, dpi, image_path)
@@ -0,0 +1,48 @@
+import pathlib
+import subprocess
+import xml.etree.ElementTree as ET
+
+from pydantic import BaseModel, Field
+
+
+class OutlineItem(BaseModel):
+    page_number: int = Field(..., description="PDFの物理ページ番号（1始まり）")
+    title: str
+
+
+def _select_chapter_level(outline: ET.Element) -> list[ET.Element]:
+    items = outline.findall("item")
+    nested = outline.findall("outline")
+    # 最上位に書名だけがある場合は、その下の階層を章とみなす
+    if len(items) <= 1 and len(nested) == 1:
+        return _select_chapter_level(nested[0])
+    return items
+
+
+def parse_outline(xml: str) -> list[OutlineItem]:
+    """pdftohtml -xmlの出力から、章にあたる階層のしおりを取り出す"""
+    start = xml.find("<outline>")
+    end = xml.rfind("</outline>")
+    if start == -1 or end == -1:
+        return []
+
+    # ページ本文は不正なXMLを含むことがあるので、しおりの部分だけを解析する
+    outline = ET.fromstring(xml[start : end + len("</outline>")])
+    results = []
+    for item in _select_chapter_level(outline):
+        title = " ".join("".join(item.itertext()).split())
+        page = item.get("page")
+        if title and page and page.isdigit():
+            results.append(OutlineItem(page_number=int(page), title=title))
+    return results
+
+
+def read_outline(book_path: pathlib.Path) -> list[OutlineItem]:
+    """PDFのしおり（アウトライン）を読む。しおりがないPDFでは空のリストを返す"""
+    # しおりはページの範囲に関わらず出力されるので、本文は1ページ目だけにする
+    result = subprocess.run(
+        ["pdftohtml", "-xml", "-i", "-q", "-stdout", "-enc", "UTF-8", "-f", "1", "-l", "1", str(book_path)],
+        capture_output=True,
+        check=True,
+    )
+    return parse_outline(result.stdout.decode("utf-8", errors="replace"))
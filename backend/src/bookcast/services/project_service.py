@@ -3,9 +3,18 @@ import pathlib
 import zipfile
 from typing import BinaryIO, Generator
 
-from bookcast.entities import Chapter, Project, ProjectStatus
+from bookcast.entities import Chapter, ChapterStatus, Project, ProjectStatus, TableOfContents
+from bookcast.metrics import CACHE_REQUESTS
 from bookcast.repositories import ChapterRepository, ProjectRepository
+from bookcast.services.chapter_search_service import ChapterSearchService
 from bookcast.services.file_service import CompletedAudioFileService, OCRImageFileService
+from bookcast.services.single_flight import SingleFlight
+
+# 同じプロジェクトの目次抽出が同時に要求された場合に、処理を1回にまとめるための実行中の抽出
+_extracting_table_of_contents: SingleFlight[int, TableOfContents] = SingleFlight()
+
+# プロジェクトのステータスの更新が他のワーカーと競合した場合にやり直す回数
+REFRESH_PROJECT_STATUS_ATTEMPTS = 3
 
 
 def generate_zip(project: Project, chapters: list[Chapter]) -> Generator[bytes, None, None]:
@@ -24,6 +33,15 @@ def generate_zip(project: Project, chapters: list[Chapter]) -> Generator[bytes,
         yield chunk
 
 
+def derive_project_status(chapters: list[Chapter]) -> ProjectStatus:
+    """最も進んでいない章のステータスをプロジェクトのステータスとする。失敗した章があればプロジェクトも失敗とする"""
+    if any(chapter.status == ChapterStatus.failed for chapter in chapters):
+        return ProjectStatus.failed
+    order = list(ChapterStatus)
+    slowest = min((chapter.status for chapter in chapters), key=order.index)
+    return ProjectStatus(slowest.value)
+
+
 class ProjectService:
     def __init__(self, project_repo: ProjectRepository, chapter_repo: ChapterRepository):
         self.project_repo = project_repo
@@ -48,7 +66,42 @@ class ProjectService:
         self.project_repo.update(project)
         return project
 
+    def refresh_project_status(self, project: Project) -> Project:
+        """章のステータスからプロジェクトのステータスを求めて保存する。
+
+        読んだ時点のステータスのままの場合だけ更新し、他のワーカーが先に更新していたら読み直してやり直す。
+        """
+        for _ in range(REFRESH_PROJECT_STATUS_ATTEMPTS):
+            chapters = self.chapter_repo.select_chapter_by_project_id(project.id)
+            if not chapters:
+                return project
+
+            status = derive_project_status(chapters)
+            if project.status == status:
+                return project
+            if self.project_repo.update_status_by_condition(project.id, project.status, status) is not None:
+                project.status = status
+                return project
+
+            project.status = self.project_repo.find(project.id).status
+        return project
+
     def create_download_archive(self, project: Project) -> tuple[Generator[bytes, None, None], str]:
         chapters = self.chapter_repo.select_chapter_by_project_id(project.id)
         filename = f"{pathlib.Path(project.filename).stem}.zip"
         return generate_zip(project, chapters), filename
+
+    async def _extract_table_of_contents(self, project: Project) -> TableOfContents:
+        CACHE_REQUESTS.labels(cache="table_of_contents", result="miss").inc()
+        table_of_contents = await ChapterSearchService().process(project)
+        self.project_repo.update_table_of_contents(project.id, table_of_contents)
+        project.table_of_contents = table_of_contents
+        return table_of_contents
+
+    async def extract_table_of_contents(self, project: Project, refresh: bool = False) -> TableOfContents:
+        """保存済みの目次を返す。未抽出かrefreshが指定された場合は抽出して保存する"""
+        if project.table_of_contents is not None and not refresh:
+            CACHE_REQUESTS.labels(cache="table_of_contents", result="hit").inc()
+            return project.table_of_contents
+
+        return await _extracting_table_of_contents.run(project.id, lambda: self._extract_table_of_contents(project))
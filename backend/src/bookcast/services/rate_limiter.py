@@ -0,0 +1,211 @@
+import asyncio
+import hashlib
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from google.genai.errors import ServerError
+from pydantic import BaseModel
+
+from bookcast import config
+from bookcast.metrics import Gauge, Histogram
+
+RATE_LIMITER_WAIT = Histogram(
+    "bookcast_rate_limiter_wait_seconds",
+    "Time spent waiting for the shared LLM rate limiter.",
+    ("model",),
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0),
+)
+ADAPTIVE_CONCURRENCY_LIMIT = Gauge(
+    "bookcast_adaptive_concurrency_limit",
+    "Current in-flight limit of an adaptive concurrency limiter.",
+    ("name",),
+)
+
+
+class RateLimit(BaseModel):
+    max_concurrency: int
+    requests_per_minute: int
+    tokens_per_minute: int
+
+
+DEFAULT_RATE_LIMIT = RateLimit(**config.DEFAULT_RATE_LIMIT)
+
+MODEL_RATE_LIMITS: dict[str, RateLimit] = {
+    model: RateLimit(**limit) for model, limit in config.MODEL_RATE_LIMITS.items()
+}
+
+
+# 150dpiのページ画像は768x768のタイル4枚程度になり、1タイルあたり258トークン
+PAGE_IMAGE_TOKENS = 258 * 4
+
+
+def estimate_tokens(text: str) -> int:
+    # 日本語は概ね1文字1トークン以下なので、文字数を上限の見積もりとして使う
+    return len(text)
+
+
+class TokenBucket:
+    def __init__(self, capacity: int, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_per_second)
+        self.updated_at = now
+
+    async def take(self, amount: int) -> None:
+        amount = min(amount, self.capacity)
+        async with self.lock:
+            self._refill()
+            while self.tokens < amount:
+                await asyncio.sleep((amount - self.tokens) / self.refill_per_second)
+                self._refill()
+            self.tokens -= amount
+
+
+class RateLimiter:
+    """モデルとAPIキーごとに、同時実行数・RPM・TPMをインスタンス全体で制限する"""
+
+    def __init__(self, model: str, rate_limit: RateLimit):
+        self.model = model
+        self.rate_limit = rate_limit
+        self.semaphore = asyncio.Semaphore(rate_limit.max_concurrency)
+        self.requests = TokenBucket(rate_limit.requests_per_minute, rate_limit.requests_per_minute / 60)
+        self.tokens = TokenBucket(rate_limit.tokens_per_minute, rate_limit.tokens_per_minute / 60)
+        self.loop = asyncio.get_running_loop()
+
+    @asynccontextmanager
+    async def acquire(self, tokens: int = 0) -> AsyncIterator[None]:
+        start_time = time.perf_counter()
+        async with self.semaphore:
+            await self.requests.take(1)
+            if tokens:
+                await self.tokens.take(tokens)
+            RATE_LIMITER_WAIT.labels(model=self.model).observe(time.perf_counter() - start_time)
+            yield
+
+
+_rate_limiters: dict[tuple[str, str], RateLimiter] = {}
+
+
+def _hash_api_key(api_key: str | None) -> str:
+    return hashlib.sha256((api_key or "").encode()).hexdigest()[:16]
+
+
+def get_rate_limiter(model: str, api_key: str | None) -> RateLimiter:
+    key = (model, _hash_api_key(api_key))
+    rate_limiter = _rate_limiters.get(key)
+    # asyncioのプリミティブはイベントループに紐づくため、ループが変わった場合は作り直す
+    if rate_limiter is None or rate_limiter.loop is not asyncio.get_running_loop():
+        rate_limiter = RateLimiter(model, MODEL_RATE_LIMITS.get(model, DEFAULT_RATE_LIMIT))
+        _rate_limiters[key] = rate_limiter
+    return rate_limiter
+
+
+def get_llm_rate_limiter(llm) -> RateLimiter:
+    """LangChainのチャットモデルから、対応するRateLimiterを取得する"""
+    model = getattr(llm, "model_name", None) or llm.model
+    api_key = getattr(llm, "google_api_key", None) or getattr(llm, "openai_api_key", None)
+    return get_rate_limiter(model, api_key.get_secret_value() if api_key else None)
+
+
+def is_overload_error(error: BaseException) -> bool:
+    if isinstance(error, ServerError):
+        return True
+    for attribute in ("code", "status_code"):
+        if getattr(error, attribute, None) == 429:
+            return True
+    return "429" in str(error) or "RESOURCE_EXHAUSTED" in str(error)
+
+
+class AdaptiveConcurrencyLimit(BaseModel):
+    initial_limit: int
+    min_limit: int
+    max_limit: int
+
+
+ADAPTIVE_CONCURRENCY_LIMITS: dict[str, AdaptiveConcurrencyLimit] = {
+    "ocr": AdaptiveConcurrencyLimit(initial_limit=10, min_limit=2, max_limit=32),
+    "tts": AdaptiveConcurrencyLimit(initial_limit=3, min_limit=1, max_limit=16),
+}
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMDで同時実行数を調整する。
+
+    レイテンシが最小値のlatency_tolerance倍以内で成功している間は上限を少しずつ増やし、
+    ServerErrorや429を受けたら上限をbackoff_ratio倍に下げる。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        limit: AdaptiveConcurrencyLimit,
+        backoff_ratio: float = 0.5,
+        latency_tolerance: float = 2.0,
+    ):
+        self.name = name
+        self.min_limit = limit.min_limit
+        self.max_limit = limit.max_limit
+        self.limit = float(limit.initial_limit)
+        self.backoff_ratio = backoff_ratio
+        self.latency_tolerance = latency_tolerance
+        self.in_flight = 0
+        self.min_latency: float | None = None
+        self.decreased_at = 0.0
+        self.condition = asyncio.Condition()
+        self.loop = asyncio.get_running_loop()
+        ADAPTIVE_CONCURRENCY_LIMIT.labels(name=name).set(int(self.limit))
+
+    def _set_limit(self, limit: float) -> None:
+        self.limit = min(self.max_limit, max(self.min_limit, limit))
+        ADAPTIVE_CONCURRENCY_LIMIT.labels(name=self.name).set(int(self.limit))
+
+    def _on_success(self, latency: float) -> None:
+        if self.min_latency is None or latency < self.min_latency:
+            self.min_latency = latency
+        if latency <= self.min_latency * self.latency_tolerance:
+            self._set_limit(self.limit + 1 / self.limit)
+
+    def _on_overload(self, started_at: float) -> None:
+        # 前回下げた後に送られたリクエストの失敗だけで下げる。同時に失敗したリクエストで何度も下げないため
+        if started_at < self.decreased_at:
+            return
+        self.decreased_at = time.monotonic()
+        self._set_limit(self.limit * self.backoff_ratio)
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[None]:
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+        started_at = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            if is_overload_error(e):
+                self._on_overload(started_at)
+            raise
+        else:
+            self._on_success(time.monotonic() - started_at)
+        finally:
+            async with self.condition:
+                self.in_flight -= 1
+                self.condition.notify_all()
+
+
+_adaptive_limiters: dict[str, AdaptiveConcurrencyLimiter] = {}
+
+
+def get_adaptive_limiter(name: str) -> AdaptiveConcurrencyLimiter:
+    limiter = _adaptive_limiters.get(name)
+    if limiter is None or limiter.loop is not asyncio.get_running_loop():
+        limiter = AdaptiveConcurrencyLimiter(name, ADAPTIVE_CONCURRENCY_LIMITS[name])
+        _adaptive_limiters[name] = limiter
+    return limiter
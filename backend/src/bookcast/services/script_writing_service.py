@@ -1,8 +1,11 @@
 import asyncio
+import hashlib
+import re
+from contextvars import ContextVar
 from logging import getLogger
-from typing import List
+from typing import Awaitable, Callable, List
 
-from langchain_core.output_parsers import StrOutputParser
+from langchain_core.messages import AIMessage
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables.config import RunnableConfig
 from langchain_google_genai import ChatGoogleGenerativeAI
@@ -10,12 +13,21 @@ from langchain_openai import ChatOpenAI
 from langgraph.func import entrypoint, task
 from pydantic import BaseModel, ConfigDict, Field
 
-from bookcast.config import GEMINI_API_KEY
+from bookcast.config import SCRIPT_SECTION_CHARS, TTS_PREFETCH
 from bookcast.entities import Chapter, ChapterStatus, Project
+from bookcast.metrics import LLM_CALL_DURATION, LLM_PROMPT_TOKENS, SCRIPT_PROMPT_CACHE_HIT_RATIO, observe_duration
 from bookcast.services.chapter_service import ChapterService
+from bookcast.services.llm_cache import cached_llm_response
+from bookcast.services.llm_registry import get_gemini_chat_model, get_openai_chat_model
+from bookcast.services.rate_limiter import estimate_tokens, get_llm_rate_limiter
+from bookcast.services.text_to_speach_service import TextToSpeechService
 
 logger = getLogger(__name__)
 MAX_RETRY_COUNT = 3
+# つなぎの会話を作るときに渡す、前後の節の台本の行数
+TRANSITION_CONTEXT_LINES = 8
+
+HEADING_LINE = re.compile(r"^\s*(第[0-9０-９一二三四五六七八九十百]+[章節]|[0-9０-９]+(\.[0-9０-９]+)+\s|[■●◆§])")
 
 
 class PodcastTopic(BaseModel):
@@ -38,26 +50,83 @@ class ScriptWritingWorkflowInput(BaseModel):
     gemini_light_model: ChatGoogleGenerativeAI
     gemini_heavy_model: ChatGoogleGenerativeAI
     openai_model: ChatOpenAI
+    # 確定した台本の部分を、台本の順に受け取るコールバック
+    on_segment: Callable[[str], Awaitable[None]] | None = None
+    # Falseにすると保存済みの応答を使わず、LLMを呼び直す
+    use_cache: bool = True
 
 
-@task
-async def search_topics(llm, source_text: str) -> List[PodcastTopic]:
-    prompt_text = """
+class PromptCacheStats:
+    """章ごとに、入力トークンのうちプロバイダーのプロンプトキャッシュから読まれた数を数える"""
+
+    def __init__(self):
+        self.input_tokens = 0
+        self.cached_tokens = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        return self.cached_tokens / self.input_tokens if self.input_tokens else 0.0
+
+
+_prompt_cache_stats: ContextVar[PromptCacheStats | None] = ContextVar("prompt_cache_stats", default=None)
+
+
+def record_prompt_usage(call: str, response: AIMessage) -> None:
+    usage = response.usage_metadata or {}
+    input_tokens = usage.get("input_tokens", 0)
+    cached_tokens = (usage.get("input_token_details") or {}).get("cache_read") or 0
+    LLM_PROMPT_TOKENS.labels(call=call, cache="hit").inc(cached_tokens)
+    LLM_PROMPT_TOKENS.labels(call=call, cache="miss").inc(input_tokens - cached_tokens)
+
+    stats = _prompt_cache_stats.get()
+    if stats is not None:
+        stats.input_tokens += input_tokens
+        stats.cached_tokens += cached_tokens
+
+
+def _parse_structured_output(call: str, result: dict):
+    record_prompt_usage(call, result["raw"])
+    if result["parsing_error"] is not None:
+        raise result["parsing_error"]
+    return result["parsed"]
+
+
+def _with_prompt_cache_key(llm, source_text: str):
+    # OpenAIは同じキーのリクエストを同じサーバーに送るので、同じ文章での再試行がキャッシュに当たりやすくなる
+    if isinstance(llm, ChatOpenAI):
+        return llm.bind(prompt_cache_key=f"script:{hashlib.sha256(source_text.encode()).hexdigest()[:32]}")
+    return llm
+
+
+SEARCH_TOPICS_PROMPT = """
 あなたはトピックを抽出する専門家です。
 次の文章を元にして、ポッドキャストの台本を作成しようとしています。
 文章を読んで、3から5つのトピックを抽出してください。
 source_text:{source_text}
 """
 
+
+@task
+async def search_topics(llm, source_text: str, use_cache: bool = True) -> List[PodcastTopic]:
     message = ChatPromptTemplate(
         [
-            ("human", prompt_text),
+            ("human", SEARCH_TOPICS_PROMPT),
         ]
     )
-
-    chain = message | llm.with_structured_output(TopicSearchResult)
-    result = await chain.ainvoke({"source_text": source_text})
-    return result.topics
+    prompt = message.invoke({"source_text": source_text})
+
+    async def generate() -> str:
+        chain = llm.with_structured_output(TopicSearchResult, include_raw=True)
+        tokens = estimate_tokens(SEARCH_TOPICS_PROMPT) + estimate_tokens(source_text)
+        async with get_llm_rate_limiter(llm).acquire(tokens=tokens):
+            with observe_duration(LLM_CALL_DURATION, call="topics"):
+                result = await chain.ainvoke(prompt)
+        return _parse_structured_output("topics", result).model_dump_json()
+
+    response = await cached_llm_response(
+        "topics", llm, prompt, generate, output=TopicSearchResult.__name__, use_cache=use_cache
+    )
+    return TopicSearchResult.model_validate_json(response).topics
 
 
 def _format_topics(topics: List[PodcastTopic]) -> str:
@@ -81,10 +150,7 @@ RULES = """
 - 出力の形式は下記のようにしてください。
 """
 
-
-@task
-async def write_script(llm, source_text: str, topics: List[PodcastTopic], feedback_messages: List[str] = None) -> str:
-    system_prompt = f"""
+WRITE_SCRIPT_PROMPT = f"""
 あなたはポッドキャストの台本を作成する専門家です。
 今回扱う内容は難しいですが、視聴者は専門知識を持っているため、難しいまま理解できます。
 与えられた文章をなるべく端折らず、会話で掘り下げていく形で台本を作成してください。
@@ -94,38 +160,92 @@ async def write_script(llm, source_text: str, topics: List[PodcastTopic], feedba
 Speaker1: こんにちは。今日はいい天気ですね。
 Speaker2: 本当ですね。ちょっと暑いくらいですね。
 """
+
+EVALUATE_SCRIPT_PROMPT = f"""
+あなたはポッドキャストの台本を評価する専門家です。
+次の台本を読んで、以下のルールを守れているか評価してください。
+{RULES}
+適切であればtrueを返してください。
+不適切であれば、次に活かせるように必ずフィードバックを返してください。フィードバックは必ず日本語で返してください。
+またフィードバックには必ず具体例を入れるようにしてください。
+"""
+
+
+@task
+async def write_script(
+    llm,
+    source_text: str,
+    topics: List[PodcastTopic],
+    feedback_messages: List[str] = None,
+    use_cache: bool = True,
+) -> str:
+    # 再試行しても変わらない指示、トピック、文章を先頭に置き、プロバイダーのプロンプトキャッシュに載せる。
+    # フィードバックは再試行ごとに変わるので最後に付ける
+    messages = [
+        ("system", WRITE_SCRIPT_PROMPT),
+        ("human", "トピック: {topics}\n文章: {source_text}"),
+    ]
     if feedback_messages:
-        system_prompt += f"フィードバック: {', '.join(feedback_messages)}"
+        messages.append(("human", "フィードバック: {feedback}"))
 
-    formated_topics = _format_topics(topics)
-    prompt_text = f"トピック: {formated_topics}\n文章: {{source_text}}"
+    message = ChatPromptTemplate(messages)
+    inputs = {
+        "topics": _format_topics(topics),
+        "source_text": source_text,
+        "feedback": ", ".join(feedback_messages or []),
+    }
 
-    message = ChatPromptTemplate(
-        [
-            ("system", system_prompt),
-            ("human", prompt_text),
-        ]
-    )
+    prompt = message.invoke(inputs)
+
+    async def generate() -> str:
+        tokens = sum(estimate_tokens(text) for text in (WRITE_SCRIPT_PROMPT, *inputs.values()))
+        async with get_llm_rate_limiter(llm).acquire(tokens=tokens):
+            with observe_duration(LLM_CALL_DURATION, call="write"):
+                response = await _with_prompt_cache_key(llm, source_text).ainvoke(prompt)
+        record_prompt_usage("write", response)
+        return response.text
 
-    chain = message | llm | StrOutputParser()
-    return await chain.ainvoke({"source_text": source_text})
+    return await cached_llm_response("write", llm, prompt, generate, use_cache=use_cache)
 
 
 @task
-async def evaluate_script(llm, script: str, topics: List[PodcastTopic]) -> EvaluateResult:
+async def evaluate_script(llm, script: str, topics: List[PodcastTopic], use_cache: bool = True) -> EvaluateResult:
     if not script:
         return EvaluateResult(is_valid=False, feedback_message="台本がありません。作成してください。")
 
+    # ルールとトピックを先頭に、毎回変わる台本を最後に置く
+    message = ChatPromptTemplate(
+        [
+            ("system", EVALUATE_SCRIPT_PROMPT),
+            ("human", "トピック: {topics}\n台本: {script}"),
+        ]
+    )
     topics_formatted = _format_topics(topics)
-    prompt_text = f"""
-あなたはポッドキャストの台本を評価する専門家です。
-次の台本を読んで、以下のルールを守れているか評価してください。
-{RULES}
-適切であればtrueを返してください。
-不適切であれば、次に活かせるように必ずフィードバックを返してください。フィードバックは必ず日本語で返してください。
-またフィードバックには必ず具体例を入れるようにしてください。
-トピック: {topics_formatted}
-台本: {script}
+    prompt = message.invoke({"topics": topics_formatted, "script": script})
+
+    async def generate() -> str:
+        chain = llm.with_structured_output(EvaluateResult, include_raw=True)
+        tokens = estimate_tokens(EVALUATE_SCRIPT_PROMPT) + estimate_tokens(topics_formatted) + estimate_tokens(script)
+        async with get_llm_rate_limiter(llm).acquire(tokens=tokens):
+            with observe_duration(LLM_CALL_DURATION, call="evaluate"):
+                result = await chain.ainvoke(prompt)
+        return _parse_structured_output("evaluate", result).model_dump_json()
+
+    response = await cached_llm_response(
+        "evaluate", llm, prompt, generate, output=EvaluateResult.__name__, use_cache=use_cache
+    )
+    return EvaluateResult.model_validate_json(response)
+
+
+@task
+async def write_transition(llm, previous_script: str, next_script: str, use_cache: bool = True) -> str:
+    prompt_text = """
+あなたはポッドキャストの台本を編集する専門家です。
+別々に作成した2つの台本をつなげます。前の台本の終わりから次の台本の始まりへ自然に話題が移るように、
+2から4行のつなぎの会話だけを作成してください。挨拶や締めの言葉は入れないでください。
+出力の形式は前後の台本と同じく「Speaker1: 」「Speaker2: 」で始まる行にしてください。
+前の台本の終わり: {previous_script}
+次の台本の始まり: {next_script}
 """
 
     message = ChatPromptTemplate(
@@ -134,21 +254,53 @@ async def evaluate_script(llm, script: str, topics: List[PodcastTopic]) -> Evalu
         ]
     )
 
-    chain = message | llm.with_structured_output(EvaluateResult)
-    return await chain.ainvoke({"script": script})
+    prompt = message.invoke({"previous_script": previous_script, "next_script": next_script})
 
+    async def generate() -> str:
+        tokens = estimate_tokens(prompt_text) + estimate_tokens(previous_script) + estimate_tokens(next_script)
+        async with get_llm_rate_limiter(llm).acquire(tokens=tokens):
+            with observe_duration(LLM_CALL_DURATION, call="transition"):
+                response = await llm.ainvoke(prompt)
+        record_prompt_usage("transition", response)
+        return response.text
 
-@entrypoint()
-async def script_writing_workflow(inputs: ScriptWritingWorkflowInput) -> str:
-    topics = await search_topics(inputs.gemini_light_model, inputs.source_text)
+    return await cached_llm_response("transition", llm, prompt, generate, use_cache=use_cache)
+
+
+def split_sections(source_text: str, max_chars: int) -> list[str]:
+    """長い章を、見出しの位置を優先してmax_chars以下の節に分ける。短い章はそのまま返す"""
+    if len(source_text) <= max_chars:
+        return [source_text]
+
+    sections = []
+    lines: list[str] = []
+    length = 0
+    for line in source_text.splitlines():
+        # 上限を超える前か、節が半分以上埋まった後の見出しの前で区切る
+        is_heading = HEADING_LINE.match(line) is not None
+        if lines and (length + len(line) > max_chars or (is_heading and length >= max_chars // 2)):
+            sections.append("\n".join(lines))
+            lines = []
+            length = 0
+        lines.append(line)
+        length += len(line) + 1
+    if lines:
+        sections.append("\n".join(lines))
+    return sections
+
+
+async def _write_section_script(inputs: ScriptWritingWorkflowInput, source_text: str) -> str:
+    topics = await search_topics(inputs.gemini_light_model, source_text, use_cache=inputs.use_cache)
 
     feedback_messages = []
     retry_count = 0
     script = ""
 
     while retry_count < MAX_RETRY_COUNT:
-        script = await write_script(inputs.openai_model, inputs.source_text, topics, feedback_messages)
-        evaluation = await evaluate_script(inputs.gemini_light_model, script, topics)
+        script = await write_script(
+            inputs.openai_model, source_text, topics, feedback_messages, use_cache=inputs.use_cache
+        )
+        evaluation = await evaluate_script(inputs.gemini_light_model, script, topics, use_cache=inputs.use_cache)
 
         if evaluation.is_valid:
             return script
@@ -159,16 +311,60 @@ async def script_writing_workflow(inputs: ScriptWritingWorkflowInput) -> str:
     return script
 
 
+async def _write_transition_between(
+    inputs: ScriptWritingWorkflowInput, previous_task: asyncio.Task, next_task: asyncio.Task
+) -> str:
+    previous_script, next_script = await asyncio.gather(previous_task, next_task)
+    transition = await write_transition(
+        inputs.gemini_light_model,
+        "\n".join(previous_script.splitlines()[-TRANSITION_CONTEXT_LINES:]),
+        "\n".join(next_script.splitlines()[:TRANSITION_CONTEXT_LINES]),
+        use_cache=inputs.use_cache,
+    )
+    return transition.strip()
+
+
+@entrypoint()
+async def script_writing_workflow(inputs: ScriptWritingWorkflowInput) -> str:
+    async def emit(segment: str) -> str:
+        if inputs.on_segment is not None:
+            await inputs.on_segment(segment)
+        return segment
+
+    sections = split_sections(inputs.source_text, SCRIPT_SECTION_CHARS)
+    if len(sections) == 1:
+        return await emit((await _write_section_script(inputs, inputs.source_text)).strip())
+
+    # 節ごとの台本とつなぎの会話は並列に作成し、評価のやり直しも節の中だけで行う
+    logger.info(f"Writing script in {len(sections)} sections")
+    section_tasks = [asyncio.ensure_future(_write_section_script(inputs, section)) for section in sections]
+    transition_tasks = [
+        asyncio.ensure_future(_write_transition_between(inputs, previous_task, next_task))
+        for previous_task, next_task in zip(section_tasks, section_tasks[1:])
+    ]
+
+    # 出来上がった部分から台本の順に渡し、後続の処理が残りの節の作成と並行して進められるようにする
+    try:
+        stitched = [await emit((await section_tasks[0]).strip())]
+        for transition_task, section_task in zip(transition_tasks, section_tasks[1:]):
+            stitched.append(await emit(await transition_task))
+            stitched.append(await emit((await section_task).strip()))
+    finally:
+        for pending_task in section_tasks + transition_tasks:
+            pending_task.cancel()
+        await asyncio.gather(*section_tasks, *transition_tasks, return_exceptions=True)
+    return "\n".join(stitched)
+
+
 class ScriptWritingService:
     def __init__(self, chapter_service: ChapterService):
-        self.semaphore = asyncio.Semaphore(10)
         self.chapter_service = chapter_service
 
     @staticmethod
-    async def _generate(chapter: Chapter) -> str:
-        gemini_light_model = ChatGoogleGenerativeAI(model="gemini-2.5-flash", api_key=GEMINI_API_KEY, temperature=0.2)
-        gemini_heavy_model = ChatGoogleGenerativeAI(model="gemini-2.5-pro", api_key=GEMINI_API_KEY, temperature=0.2)
-        openai_model = ChatOpenAI(model="gpt-5", temperature=0.2)
+    async def _generate(chapter: Chapter, on_segment: Callable[[str], Awaitable[None]] | None = None) -> str:
+        gemini_light_model = get_gemini_chat_model("gemini-2.5-flash", temperature=0.2)
+        gemini_heavy_model = get_gemini_chat_model("gemini-2.5-pro", temperature=0.2)
+        openai_model = get_openai_chat_model("gpt-5", temperature=0.2)
 
         response = await script_writing_workflow.ainvoke(
             ScriptWritingWorkflowInput(
@@ -176,6 +372,7 @@ class ScriptWritingService:
                 gemini_light_model=gemini_light_model,
                 gemini_heavy_model=gemini_heavy_model,
                 openai_model=openai_model,
+                on_segment=on_segment,
             ),
             config=RunnableConfig(run_name="ScriptWritingAgent"),
         )
@@ -183,15 +380,33 @@ class ScriptWritingService:
         return response
 
     async def _generate_script(self, chapter: Chapter):
-        async with self.semaphore:
-            logger.info(f"Generating script for chapter: {str(chapter)}")
-            script = await self._generate(chapter)
+        logger.info(f"Generating script for chapter: {str(chapter)}")
+        stats = PromptCacheStats()
+        stats_token = _prompt_cache_stats.set(stats)
+        try:
+            script = await self._generate_with_prefetch(chapter)
+        finally:
+            _prompt_cache_stats.reset(stats_token)
+        # 保存済みの応答だけで作成した章はプロバイダーを呼んでいないので記録しない
+        if stats.input_tokens:
+            SCRIPT_PROMPT_CACHE_HIT_RATIO.observe(stats.hit_ratio)
+        logger.info(
+            f"Prompt cache for chapter {chapter.chapter_number}: "
+            f"{stats.cached_tokens}/{stats.input_tokens} input tokens ({stats.hit_ratio:.0%})"
+        )
 
         chapter.status = ChapterStatus.writing_script_completed
         chapter.script = script
         self.chapter_service.update(chapter)
         logger.info(f"Completed script generation for chapter: {str(chapter)}")
 
+    async def _generate_with_prefetch(self, chapter: Chapter) -> str:
+        if TTS_PREFETCH:
+            # 台本の作成と並行して、確定した部分の音声を合成しておく。合成が終わるのは待たない
+            async with TextToSpeechService(self.chapter_service).prefetch() as prefetcher:
+                return await self._generate(chapter, prefetcher.add_segment)
+        return await self._generate(chapter)
+
     async def _generate_scripts(self, chapters: list[Chapter]):
         tasks = []
         for chapter in chapters:
@@ -202,6 +417,9 @@ class ScriptWritingService:
 
         return await asyncio.gather(*tasks)
 
+    async def process_chapter(self, project: Project, chapter: Chapter):
+        await self._generate_scripts([chapter])
+
     async def process(self, project: Project, chapters: list[Chapter]):
         logger.info("Start writing script.")
         await self._generate_scripts(chapters)
@@ -0,0 +1,44 @@
+import asyncio
+from typing import Awaitable, Callable, Generic, Hashable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[K, T]):
+    """同じキーの処理が同時に要求された場合に、実行を1回にまとめて結果を共有する。
+
+    先に実行していた呼び出しがキャンセルされても、待っている呼び出しにはキャンセルを伝えず、代わりに実行し直す。
+    """
+
+    def __init__(self):
+        self.calls: dict[K, asyncio.Future[T]] = {}
+
+    def __contains__(self, key: K) -> bool:
+        return key in self.calls
+
+    async def run(self, key: K, function: Callable[[], Awaitable[T]]) -> T:
+        while (future := self.calls.get(key)) is not None:
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled() or asyncio.current_task().cancelling():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self.calls[key] = future
+        try:
+            result = await function()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # 待っている呼び出しがない場合に、未取得の例外として警告されないようにする
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self.calls[key]
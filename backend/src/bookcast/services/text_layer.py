@@ -0,0 +1,64 @@
+import pathlib
+import re
+import subprocess
+import unicodedata
+
+from bookcast.config import TEXT_LAYER_MIN_QUALITY
+
+# これより文字数が少ないページは、スキャン画像か図だけのページとみなす
+TEXT_LAYER_MIN_CHARS = 30
+
+PAGE_NUMBER_LINE = re.compile(r"^\s*[-‐–—]?\s*\d+\s*[-‐–—]?\s*$")
+
+
+def extract_text_layers(book_path: pathlib.Path, first_page: int, last_page: int) -> list[str]:
+    """pdftotextでfirst_pageからlast_pageまでのテキストレイヤーを取得する。ページはフォームフィードで区切られる"""
+    result = subprocess.run(
+        ["pdftotext", "-f", str(first_page), "-l", str(last_page), "-enc", "UTF-8", str(book_path), "-"],
+        capture_output=True,
+        check=True,
+    )
+    pages = result.stdout.decode("utf-8", errors="replace").split("\f")
+    return [clean_text_layer(page) for page in pages[: last_page - first_page + 1]]
+
+
+def clean_text_layer(text: str) -> str:
+    # ページ番号だけの行は、OCRのプロンプトと同じく取り除く
+    lines = [line.rstrip() for line in text.splitlines() if not PAGE_NUMBER_LINE.match(line)]
+    return "\n".join(lines).strip()
+
+
+def _is_expected_char(char: str) -> bool:
+    if char == "\ufffd":
+        return False
+    # 制御文字、私用領域、未割り当ての文字は、フォントの対応表が壊れたPDFで出てくる
+    if unicodedata.category(char) in ("Cc", "Co", "Cs", "Cn"):
+        return False
+    # Latin-1補助の文字が多いのは文字化けの典型
+    return not ("\u0080" <= char <= "\u00ff")
+
+
+def unexpected_char_ratio(text: str) -> float:
+    chars = [char for char in text if not char.isspace()]
+    if not chars:
+        return 0.0
+    return sum(1 for char in chars if not _is_expected_char(char)) / len(chars)
+
+
+def score_text_layer(text: str) -> float:
+    """テキストレイヤーの品質を0から1で評価する。OCRの代わりに使えるかの判定に使う"""
+    chars = [char for char in text if not char.isspace()]
+    if len(chars) < TEXT_LAYER_MIN_CHARS:
+        return 0.0
+
+    # 縦書きの抽出に失敗すると1行1文字になる
+    lines = [line for line in text.splitlines() if line.strip()]
+    short_lines = sum(1 for line in lines if len(line.strip()) <= 2)
+    if short_lines > len(lines) / 2:
+        return 0.0
+
+    return 1.0 - unexpected_char_ratio(text)
+
+
+def is_usable_text_layer(text: str) -> bool:
+    return score_text_layer(text) >= TEXT_LAYER_MIN_QUALITY
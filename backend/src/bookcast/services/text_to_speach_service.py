@@ -1,39 +1,159 @@
 import asyncio
+import contextlib
+import functools
 import logging
 from logging import getLogger
+from typing import AsyncIterator, Callable
 
-from google import genai
+import tiktoken
 from google.genai import types
 from google.genai.errors import ServerError
-from langchain_text_splitters import CharacterTextSplitter
 from tenacity import before_sleep_log, retry, retry_if_exception_type, stop_after_attempt, wait_exponential
 
 from bookcast.config import GEMINI_API_KEY
 from bookcast.entities import Chapter, ChapterStatus, Project
+from bookcast.metrics import LLM_CALL_DURATION, LLM_CALL_RETRIES, observe_duration
 from bookcast.services.file_service import TTSFileService
+from bookcast.services.llm_registry import get_genai_client
+from bookcast.services.rate_limiter import estimate_tokens, get_adaptive_limiter, get_rate_limiter
+from bookcast.services.single_flight import SingleFlight
+from bookcast.services.tts_cache import build_tts_cache_key, cached_tts_audio
 
 logger = getLogger(__name__)
 GEMINI_MODEL = "gemini-2.5-flash-preview-tts"
+SPEAKER_VOICES = {"Speaker1": "Alnilam", "Speaker2": "Autonoe"}
+# 長過ぎると途中で途切れる
+CHUNK_TOKENS = 4000
+
+_log_before_sleep = before_sleep_log(logger, logging.WARNING)
+
+# 台本の作成を終えた後も合成を続けられるよう、先読みの合成のタスクをプロセス全体で保持する
+_prefetch_tasks: set[asyncio.Task] = set()
+# 同じチャンクの合成が同時に要求された場合に、合成を1回にまとめるための合成中のチャンク
+_synthesizing: SingleFlight[str, bytes] = SingleFlight()
+
+
+def _before_sleep(retry_state) -> None:
+    LLM_CALL_RETRIES.labels(call="tts").inc()
+    _log_before_sleep(retry_state)
+
+
+@functools.cache
+def _get_encoding() -> tiktoken.Encoding:
+    return tiktoken.get_encoding("gpt2")
+
+
+def count_tokens(text: str) -> int:
+    return len(_get_encoding().encode(text))
+
+
+class ScriptChunker:
+    """台本を行の区切りでTTSのチャンクに分ける。
+
+    台本を少しずつ追加でき、上限に達して確定したチャンクから返す。
+    一度に追加しても分けて追加しても、同じ台本からは同じチャンクができる。
+    """
+
+    def __init__(self, chunk_size: int = CHUNK_TOKENS, length_function: Callable[[str], int] = count_tokens):
+        self.chunk_size = chunk_size
+        self.length_function = length_function
+        self.lines: list[str] = []
+        self.length = 0
+
+    def _take(self) -> str:
+        chunk = "\n".join(self.lines)
+        self.lines = []
+        self.length = 0
+        return chunk
+
+    def add(self, text: str) -> list[str]:
+        chunks = []
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+
+            line_length = self.length_function(line)
+            # 改行の分を含めて上限を超える場合は、それまでの行をチャンクとして確定する
+            if self.lines and self.length + 1 + line_length > self.chunk_size:
+                chunks.append(self._take())
+            self.length += line_length + (1 if self.lines else 0)
+            self.lines.append(line)
+        return chunks
+
+    def flush(self) -> list[str]:
+        return [self._take()] if self.lines else []
+
+
+def _prefetch_done(task: asyncio.Task) -> None:
+    _prefetch_tasks.discard(task)
+    # 合成できなかったチャンクはTTSの段階で合成し直すので、ここでは記録するだけにする
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning(f"Failed to prefetch an audio chunk: {task.exception()!r}")
+
+
+class AudioPrefetcher:
+    """台本の作成中に、確定した部分から音声を合成してキャッシュしておく。
+
+    チャンクの分け方はsplit_scriptと同じなので、TTSの段階では合成済みのチャンクをキャッシュから取り出せる。
+    台本の作成は合成が終わるのを待たない。
+    """
+
+    def __init__(self, tts_service: "TextToSpeechService", chunker: ScriptChunker | None = None):
+        self.tts_service = tts_service
+        self.chunker = chunker or ScriptChunker()
+        self.tasks: list[asyncio.Task] = []
+
+    def _start(self, chunks: list[str]) -> None:
+        for chunk in chunks:
+            task = asyncio.create_task(self.tts_service.synthesize(chunk))
+            _prefetch_tasks.add(task)
+            task.add_done_callback(_prefetch_done)
+            self.tasks.append(task)
+
+    async def add_segment(self, segment: str) -> None:
+        self._start(self.chunker.add(segment))
+
+    def finish(self) -> None:
+        """残りのチャンクの合成を始める。合成が終わるのは待たない"""
+        self._start(self.chunker.flush())
+
+    async def cancel(self) -> None:
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
 
 
 class TextToSpeechService:
     def __init__(self, chapter_service):
-        self.client = genai.Client(api_key=GEMINI_API_KEY)
-        self.semaphore = asyncio.Semaphore(3)
+        self.client = get_genai_client()
         self.chapter_service = chapter_service
 
     @staticmethod
     def split_script(source_script: str) -> list[str]:
-        text_splitter = CharacterTextSplitter.from_tiktoken_encoder(
-            separator="\n",
-            chunk_size=4000,  # 長過ぎると途中で途切れる
-            chunk_overlap=0,
-        )
-        chunks = text_splitter.split_text(source_script)
-        return chunks
+        chunker = ScriptChunker()
+        return chunker.add(source_script) + chunker.flush()
+
+    @contextlib.asynccontextmanager
+    async def prefetch(self) -> AsyncIterator[AudioPrefetcher]:
+        """確定した台本を受け取って音声を先に合成する。台本の作成が失敗した場合は合成を取り消す"""
+        prefetcher = AudioPrefetcher(self)
+        try:
+            yield prefetcher
+        except BaseException:
+            await prefetcher.cancel()
+            raise
+        prefetcher.finish()
 
     async def _invoke(self, script: str) -> bytes:
-        response = await self.client.aio.models.generate_content(
+        with observe_duration(LLM_CALL_DURATION, call="tts"):
+            response = await self._generate_content(script)
+
+        # AttributeErrorが発生することがあるため、_synthesizeメソッドで再試行する
+        data = response.candidates[0].content.parts[0].inline_data.data
+        return data
+
+    async def _generate_content(self, script: str) -> types.GenerateContentResponse:
+        return await self.client.aio.models.generate_content(
             model=GEMINI_MODEL,
             contents=script,
             config=types.GenerateContentConfig(
@@ -42,41 +162,39 @@ class TextToSpeechService:
                     multi_speaker_voice_config=types.MultiSpeakerVoiceConfig(
                         speaker_voice_configs=[
                             types.SpeakerVoiceConfig(
-                                speaker="Speaker1",
+                                speaker=speaker,
                                 voice_config=types.VoiceConfig(
                                     prebuilt_voice_config=types.PrebuiltVoiceConfig(
-                                        voice_name="Alnilam",
+                                        voice_name=voice_name,
                                     )
                                 ),
-                            ),
-                            types.SpeakerVoiceConfig(
-                                speaker="Speaker2",
-                                voice_config=types.VoiceConfig(
-                                    prebuilt_voice_config=types.PrebuiltVoiceConfig(
-                                        voice_name="Autonoe",
-                                    )
-                                ),
-                            ),
+                            )
+                            for speaker, voice_name in SPEAKER_VOICES.items()
                         ]
                     )
                 ),
             ),
         )
 
-        # AttributeErrorが発生することがあるため、_generateメソッドで再試行する
-        data = response.candidates[0].content.parts[0].inline_data.data
-        return data
-
     @retry(
         stop=stop_after_attempt(5),
         wait=wait_exponential(multiplier=1, min=4, max=10),
         retry=retry_if_exception_type((ServerError, AttributeError)),
-        before_sleep=before_sleep_log(logger, logging.WARNING),
+        before_sleep=_before_sleep,
     )
+    async def _synthesize(self, script: str) -> bytes:
+        async with get_adaptive_limiter("tts").acquire():
+            async with get_rate_limiter(GEMINI_MODEL, GEMINI_API_KEY).acquire(tokens=estimate_tokens(script)):
+                return await self._invoke(script)
+
+    async def synthesize(self, script: str) -> bytes:
+        """台本のチャンクを音声（PCM）にする。合成済みのチャンクはキャッシュから返し、合成中のチャンクは終わるのを待つ"""
+        cache_key = build_tts_cache_key(script, GEMINI_MODEL, SPEAKER_VOICES)
+        return await _synthesizing.run(cache_key, lambda: cached_tts_audio(cache_key, lambda: self._synthesize(script)))
+
     async def _generate(self, project: Project, script: str, chapter: Chapter, index: int) -> None:
-        async with self.semaphore:
-            logger.info(f"Generating audio for chapter: {str(chapter)}, index: {index}")
-            data = await self._invoke(script)
+        logger.info(f"Generating audio for chapter: {str(chapter)}, index: {index}")
+        data = await self.synthesize(script)
 
         logger.info(f"Saving audio for chapter {chapter.chapter_number}, index {index}.")
         source_file_path = TTSFileService.write(project.filename, chapter.chapter_number, index, data)
@@ -106,6 +224,9 @@ class TextToSpeechService:
             else:
                 logger.info(f"Skipping audio generation for chapter (already completed): {str(chapter)}")
 
+    async def process_chapter(self, project: Project, chapter: Chapter) -> None:
+        await self._generate_audio(project, [chapter])
+
     async def generate_audio(self, project: Project, chapters: list[Chapter]) -> None:
         logger.info("Starting audio generation for chapters.")
         await self._generate_audio(project, chapters)
@@ -0,0 +1,43 @@
+import asyncio
+import hashlib
+from typing import Awaitable, Callable
+
+from bookcast.config import TTS_CACHE_ENABLED
+from bookcast.metrics import CACHE_REQUESTS
+from bookcast.services.file_service import TTSCacheFileService
+
+
+def build_tts_cache_key(script: str, model: str, voices: dict[str, str]) -> str:
+    """台本のチャンク、声、モデルが同じなら同じキーになる"""
+    digest = hashlib.sha256()
+    for part in (script, model, *voices.keys(), *voices.values()):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _load(cache_key: str) -> bytes | None:
+    if TTSCacheFileService.download_from_gcs(cache_key) is None:
+        return None
+    return TTSCacheFileService.read(cache_key)
+
+
+def _save(cache_key: str, data: bytes) -> None:
+    cache_path = TTSCacheFileService.write(cache_key, data)
+    TTSCacheFileService.upload_gcs_from_file(cache_path)
+
+
+async def cached_tts_audio(cache_key: str, synthesize: Callable[[], Awaitable[bytes]]) -> bytes:
+    """合成済みのチャンクがGCSに保存されていれば、合成せずにそれを返す"""
+    if not TTS_CACHE_ENABLED:
+        return await synthesize()
+
+    cached_data = await asyncio.to_thread(_load, cache_key)
+    if cached_data is not None:
+        CACHE_REQUESTS.labels(cache="tts", result="hit").inc()
+        return cached_data
+    CACHE_REQUESTS.labels(cache="tts", result="miss").inc()
+
+    data = await synthesize()
+    await asyncio.to_thread(_save, cache_key, data)
+    return data
@@ -0,0 +1,3 @@
+alter table chapter add column if not exists heartbeat_at timestamp with time zone;
+alter table chapter add column if not exists lease_expires_at timestamp with time zone;
+create index if not exists chapter_status_lease_expires_at_idx on chapter (status, lease_expires_at);
@@ -0,0 +1 @@
+alter table project add column if not exists table_of_contents jsonb;
@@ -0,0 +1 @@
+alter table chapter add column if not exists attempts integer not null default 0;
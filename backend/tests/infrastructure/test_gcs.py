@@ -0,0 +1,69 @@
+import pathlib
+from unittest.mock import MagicMock, patch
+
+import pytest
+from google.api_core.exceptions import NotFound
+
+from bookcast.infrastructure import gcs
+from bookcast.infrastructure.gcs import GCSFileUploadable
+
+
+class TestGCSFileUploadable:
+    @pytest.fixture
+    def mock_bucket(self):
+        with patch.object(gcs, "get_storage_bucket") as mock_get_storage_bucket:
+            yield mock_get_storage_bucket.return_value
+
+    @patch.object(gcs.storage, "Client")
+    def test_reuses_storage_client(self, mock_client_class):
+        mock_client_class.return_value = MagicMock()
+        source_file_name = pathlib.Path("downloads/test/texts/page_001.txt")
+        gcs.get_storage_bucket.cache_clear()
+        try:
+            with (
+                patch.object(pathlib.Path, "stat", return_value=MagicMock(st_size=10)),
+                patch.object(gcs.os, "replace"),
+            ):
+                GCSFileUploadable.upload_gcs_from_file(source_file_name)
+                GCSFileUploadable._download_from_gcs(source_file_name)
+                GCSFileUploadable.upload_gcs_from_file(source_file_name)
+        finally:
+            gcs.get_storage_bucket.cache_clear()
+
+        mock_client_class.assert_called_once()
+        blob = mock_client_class.return_value.bucket.return_value.blob
+        assert blob.call_count == 3
+        blob.assert_called_with("test/texts/page_001.txt")
+
+    def test_download_replaces_file_after_completion(self, mock_bucket, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        source_file_name = pathlib.Path("downloads/test/test.pdf")
+        source_file_name.parent.mkdir(parents=True)
+        source_file_name.write_bytes(b"old")
+
+        def download_to_filename(filename):
+            # ダウンロード中も元のファイルは書き換えられない
+            assert pathlib.Path(filename) != source_file_name
+            assert source_file_name.read_bytes() == b"old"
+            pathlib.Path(filename).write_bytes(b"new")
+
+        mock_bucket.blob.return_value.download_to_filename.side_effect = download_to_filename
+
+        GCSFileUploadable._download_from_gcs(source_file_name)
+
+        assert source_file_name.read_bytes() == b"new"
+        assert list(source_file_name.parent.iterdir()) == [source_file_name]
+
+    def test_download_if_exists_leaves_no_file_when_not_found(self, mock_bucket, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        source_file_name = pathlib.Path("downloads/test/test.pdf")
+        source_file_name.parent.mkdir(parents=True)
+
+        def download_to_filename(filename):
+            pathlib.Path(filename).touch()
+            raise NotFound("not found")
+
+        mock_bucket.blob.return_value.download_to_filename.side_effect = download_to_filename
+
+        assert GCSFileUploadable._download_from_gcs_if_exists(source_file_name) is False
+        assert list(source_file_name.parent.iterdir()) == []
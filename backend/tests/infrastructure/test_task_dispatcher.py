@@ -0,0 +1,107 @@
+import threading
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from bookcast.infrastructure import sqlite, task_dispatcher
+from bookcast.infrastructure.sqlite import sqlite_connection
+from bookcast.infrastructure.task_dispatcher import CloudTasksDispatcher, LocalTaskDispatcher, TaskDispatcher
+
+
+class TestCloudTasksDispatcher:
+    @patch.object(task_dispatcher.tasks_v2, "CloudTasksClient")
+    async def test_dispatch_reuses_client(self, mock_client_class):
+        mock_client = MagicMock()
+        mock_client.create_task.return_value.name = "projects/p/locations/l/queues/q/tasks/1"
+        mock_client_class.return_value = mock_client
+
+        dispatcher = CloudTasksDispatcher()
+        result = await dispatcher.dispatch("start_ocr", {"project_id": 1}, "bookcast-worker")
+        await dispatcher.dispatch("start_script_writing", {"project_id": 1}, "bookcast-worker")
+
+        assert result == {"task_name": "projects/p/locations/l/queues/q/tasks/1", "status": "queued"}
+        mock_client_class.assert_called_once()
+        assert mock_client.create_task.call_count == 2
+
+
+class TestLocalTaskDispatcher:
+    async def test_dispatch_runs_registered_handler(self, tmp_path):
+        dispatcher = LocalTaskDispatcher(tmp_path / "tasks.sqlite3", concurrency=1)
+        handler = AsyncMock()
+        dispatcher.register("start_ocr", handler)
+
+        await dispatcher.start()
+        result = await dispatcher.dispatch("start_ocr", {"project_id": 1}, "bookcast-worker")
+        await dispatcher.join()
+        await dispatcher.stop()
+
+        assert result["status"] == "queued"
+        handler.assert_awaited_once_with({"project_id": 1})
+        assert dispatcher._select_unfinished() == []
+
+    async def test_unfinished_tasks_survive_restart(self, tmp_path):
+        db_path = tmp_path / "tasks.sqlite3"
+        await LocalTaskDispatcher(db_path).dispatch("start_tts", {"project_id": 2}, "bookcast-tts-worker")
+
+        dispatcher = LocalTaskDispatcher(db_path, concurrency=1)
+        handler = AsyncMock()
+        dispatcher.register("start_tts", handler)
+
+        await dispatcher.start()
+        await dispatcher.join()
+        await dispatcher.stop()
+
+        handler.assert_awaited_once_with({"project_id": 2})
+
+    async def test_failed_task_is_kept(self, tmp_path):
+        dispatcher = LocalTaskDispatcher(tmp_path / "tasks.sqlite3", concurrency=1)
+        dispatcher.register("start_ocr", AsyncMock(side_effect=RuntimeError("boom")))
+
+        await dispatcher.start()
+        await dispatcher.dispatch("start_ocr", {"project_id": 1}, "bookcast-worker")
+        await dispatcher.join()
+        await dispatcher.stop()
+
+        with sqlite_connection(dispatcher.db_path) as conn:
+            rows = conn.execute("select fn_name, status from task").fetchall()
+        assert rows == [("start_ocr", "failed")]
+
+    async def test_dispatch_inserts_outside_event_loop(self, tmp_path):
+        dispatcher = LocalTaskDispatcher(tmp_path / "tasks.sqlite3")
+        insert = dispatcher._insert
+        threads = []
+
+        def record_thread(*args):
+            threads.append(threading.get_ident())
+            return insert(*args)
+
+        with patch.object(dispatcher, "_insert", side_effect=record_thread):
+            await dispatcher.dispatch("start_ocr", {"project_id": 1}, "bookcast-worker")
+
+        assert threads != [threading.get_ident()]
+        assert dispatcher._select_unfinished() == [1]
+
+    async def test_closes_connections(self, tmp_path):
+        connections = []
+        real_connect = sqlite.sqlite3.connect
+
+        def connect(*args, **kwargs):
+            conn = real_connect(*args, **kwargs)
+            connections.append(conn)
+            return conn
+
+        with patch.object(sqlite.sqlite3, "connect", side_effect=connect):
+            dispatcher = LocalTaskDispatcher(tmp_path / "tasks.sqlite3")
+            await dispatcher.dispatch("start_ocr", {"project_id": 1}, "bookcast-worker")
+            dispatcher._select_unfinished()
+
+        assert len(connections) == 3
+        for conn in connections:
+            with pytest.raises(sqlite.sqlite3.ProgrammingError):
+                conn.execute("select 1")
+
+
+class TestTaskDispatcher:
+    def test_dispatch_is_abstract(self):
+        with pytest.raises(TypeError):
+            TaskDispatcher()
@@ -7,7 +7,6 @@ from bookcast.dependencies import get_chapter_service, get_project_service
 from bookcast.entities import (
     Chapter,
     ChapterStatus,
-    OCRWorkerResult,
     Project,
     ProjectStatus,
 )
@@ -57,6 +56,8 @@ def client_with_mock():
         ),
     ]
 
+    chapter_service.claim_chapters.side_effect = lambda chapters, before, after: chapters
+
     app.dependency_overrides[get_project_service] = lambda: project_service
     app.dependency_overrides[get_chapter_service] = lambda: chapter_service
 
@@ -67,6 +68,24 @@ def client_with_mock():
 
 
 class TestStartOCR:
+    @patch.object(worker, "invoke_task")
+    @patch.object(worker, "OCRService")
+    def test_start_ocr_fan_out(self, mock_ocr_service_class, invoke_task, client_with_mock):
+        client, project_service, chapter_service = client_with_mock
+        invoke_task.side_effect = [{"task_name": "task-1"}, {"task_name": "task-2"}]
+
+        response = client.post("/internal/api/v1/workers/start_ocr", json={"project_id": 1})
+
+        assert response.status_code == 200
+        response_data = response.json()
+        assert response_data["data"]["dispatched_chapters"] == 2
+        assert response_data["data"]["next_task"] == {"name": "start_ocr", "task_ids": ["task-1", "task-2"]}
+
+        mock_ocr_service_class.return_value.process_chapter.assert_not_called()
+        chapter_service.claim_chapters.assert_not_called()
+        invoke_task.assert_any_call(1, "start_ocr", "bookcast-worker", 1)
+        invoke_task.assert_any_call(1, "start_ocr", "bookcast-worker", 2)
+
     @patch.object(worker, "invoke_task")
     @patch.object(worker, "OCRService")
     def test_start_ocr_success(self, mock_ocr_service_class, invoke_task, client_with_mock):
@@ -74,26 +93,50 @@ class TestStartOCR:
 
         mock_ocr_service_instance = AsyncMock()
         mock_ocr_service_class.return_value = mock_ocr_service_instance
-        mock_ocr_service_instance.process.return_value = [
-            OCRWorkerResult(chapter_id=1, page_number=1, extracted_text="Chapter 1 page 1 text"),
-            OCRWorkerResult(chapter_id=1, page_number=2, extracted_text="Chapter 1 page 2 text"),
-            OCRWorkerResult(chapter_id=2, page_number=11, extracted_text="Chapter 2 page 11 text"),
-        ]
+        invoke_task.return_value = {"task_name": "task-1", "status": "queued"}
 
-        response = client.post("/internal/api/v1/workers/start_ocr", json={"project_id": 1})
+        response = client.post("/internal/api/v1/workers/start_ocr", json={"project_id": 1, "chapter_id": 2})
 
         assert response.status_code == 200
         response_data = response.json()
         assert response_data["success"] is True
         assert response_data["message"] == "OCR processing completed successfully"
         assert response_data["data"]["project_id"] == 1
-        assert response_data["data"]["project_status"] == ProjectStatus.ocr_completed.value
+        assert response_data["data"]["processed_chapters"] == 1
+        assert response_data["data"]["next_task"]["task_ids"] == ["task-1"]
 
         project_service.find_project.assert_called_once_with(1)
         chapter_service.select_chapter_by_project_id.assert_called_once_with(1)
-        mock_ocr_service_instance.process.assert_called_once()
-        project_service.update_project_status.assert_called()
-        invoke_task.assert_called_once_with(1, "start_script_writing", "bookcast-worker")
+        chapter_service.claim_chapters.assert_called_once()
+        mock_ocr_service_instance.process_chapter.assert_called_once()
+        assert mock_ocr_service_instance.process_chapter.call_args.args[1].id == 2
+        project_service.refresh_project_status.assert_called()
+        invoke_task.assert_called_once_with(1, "start_script_writing", "bookcast-worker", 2)
+
+    @patch.object(worker, "invoke_task")
+    @patch.object(worker, "OCRService")
+    def test_start_ocr_no_chapters_ready(self, mock_ocr_service_class, invoke_task, client_with_mock):
+        client, project_service, chapter_service = client_with_mock
+        chapter_service.claim_chapters.side_effect = None
+        chapter_service.claim_chapters.return_value = []
+
+        response = client.post("/internal/api/v1/workers/start_ocr", json={"project_id": 1, "chapter_id": 1})
+
+        assert response.status_code == 200
+        assert response.json()["data"]["processed_chapters"] == 0
+        invoke_task.assert_not_called()
+
+    @patch.object(worker, "invoke_task")
+    @patch.object(worker, "OCRService")
+    def test_start_ocr_chapter_failure(self, mock_ocr_service_class, invoke_task, client_with_mock):
+        client, project_service, chapter_service = client_with_mock
+        mock_ocr_service_class.return_value.process_chapter = AsyncMock(side_effect=RuntimeError("OCR failed"))
+
+        response = client.post("/internal/api/v1/workers/start_ocr", json={"project_id": 1, "chapter_id": 1})
+
+        assert response.status_code == 500
+        assert response.json()["detail"]["error_code"] == "CHAPTER_PROCESSING_FAILED"
+        invoke_task.assert_not_called()
 
 
 class TestStartScriptWriting:
@@ -106,21 +149,22 @@ class TestStartScriptWriting:
 
         mock_script_service_instance = AsyncMock()
         mock_script_service_class.return_value = mock_script_service_instance
+        invoke_task.return_value = {"task_name": "task-1", "status": "queued"}
 
-        response = client.post("/internal/api/v1/workers/start_script_writing", json={"project_id": 1})
+        response = client.post("/internal/api/v1/workers/start_script_writing", json={"project_id": 1, "chapter_id": 1})
 
         assert response.status_code == 200
         response_data = response.json()
         assert response_data["success"] is True
         assert response_data["message"] == "Script writing completed successfully"
         assert response_data["data"]["project_id"] == 1
-        assert response_data["data"]["project_status"] == ProjectStatus.writing_script_completed.value
+        assert response_data["data"]["processed_chapters"] == 1
 
         project_service.find_project.assert_called_once_with(1)
         chapter_service.select_chapter_by_project_id.assert_called_once_with(1)
-        mock_script_service_instance.process.assert_called_once()
-        project_service.update_project_status.assert_called()
-        invoke_task.assert_called_once_with(1, "start_tts", "bookcast-tts-worker")
+        assert mock_script_service_instance.process_chapter.call_count == 1
+        project_service.refresh_project_status.assert_called()
+        invoke_task.assert_called_once_with(1, "start_tts", "bookcast-tts-worker", 1)
 
 
 class TestStartTTS:
@@ -133,22 +177,22 @@ class TestStartTTS:
 
         mock_tts_service_instance = AsyncMock()
         mock_tts_service_class.return_value = mock_tts_service_instance
-        mock_tts_service_instance.generate_audio.return_value = None
+        invoke_task.return_value = {"task_name": "task-1", "status": "queued"}
 
-        response = client.post("/internal/api/v1/workers/start_tts", json={"project_id": 1})
+        response = client.post("/internal/api/v1/workers/start_tts", json={"project_id": 1, "chapter_id": 1})
 
         assert response.status_code == 200
         response_data = response.json()
         assert response_data["success"] is True
         assert response_data["message"] == "TTS processing completed successfully"
         assert response_data["data"]["project_id"] == 1
-        assert response_data["data"]["project_status"] == ProjectStatus.tts_completed.value
+        assert response_data["data"]["processed_chapters"] == 1
 
         project_service.find_project.assert_called_once_with(1)
         chapter_service.select_chapter_by_project_id.assert_called_once_with(1)
-        mock_tts_service_instance.generate_audio.assert_called_once()
-        project_service.update_project_status.assert_called()
-        invoke_task.assert_called_once_with(1, "start_creating_audio", "bookcast-worker")
+        assert mock_tts_service_instance.process_chapter.call_count == 1
+        project_service.refresh_project_status.assert_called()
+        invoke_task.assert_called_once_with(1, "start_creating_audio", "bookcast-worker", 1)
 
 
 class TestStartCreatingAudio:
@@ -157,19 +201,103 @@ class TestStartCreatingAudio:
         client, project_service, chapter_service = client_with_mock
 
         project_service.find_project.return_value.status = ProjectStatus.tts_completed
-        audio_service.generate_audio = AsyncMock()
+        audio_service.generate_chapter_audio = AsyncMock()
 
-        response = client.post("/internal/api/v1/workers/start_creating_audio", json={"project_id": 1})
+        response = client.post("/internal/api/v1/workers/start_creating_audio", json={"project_id": 1, "chapter_id": 1})
 
         assert response.status_code == 200
         response_data = response.json()
         assert response_data["success"] is True
         assert response_data["message"] == "Audio creation completed successfully"
         assert response_data["data"]["project_id"] == 1
-        assert response_data["data"]["project_status"] == ProjectStatus.creating_audio_completed.value
+        assert response_data["data"]["processed_chapters"] == 1
+        assert response_data["data"]["project_completed"] is False
 
         project_service.find_project.assert_called_once_with(1)
         chapter_service.select_chapter_by_project_id.assert_called_once_with(1)
-        audio_service.generate_audio.assert_called_once()
-        project_service.update_project_status.assert_called()
-        chapter_service.update_chapters_status.assert_called()
+        assert audio_service.generate_chapter_audio.call_count == 1
+        project_service.refresh_project_status.assert_called()
+        assert chapter_service.update_chapters_status.call_count == 1
+
+    @patch.object(worker, "audio_service")
+    def test_start_creating_audio_last_chapter(self, audio_service, client_with_mock):
+        client, project_service, chapter_service = client_with_mock
+
+        def refresh_project_status(project):
+            project.status = ProjectStatus.creating_audio_completed
+            return project
+
+        project_service.refresh_project_status.side_effect = refresh_project_status
+        audio_service.generate_chapter_audio = AsyncMock()
+
+        response = client.post("/internal/api/v1/workers/start_creating_audio", json={"project_id": 1, "chapter_id": 2})
+
+        assert response.status_code == 200
+        response_data = response.json()
+        assert response_data["data"]["project_status"] == ProjectStatus.creating_audio_completed.value
+        assert response_data["data"]["project_completed"] is True
+
+
+class TestSweepExpiredLeases:
+    @patch.object(worker, "invoke_task")
+    def test_sweep_expired_leases(self, mock_invoke_task, client_with_mock):
+        client, project_service, chapter_service = client_with_mock
+
+        chapter_service.select_expired_chapters.return_value = [
+            Chapter(id=1, project_id=1, chapter_number=1, start_page=1, end_page=10, status=ChapterStatus.start_tts),
+            Chapter(id=2, project_id=1, chapter_number=2, start_page=11, end_page=20, status=ChapterStatus.start_ocr),
+        ]
+        # 2章目は回収する前に心拍が再開している
+        chapter_service.release_expired_chapter.side_effect = lambda chapter, ready: (
+            chapter if chapter.id == 1 else None
+        )
+        mock_invoke_task.return_value = {"task_name": "test-task-id", "status": "queued"}
+
+        response = client.post("/internal/api/v1/workers/sweep_expired_leases")
+
+        assert response.status_code == 200
+        assert response.json()["data"]["recovered_chapters"] == [
+            {"project_id": 1, "chapter_id": 1, "task_id": "test-task-id"}
+        ]
+        assert response.json()["data"]["failed_chapters"] == []
+        chapter_service.release_expired_chapter.assert_any_call(
+            chapter_service.select_expired_chapters.return_value[0], ChapterStatus.writing_script_completed
+        )
+        mock_invoke_task.assert_called_once_with(1, "start_tts", "bookcast-tts-worker", 1)
+        project_service.refresh_project_status.assert_called_once()
+
+    @patch.object(worker, "invoke_task")
+    def test_sweep_expired_leases_gives_up_after_max_attempts(self, mock_invoke_task, client_with_mock):
+        client, project_service, chapter_service = client_with_mock
+
+        chapter_service.select_expired_chapters.return_value = [
+            Chapter(id=1, project_id=1, chapter_number=1, start_page=1, end_page=10, status=ChapterStatus.start_tts),
+        ]
+
+        def release_expired_chapter(chapter, ready):
+            chapter.status = ChapterStatus.failed
+            chapter.attempts = 3
+            return chapter
+
+        chapter_service.release_expired_chapter.side_effect = release_expired_chapter
+
+        response = client.post("/internal/api/v1/workers/sweep_expired_leases")
+
+        assert response.status_code == 200
+        assert response.json()["data"]["recovered_chapters"] == []
+        assert response.json()["data"]["failed_chapters"] == [{"project_id": 1, "chapter_id": 1}]
+        mock_invoke_task.assert_not_called()
+        project_service.refresh_project_status.assert_called_once()
+
+    @patch.object(worker, "invoke_task")
+    def test_sweep_expired_leases_nothing_expired(self, mock_invoke_task, client_with_mock):
+        client, project_service, chapter_service = client_with_mock
+
+        chapter_service.select_expired_chapters.return_value = []
+
+        response = client.post("/internal/api/v1/workers/sweep_expired_leases")
+
+        assert response.status_code == 200
+        assert response.json()["data"]["recovered_chapters"] == []
+        mock_invoke_task.assert_not_called()
+        project_service.refresh_project_status.assert_not_called()
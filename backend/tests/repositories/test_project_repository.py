@@ -39,3 +39,18 @@ class TestProjectRepository:
         assert updated_project.id is not None
         assert updated_project.created_at is not None
         assert updated_project.updated_at is not None
+
+    @pytest.mark.integration
+    def test_update_status_by_condition(self, project_repository, starting_project):
+        p, _ = starting_project
+
+        updated_project = project_repository.update_status_by_condition(
+            p.id, ProjectStatus.not_started, ProjectStatus.start_ocr
+        )
+        assert updated_project.status == ProjectStatus.start_ocr
+
+        assert (
+            project_repository.update_status_by_condition(p.id, ProjectStatus.not_started, ProjectStatus.ocr_completed)
+            is None
+        )
+        assert project_repository.find(p.id).status == ProjectStatus.start_ocr
@@ -0,0 +1,16 @@
+from fastapi.testclient import TestClient
+
+from bookcast.main import app
+from bookcast.metrics import LLM_CALL_DURATION
+
+
+class TestMetrics:
+    def test_metrics(self):
+        LLM_CALL_DURATION.labels(call="ocr", outcome="success").observe(1.5)
+
+        client = TestClient(app)
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert 'bookcast_llm_call_duration_seconds_count{call="ocr",outcome="success"}' in response.text
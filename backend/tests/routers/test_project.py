@@ -1,13 +1,14 @@
+import datetime as dt
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from fastapi.testclient import TestClient
 
 from bookcast.dependencies import get_project_service
-from bookcast.entities import Project, ProjectStatus
+from bookcast.entities import Project, ProjectStatus, TableOfContents, TableOfContentsItem
 from bookcast.main import app
+from bookcast.routers import project as project_router
 from bookcast.services import file_service
-from bookcast.services.chapter_search_service import ChapterStartPageNumber
 from bookcast.services.project_service import ProjectService
 
 
@@ -145,19 +146,67 @@ class TestDownloadProject:
         mock_create_archive.assert_called_once_with(expected_project)
 
 
+class TestPages:
+    @patch.object(project_router.PageStore, "count_pages", new_callable=AsyncMock)
+    def test_page_count(self, mock_count_pages, client_with_mock):
+        client, project_service = client_with_mock
+        mock_count_pages.return_value = 42
+
+        response = client.get("/api/v1/projects/1/pages")
+
+        assert response.status_code == 200
+        assert response.json() == {"page_count": 42}
+
+    @patch.object(project_router.PageStore, "get_page_path", new_callable=AsyncMock)
+    def test_show_page(self, mock_get_page_path, client_with_mock, tmp_path):
+        client, project_service = client_with_mock
+        image_path = tmp_path / "page_003.png"
+        image_path.write_bytes(b"png-bytes")
+        mock_get_page_path.return_value = image_path
+
+        response = client.get("/api/v1/projects/1/pages/3?dpi=72")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/png"
+        assert response.content == b"png-bytes"
+        mock_get_page_path.assert_awaited_once_with(3, 72)
+
+    @patch.object(project_router.PageStore, "get_page_path", new_callable=AsyncMock)
+    def test_show_page_not_found(self, mock_get_page_path, client_with_mock):
+        client, project_service = client_with_mock
+        mock_get_page_path.return_value = None
+
+        response = client.get("/api/v1/projects/1/pages/999")
+
+        assert response.status_code == 404
+        assert response.json()["detail"]["error_code"] == "PAGE_NOT_FOUND"
+
+    def test_show_page_project_not_found(self, client_with_empty_mock):
+        client, project_service = client_with_empty_mock
+
+        response = client.get("/api/v1/projects/999/pages/1")
+
+        assert response.status_code == 404
+        assert response.json()["detail"]["error_code"] == "PROJECT_NOT_FOUND"
+
+
 class TestExtractTableOfContents:
-    @patch("bookcast.routers.project.ChapterSearchService")
+    @patch("bookcast.services.project_service.ChapterSearchService")
     def test_extract_table_of_contents_success(self, mock_chapter_search_service_class, client_with_mock):
         client, project_service = client_with_mock
 
-        mock_chapter_pages = [
-            ChapterStartPageNumber(page_number=1, title="第1章 はじめに"),
-            ChapterStartPageNumber(page_number=5, title="第2章 基本概念"),
-            ChapterStartPageNumber(page_number=10, title="第3章 応用"),
-        ]
+        mock_table_of_contents = TableOfContents(
+            items=[
+                TableOfContentsItem(page_number=1, title="第1章 はじめに"),
+                TableOfContentsItem(page_number=5, title="第2章 基本概念"),
+                TableOfContentsItem(page_number=10, title="第3章 応用", is_physical_page=True),
+            ],
+            model="gemini-2.5-flash",
+            extracted_at=dt.datetime(2026, 10, 17, tzinfo=dt.timezone.utc),
+        )
 
         mock_service_instance = MagicMock()
-        mock_service_instance.process = AsyncMock(return_value=mock_chapter_pages)
+        mock_service_instance.process = AsyncMock(return_value=mock_table_of_contents)
         mock_chapter_search_service_class.return_value = mock_service_instance
 
         response = client.post("/api/v1/projects/1/extract_table_of_contents")
@@ -171,10 +220,31 @@ class TestExtractTableOfContents:
         assert resp[1]["title"] == "第2章 基本概念"
         assert resp[2]["page_number"] == 10
         assert resp[2]["title"] == "第3章 応用"
+        assert resp[2]["is_physical_page"] is True
 
         project_service.project_repo.find.assert_called_once_with(1)
-        expected_project = Project(id=1, filename="test1.pdf", status=ProjectStatus.not_started)
-        mock_service_instance.process.assert_called_once_with(expected_project)
+        mock_service_instance.process.assert_called_once()
+        assert mock_service_instance.process.call_args.args[0].filename == "test1.pdf"
+        project_service.project_repo.update_table_of_contents.assert_called_once_with(1, mock_table_of_contents)
+
+    @patch("bookcast.services.project_service.ChapterSearchService")
+    def test_extract_table_of_contents_returns_stored_result(self, mock_chapter_search_service_class, client_with_mock):
+        client, project_service = client_with_mock
+        project_service.project_repo.find.return_value = Project(
+            id=1,
+            filename="test1.pdf",
+            table_of_contents=TableOfContents(
+                items=[TableOfContentsItem(page_number=3, title="第1章")],
+                model="pdf_outline",
+                extracted_at=dt.datetime(2026, 10, 17, tzinfo=dt.timezone.utc),
+            ),
+        )
+
+        response = client.post("/api/v1/projects/1/extract_table_of_contents")
+
+        assert response.status_code == 200
+        assert response.json() == [{"page_number": 3, "title": "第1章", "is_physical_page": False}]
+        mock_chapter_search_service_class.assert_not_called()
 
     def test_extract_table_of_contents_project_not_found(self, client_with_empty_mock):
         client, project_service = client_with_empty_mock
@@ -1,12 +1,12 @@
-import pathlib
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
-from PIL import Image
 
-from bookcast.entities import Project, ProjectStatus
+from bookcast.entities import Project, ProjectStatus, TableOfContentsItem
 from bookcast.services import chapter_search_service
 from bookcast.services.chapter_search_service import ChapterSearchService, ChapterStartPageNumber, OCRResult
+from bookcast.services.page_renderer import RenderedPage
+from bookcast.services.pdf_outline import OutlineItem
 
 
 @pytest.fixture
@@ -16,7 +16,7 @@ def mock_project():
 
 @pytest.fixture
 def mock_images():
-    return [Image.new("RGB", (100, 100), color="red") for _ in range(3)]
+    return [RenderedPage(base64_image="base64-image", ink_ratio=0.05) for _ in range(3)]
 
 
 @pytest.fixture
@@ -35,67 +35,169 @@ def mock_no_toc_ocr_result():
     return OCRResult(chapter_pages=[], is_table_of_contents_page=False)
 
 
+def toc_result(page_number: int) -> OCRResult:
+    return OCRResult(
+        chapter_pages=[ChapterStartPageNumber(page_number=page_number * 10, title=f"第{page_number}章")],
+        is_table_of_contents_page=True,
+    )
+
+
+class TestTableOfContentsScan:
+    def page_store(self, page_count: int) -> MagicMock:
+        page_store = MagicMock()
+
+        async def get_page(page_number):
+            if page_number > page_count:
+                return None
+            return RenderedPage(base64_image=f"page-{page_number}", ink_ratio=0.05)
+
+        page_store.get_page = AsyncMock(side_effect=get_page)
+        return page_store
+
+    @patch.object(chapter_search_service, "TOC_SCAN_WINDOW", 4)
+    async def test_stops_after_table_of_contents_ends(self, mock_no_toc_ocr_result):
+        service = ChapterSearchService()
+        extracted = []
+
+        async def extract(page):
+            extracted.append(page.page_number)
+            return toc_result(page.page_number) if page.page_number in (3, 4, 5) else mock_no_toc_ocr_result
+
+        service._extract = extract
+        page_store = self.page_store(200)
+
+        results = await service._process(page_store)
+
+        assert [result.title for result in results] == ["第3章", "第4章", "第5章"]
+        assert [result.page_number for result in results] == [30, 40, 50]
+        assert sorted(extracted) == list(range(1, 9))
+
+    @patch.object(chapter_search_service, "TOC_SCAN_WINDOW", 4)
+    @patch.object(chapter_search_service, "TOC_SCAN_PAGES", 8)
+    @patch.object(chapter_search_service, "TOC_SCAN_MAX_PAGES", 16)
+    async def test_extends_scan_while_table_of_contents_continues(self, mock_no_toc_ocr_result):
+        service = ChapterSearchService()
+
+        async def extract(page):
+            return toc_result(page.page_number) if page.page_number >= 7 else mock_no_toc_ocr_result
+
+        service._extract = extract
+        page_store = self.page_store(200)
+
+        results = await service._process(page_store)
+
+        assert [result.page_number for result in results] == [i * 10 for i in range(7, 17)]
+        assert page_store.get_page.await_count == 16
+
+    @patch.object(chapter_search_service, "TOC_SCAN_WINDOW", 4)
+    @patch.object(chapter_search_service, "TOC_SCAN_PAGES", 20)
+    async def test_gives_up_without_table_of_contents(self, mock_no_toc_ocr_result):
+        service = ChapterSearchService()
+        service._extract = AsyncMock(return_value=mock_no_toc_ocr_result)
+        page_store = self.page_store(200)
+
+        assert await service._process(page_store) == []
+        assert service._extract.await_count == 20
+
+    async def test_stops_at_end_of_book(self, mock_no_toc_ocr_result):
+        service = ChapterSearchService()
+        service._extract = AsyncMock(return_value=mock_no_toc_ocr_result)
+        page_store = self.page_store(2)
+
+        assert await service._process(page_store) == []
+        assert service._extract.await_count == 2
+
+
+class TestPDFOutline:
+    @patch.object(chapter_search_service.ChapterSearchService, "_read_outline")
+    async def test_process_uses_outline(self, mock_read_outline, mock_project):
+        mock_read_outline.return_value = [
+            OutlineItem(page_number=7, title="第1章"),
+            OutlineItem(page_number=21, title="第2章"),
+        ]
+        service = ChapterSearchService()
+        service._process = AsyncMock()
+
+        result = await service.process(mock_project)
+
+        assert [(item.page_number, item.title) for item in result.items] == [(7, "第1章"), (21, "第2章")]
+        assert all(item.is_physical_page for item in result.items)
+        assert result.model == "pdf_outline"
+        service._process.assert_not_called()
+
+    @patch.object(chapter_search_service.ChapterSearchService, "_read_outline", MagicMock(return_value=[]))
+    async def test_process_falls_back_to_ocr(self, mock_project):
+        service = ChapterSearchService()
+        service._process = AsyncMock(return_value=[ChapterStartPageNumber(page_number=1, title="第1章")])
+
+        result = await service.process(mock_project)
+
+        assert [(item.page_number, item.title) for item in result.items] == [(1, "第1章")]
+        assert not result.items[0].is_physical_page
+        assert result.model == chapter_search_service.GEMINI_MODEL
+
+    @patch.object(chapter_search_service, "read_outline", MagicMock(side_effect=FileNotFoundError("pdftohtml")))
+    def test_read_outline_failure(self):
+        page_store = MagicMock()
+
+        assert ChapterSearchService._read_outline(page_store) == []
+
+
 class TestChapterSearchServiceIntegration:
     @pytest.mark.integration
-    @patch.object(chapter_search_service, "convert_from_path")
-    @patch.object(chapter_search_service.OCRImageFileService, "download_from_gcs")
+    @patch.object(chapter_search_service.ChapterSearchService, "_read_outline", MagicMock(return_value=[]))
+    @patch.object(chapter_search_service.PageStore, "get_page", new_callable=AsyncMock)
     @patch.object(chapter_search_service, "ocr_workflow")
     async def test_process_with_table_of_contents(
         self,
         mock_ocr_workflow,
-        mock_download_from_gcs,
-        mock_convert_from_path,
+        mock_get_page,
         mock_project,
         mock_images,
         mock_toc_ocr_result,
     ):
-        test_file_path = pathlib.Path("tests/resources/test_sample.pdf")
-        mock_download_from_gcs.return_value = test_file_path
-        mock_convert_from_path.return_value = mock_images
+        # 4ページ目以降は存在しない
+        mock_get_page.side_effect = lambda page_number: mock_images[page_number - 1] if page_number <= 3 else None
 
         mock_ocr_workflow.ainvoke = AsyncMock()
         mock_ocr_workflow.ainvoke.return_value = mock_toc_ocr_result
 
         service = ChapterSearchService()
-        results = await service.process(mock_project)
+        results = (await service.process(mock_project)).items
 
         assert len(results) == 6  # 3枚の画像 × 2章ずつ = 6章
-        assert all(isinstance(cp, ChapterStartPageNumber) for cp in results)
+        assert all(isinstance(cp, TableOfContentsItem) for cp in results)
         # 各画像で同じOCRResultが返されるため、章が重複する
         expected_titles = ["第1章 はじめに", "第2章 基本概念"] * 3
         actual_titles = [result.title for result in results]
         assert actual_titles == expected_titles
 
-        mock_download_from_gcs.assert_called_once_with("test_sample.pdf")
-        mock_convert_from_path.assert_called_once_with(test_file_path, first_page=0, last_page=20, dpi=150, fmt="RGB")
+        assert [call.args for call in mock_get_page.await_args_list] == [(i,) for i in range(1, 5)]
         assert mock_ocr_workflow.ainvoke.call_count == 3
 
     @pytest.mark.integration
-    @patch.object(chapter_search_service, "convert_from_path")
-    @patch.object(chapter_search_service.OCRImageFileService, "download_from_gcs")
+    @patch.object(chapter_search_service.ChapterSearchService, "_read_outline", MagicMock(return_value=[]))
+    @patch.object(chapter_search_service.PageStore, "get_page", new_callable=AsyncMock)
     @patch.object(chapter_search_service, "ocr_workflow")
     async def test_process_no_table_of_contents(
         self,
         mock_ocr_workflow,
-        mock_download_from_gcs,
-        mock_convert_from_path,
+        mock_get_page,
         mock_project,
         mock_images,
         mock_no_toc_ocr_result,
     ):
-        test_file_path = pathlib.Path("tests/resources/test_sample.pdf")
-        mock_download_from_gcs.return_value = test_file_path
-        mock_convert_from_path.return_value = mock_images
+        # 4ページ目以降は存在しない
+        mock_get_page.side_effect = lambda page_number: mock_images[page_number - 1] if page_number <= 3 else None
 
         mock_ocr_workflow.ainvoke = AsyncMock()
         mock_ocr_workflow.ainvoke.return_value = mock_no_toc_ocr_result
 
         service = ChapterSearchService()
-        results = await service.process(mock_project)
+        results = (await service.process(mock_project)).items
 
         assert len(results) == 0
         assert isinstance(results, list)
 
-        mock_download_from_gcs.assert_called_once_with("test_sample.pdf")
-        mock_convert_from_path.assert_called_once_with(test_file_path, first_page=0, last_page=20, dpi=150, fmt="RGB")
+        assert [call.args for call in mock_get_page.await_args_list] == [(i,) for i in range(1, 5)]
         assert mock_ocr_workflow.ainvoke.call_count == 3
@@ -1,8 +1,10 @@
-from unittest.mock import MagicMock
+import asyncio
+from unittest.mock import MagicMock, patch
 
 import pytest
 
 from bookcast.entities import Chapter, ChapterStatus
+from bookcast.services import chapter_service as chapter_service_module
 from bookcast.services.chapter_service import ChapterService
 
 
@@ -85,3 +87,81 @@ class TestCreateChapters:
 
         result = chapter_service_mock.create_chapters(chapters)
         assert result is not None
+
+
+class TestClaimChapters:
+    def test_claim_chapters(self, chapter_service_mock):
+        chapters = [
+            Chapter(id=1, project_id=1, chapter_number=1, start_page=1, end_page=5, status=ChapterStatus.not_started),
+            Chapter(id=2, project_id=1, chapter_number=2, start_page=6, end_page=10, status=ChapterStatus.not_started),
+            Chapter(id=3, project_id=1, chapter_number=3, start_page=11, end_page=15, status=ChapterStatus.start_ocr),
+        ]
+        # 2章目は他のワーカーが先に遷移させている
+        chapter_service_mock.chapter_repo.update_status_by_condition.side_effect = [chapters[0], None]
+
+        result = chapter_service_mock.claim_chapters(chapters, ChapterStatus.not_started, ChapterStatus.start_ocr)
+
+        assert [chapter.id for chapter in result] == [1]
+        assert chapters[0].status == ChapterStatus.start_ocr
+        assert chapters[1].status == ChapterStatus.not_started
+        assert chapter_service_mock.chapter_repo.update_status_by_condition.call_count == 2
+        assert chapter_service_mock.chapter_repo.update_status_by_condition.call_args.args[3] is not None
+
+
+class TestLease:
+    async def test_hold_lease_renews_until_finished(self, chapter_service_mock):
+        chapter = Chapter(
+            id=1, project_id=1, chapter_number=1, start_page=1, end_page=5, status=ChapterStatus.start_tts
+        )
+
+        with patch.object(chapter_service_module, "STAGE_HEARTBEAT_SECONDS", 0.01):
+            async with chapter_service_mock.hold_lease(chapter):
+                await asyncio.sleep(0.05)
+            renewed = chapter_service_mock.chapter_repo.update_lease.call_count
+            await asyncio.sleep(0.05)
+
+        assert renewed >= 2
+        assert chapter_service_mock.chapter_repo.update_lease.call_count == renewed
+        chapter_service_mock.project_repo.update_lease.assert_not_called()
+
+    def test_release_expired_chapter(self, chapter_service_mock):
+        chapter = Chapter(
+            id=1, project_id=1, chapter_number=1, start_page=1, end_page=5, status=ChapterStatus.start_tts
+        )
+        chapter_service_mock.chapter_repo.release_expired_lease.return_value = chapter
+
+        result = chapter_service_mock.release_expired_chapter(chapter, ChapterStatus.writing_script_completed)
+
+        assert result is chapter
+        assert chapter.status == ChapterStatus.writing_script_completed
+        assert chapter.attempts == 1
+        args = chapter_service_mock.chapter_repo.release_expired_lease.call_args.args
+        assert args[:3] == (1, ChapterStatus.start_tts, ChapterStatus.writing_script_completed)
+        assert args[4] == 1
+
+    def test_release_expired_chapter_fails_after_max_attempts(self, chapter_service_mock):
+        chapter = Chapter(
+            id=1, project_id=1, chapter_number=1, start_page=1, end_page=5, status=ChapterStatus.start_tts, attempts=2
+        )
+        chapter_service_mock.chapter_repo.release_expired_lease.return_value = chapter
+
+        with patch.object(chapter_service_module, "STAGE_MAX_ATTEMPTS", 3):
+            result = chapter_service_mock.release_expired_chapter(chapter, ChapterStatus.writing_script_completed)
+
+        assert result is chapter
+        assert chapter.status == ChapterStatus.failed
+        assert chapter.attempts == 3
+        args = chapter_service_mock.chapter_repo.release_expired_lease.call_args.args
+        assert args[:3] == (1, ChapterStatus.start_tts, ChapterStatus.failed)
+        assert args[4] == 3
+
+    def test_release_expired_chapter_already_renewed(self, chapter_service_mock):
+        chapter = Chapter(
+            id=1, project_id=1, chapter_number=1, start_page=1, end_page=5, status=ChapterStatus.start_tts
+        )
+        chapter_service_mock.chapter_repo.release_expired_lease.return_value = None
+
+        result = chapter_service_mock.release_expired_chapter(chapter, ChapterStatus.writing_script_completed)
+
+        assert result is None
+        assert chapter.status == ChapterStatus.start_tts
@@ -0,0 +1,108 @@
+import sqlite3
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_openai import ChatOpenAI
+from langgraph.func import entrypoint
+
+from bookcast.infrastructure import sqlite
+from bookcast.services import llm_cache
+from bookcast.services.llm_cache import LLMResponseCache, build_llm_cache_key, cached_llm_response
+from bookcast.services.script_writing_service import PodcastTopic, write_script
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = LLMResponseCache(tmp_path / "llm_cache.sqlite3", ttl_seconds=60, max_entries=2)
+    with (
+        patch.object(llm_cache, "LLM_CACHE_ENABLED", True),
+        patch.object(llm_cache, "get_llm_response_cache", return_value=cache),
+    ):
+        yield cache
+
+
+def build_prompt(text: str):
+    return ChatPromptTemplate([("human", "{text}")]).invoke({"text": text})
+
+
+class TestBuildLLMCacheKey:
+    def test_depends_on_model_temperature_output_and_prompt(self):
+        llm = ChatOpenAI(model="gpt-5", temperature=0.2, api_key="dummy")
+        key = build_llm_cache_key(llm, build_prompt("a"), "text")
+
+        assert key == build_llm_cache_key(llm, build_prompt("a"), "text")
+        assert key != build_llm_cache_key(llm, build_prompt("b"), "text")
+        assert key != build_llm_cache_key(llm, build_prompt("a"), "EvaluateResult")
+        assert key != build_llm_cache_key(llm.model_copy(update={"temperature": 0.5}), build_prompt("a"), "text")
+        assert key != build_llm_cache_key(llm.model_copy(update={"model_name": "gpt-4o"}), build_prompt("a"), "text")
+
+
+class TestLLMResponseCache:
+    def test_expires_after_ttl(self, cache):
+        cache.put("a", "write", "response")
+        assert cache.get("a") == "response"
+
+        with patch.object(llm_cache.time, "time", return_value=time.time() + 61):
+            assert cache.get("a") is None
+
+    def test_closes_connections(self, cache):
+        connections = []
+        real_connect = sqlite3.connect
+
+        def connect(*args, **kwargs):
+            connections.append(real_connect(*args, **kwargs))
+            return connections[-1]
+
+        with patch.object(sqlite.sqlite3, "connect", side_effect=connect):
+            cache.put("a", "write", "response")
+            assert cache.get("a") == "response"
+
+        assert len(connections) == 2
+        for connection in connections:
+            with pytest.raises(sqlite3.ProgrammingError):
+                connection.execute("select 1")
+
+    def test_evicts_least_recently_used(self, cache):
+        cache.put("a", "write", "A")
+        cache.put("b", "write", "B")
+        # aを使ったので、次に追加したときに削除されるのはb
+        assert cache.get("a") == "A"
+        cache.put("c", "write", "C")
+
+        assert cache.get("a") == "A"
+        assert cache.get("b") is None
+        assert cache.get("c") == "C"
+
+
+class TestCachedLLMResponse:
+    async def test_reuses_response_unless_opted_out(self, cache):
+        llm = ChatOpenAI(model="gpt-5", api_key="dummy")
+        generate = AsyncMock(side_effect=["1回目", "2回目"])
+
+        assert await cached_llm_response("write", llm, build_prompt("a"), generate) == "1回目"
+        assert await cached_llm_response("write", llm, build_prompt("a"), generate) == "1回目"
+        assert await cached_llm_response("write", llm, build_prompt("a"), generate, use_cache=False) == "2回目"
+        assert generate.await_count == 2
+
+    @patch.object(ChatOpenAI, "_agenerate", new_callable=AsyncMock)
+    async def test_rerun_of_write_script_does_not_call_llm(self, mock_agenerate, cache):
+        mock_agenerate.return_value = ChatResult(
+            generations=[ChatGeneration(message=AIMessage(content="Speaker1: 台本"))]
+        )
+        topics = [PodcastTopic(title="トピック", description="概要")]
+
+        @entrypoint()
+        async def workflow(source_text: str) -> str:
+            llm = ChatOpenAI(model="gpt-5", temperature=0.2, api_key="dummy")
+            return await write_script(llm, source_text, topics)
+
+        assert await workflow.ainvoke("本文です。") == "Speaker1: 台本"
+        assert await workflow.ainvoke("本文です。") == "Speaker1: 台本"
+        mock_agenerate.assert_awaited_once()
+
+        await workflow.ainvoke("別の本文です。")
+        assert mock_agenerate.await_count == 2
@@ -0,0 +1,85 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from google.genai import types
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_openai import ChatOpenAI
+from pydantic import BaseModel
+
+from bookcast.services import llm_recorder
+from bookcast.services.llm_recorder import ProviderRecorder, RecordingChatOpenAI, RecordingGenaiClient
+
+
+class Answer(BaseModel):
+    value: str
+
+
+@pytest.fixture
+def use_recorder(tmp_path, monkeypatch):
+    def use(mode: str, latency_scale: float = 1.0) -> ProviderRecorder:
+        recorder = ProviderRecorder(mode, tmp_path / "recordings", latency_scale=latency_scale)
+        monkeypatch.setattr(llm_recorder, "get_provider_recorder", lambda: recorder)
+        return recorder
+
+    return use
+
+
+def build_chat_result() -> ChatResult:
+    message = AIMessage(
+        content="",
+        tool_calls=[{"name": "Answer", "args": {"value": "答え"}, "id": "call_1"}],
+        usage_metadata={"input_tokens": 10, "output_tokens": 5, "total_tokens": 15},
+    )
+    return ChatResult(generations=[ChatGeneration(message=message)], llm_output={"model_name": "gpt-5"})
+
+
+class TestProviderRecorder:
+    async def test_replays_recorded_chat_response_without_provider(self, use_recorder):
+        llm = RecordingChatOpenAI(model="gpt-5", temperature=0.2, api_key="dummy")
+        chain = llm.with_structured_output(Answer, method="function_calling")
+
+        use_recorder("record")
+        with patch.object(ChatOpenAI, "_agenerate", new_callable=AsyncMock, return_value=build_chat_result()):
+            recorded = await chain.ainvoke("質問です")
+
+        use_recorder("replay", latency_scale=0.5)
+        with (
+            patch.object(ChatOpenAI, "_agenerate", new_callable=AsyncMock) as mock_agenerate,
+            patch.object(llm_recorder.asyncio, "sleep", new_callable=AsyncMock) as mock_sleep,
+        ):
+            replayed = await chain.ainvoke("質問です")
+
+            with pytest.raises(LookupError):
+                await chain.ainvoke("別の質問です")
+
+        assert recorded == replayed == Answer(value="答え")
+        mock_agenerate.assert_not_called()
+        # 記録した応答時間に倍率を掛けた分だけ待つ
+        assert 0 <= mock_sleep.await_args_list[0].args[0] < 1
+
+    async def test_replays_genai_audio(self, use_recorder):
+        response = types.GenerateContentResponse(
+            candidates=[
+                types.Candidate(content=types.Content(parts=[types.Part(inline_data=types.Blob(data=b"\x00\xffpcm"))]))
+            ]
+        )
+        config = types.GenerateContentConfig(response_modalities=["AUDIO"])
+        client = MagicMock()
+        client.aio.models.generate_content = AsyncMock(return_value=response)
+        recording_client = RecordingGenaiClient(client)
+
+        use_recorder("record")
+        await recording_client.aio.models.generate_content(model="tts", contents="Speaker1: こんにちは", config=config)
+
+        use_recorder("replay", latency_scale=0)
+        replayed = await recording_client.aio.models.generate_content(
+            model="tts", contents="Speaker1: こんにちは", config=config
+        )
+
+        assert replayed.candidates[0].content.parts[0].inline_data.data == b"\x00\xffpcm"
+        client.aio.models.generate_content.assert_awaited_once()
+
+    def test_rejects_unknown_mode(self, tmp_path):
+        with pytest.raises(ValueError):
+            ProviderRecorder("offline", tmp_path)
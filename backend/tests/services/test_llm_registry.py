@@ -0,0 +1,62 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from bookcast.services import llm_registry
+from bookcast.services.llm_recorder import RecordingGenaiClient
+from bookcast.services.llm_registry import get_gemini_chat_model, get_openai_chat_model, prewarm_llm_clients
+
+
+class TestLLMRegistry:
+    @patch.object(llm_registry, "GEMINI_API_KEY", "dummy")
+    def test_reuses_chat_model_with_same_parameters(self, monkeypatch):
+        # ChatOpenAIは環境変数からAPIキーを読むので、認証情報がなくても作成できるようにする
+        monkeypatch.setenv("OPENAI_API_KEY", "dummy")
+        llm = get_gemini_chat_model("gemini-2.0-flash", temperature=0.01)
+
+        assert get_gemini_chat_model("gemini-2.0-flash", temperature=0.01) is llm
+        assert get_gemini_chat_model("gemini-2.0-flash", temperature=0.2) is not llm
+        assert get_openai_chat_model("gpt-5", temperature=0.2) is get_openai_chat_model("gpt-5", temperature=0.2)
+
+    def test_creates_one_client_across_threads(self):
+        factory = MagicMock(side_effect=lambda: object())
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            clients = list(executor.map(lambda _: llm_registry._get_or_create(("test", "threads"), factory), range(32)))
+
+        assert factory.call_count == 1
+        assert all(client is clients[0] for client in clients)
+
+    @patch.object(llm_registry, "PREWARM_OPENAI_CHAT_MODELS", [])
+    @patch.object(llm_registry, "PREWARM_GEMINI_CHAT_MODELS", [])
+    @patch.object(llm_registry, "PREWARM_GENAI_MODELS", ["gemini-2.5-flash-preview-tts"])
+    @patch.object(llm_registry, "get_genai_client")
+    async def test_prewarm_ignores_failures(self, mock_get_genai_client):
+        mock_get_genai_client.return_value.aio.models.get = AsyncMock(side_effect=ConnectionError("offline"))
+
+        await prewarm_llm_clients()
+
+        mock_get_genai_client.return_value.aio.models.get.assert_awaited_once_with(model="gemini-2.5-flash-preview-tts")
+
+    @patch.object(llm_registry, "PREWARM_OPENAI_CHAT_MODELS", [])
+    @patch.object(llm_registry, "PREWARM_GEMINI_CHAT_MODELS", [("gemini-2.5-flash", 0.2)])
+    @patch.object(llm_registry, "PREWARM_GENAI_MODELS", ["gemini-2.5-flash-preview-tts"])
+    @patch.object(llm_registry, "GEMINI_API_KEY", None)
+    @patch.object(llm_registry, "get_genai_client")
+    async def test_prewarm_without_api_key(self, mock_get_genai_client, monkeypatch):
+        monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+        monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+        mock_get_genai_client.return_value.aio.models.get = AsyncMock()
+
+        # チャットモデルの作成に失敗しても、他のモデルの準備と起動は続ける
+        await prewarm_llm_clients()
+
+        mock_get_genai_client.return_value.aio.models.get.assert_awaited_once_with(model="gemini-2.5-flash-preview-tts")
+
+    @patch.object(llm_registry, "LLM_PROVIDER_MODE", "replay")
+    @patch.object(llm_registry, "get_genai_client")
+    async def test_replay_mode_records_and_skips_prewarm(self, mock_get_genai_client):
+        assert isinstance(llm_registry._create_genai_client(), RecordingGenaiClient)
+
+        await prewarm_llm_clients()
+
+        mock_get_genai_client.assert_not_called()
@@ -1,16 +1,15 @@
-import base64
-import io
+import asyncio
 import pathlib
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from langchain_google_genai import ChatGoogleGenerativeAI
-from PIL import Image
 
 from bookcast.config import GEMINI_API_KEY
 from bookcast.entities import Chapter, ChapterStatus, Project, ProjectStatus
 from bookcast.services import file_service, ocr_service
-from bookcast.services.ocr_service import OCRService
+from bookcast.services.ocr_service import OCRResult, OCRService, needs_calibration
+from bookcast.services.page_renderer import RenderedPage
 
 
 @pytest.fixture
@@ -26,9 +25,7 @@ async def test_ocr_service_extract(mock_ocr_workflow):
     mock_chapter_service = MagicMock()
     service = OCRService(mock_chapter_service)
 
-    test_image = Image.new("RGB", (100, 100), color="red")
-
-    result = await service._extract(test_image)
+    result = await service._extract("base64-image", 0.05)
 
     assert result == "Extracted text"
     assert mock_ocr_workflow.ainvoke.called
@@ -38,6 +35,439 @@ async def test_ocr_service_extract(mock_ocr_workflow):
     assert kwargs["config"]["run_name"] == "OCRAgent"
 
 
+class TestOCRCache:
+    @patch.object(ocr_service, "OCRCacheFileService")
+    @patch.object(ocr_service, "ocr_workflow")
+    async def test_extract_pages_text_saves_result(self, mock_ocr_workflow, mock_cache_file_service):
+        mock_ocr_workflow.ainvoke = AsyncMock(return_value="Extracted text")
+        mock_cache_file_service.download_from_gcs.return_value = None
+        mock_cache_file_service.write.return_value = pathlib.Path("downloads/ocr_cache/ab/abc.txt")
+
+        project = Project(id=1, filename="test.pdf", status=ProjectStatus.start_ocr)
+        page = ocr_service.Page(page_number=1, base64_image="base64-image")
+
+        result = await OCRService(MagicMock())._extract_pages_text(project, [page])
+
+        assert result == ["Extracted text"]
+        # 1ページにつき、保存済みの結果の確認と保存をそれぞれ1回だけ行う
+        mock_cache_file_service.download_from_gcs.assert_called_once_with(
+            ocr_service.build_ocr_cache_key("base64-image")
+        )
+        mock_cache_file_service.write.assert_called_once_with(
+            ocr_service.build_ocr_cache_key("base64-image"), "Extracted text"
+        )
+        mock_cache_file_service.upload_gcs_from_file.assert_called_once_with(
+            pathlib.Path("downloads/ocr_cache/ab/abc.txt")
+        )
+
+    @patch.object(ocr_service, "OCRCacheFileService")
+    @patch.object(ocr_service, "ocr_workflow")
+    async def test_extract_pages_text_uses_cached_result(self, mock_ocr_workflow, mock_cache_file_service):
+        mock_ocr_workflow.ainvoke = AsyncMock()
+        mock_cache_file_service.download_from_gcs.return_value = pathlib.Path("downloads/ocr_cache/ab/abc.txt")
+        mock_cache_file_service.read.return_value = "Cached text"
+
+        project = Project(id=1, filename="test.pdf", status=ProjectStatus.start_ocr)
+        page = ocr_service.Page(page_number=1, base64_image="base64-image")
+
+        result = await OCRService(MagicMock())._extract_pages_text(project, [page])
+
+        assert result == ["Cached text"]
+        mock_ocr_workflow.ainvoke.assert_not_called()
+        mock_cache_file_service.read.assert_called_once_with(ocr_service.build_ocr_cache_key("base64-image"))
+        mock_cache_file_service.write.assert_not_called()
+
+    @patch.object(ocr_service.OCRService, "_save_cache")
+    @patch.object(ocr_service.OCRService, "_load_cache")
+    @patch.object(ocr_service, "batch_ocr_workflow")
+    async def test_extract_pages_text_skips_cached_pages(
+        self, mock_batch_ocr_workflow, mock_load_cache, mock_save_cache
+    ):
+        mock_load_cache.side_effect = lambda key: "Cached" if key == ocr_service.build_ocr_cache_key("page-2") else None
+        mock_batch_ocr_workflow.ainvoke = AsyncMock(return_value=["Text 1", "Text 3"])
+        project = Project(id=1, filename="test.pdf", status=ProjectStatus.start_ocr)
+        pages = [ocr_service.Page(page_number=i, base64_image=f"page-{i}", ink_ratio=0.05) for i in range(1, 4)]
+
+        result = await OCRService(MagicMock())._extract_pages_text(project, pages)
+
+        assert result == ["Text 1", "Cached", "Text 3"]
+        inputs = mock_batch_ocr_workflow.ainvoke.call_args.args[0]
+        assert inputs.base64_images == ["page-1", "page-3"]
+        assert mock_load_cache.call_count == 3
+        assert mock_save_cache.call_count == 2
+
+    def test_cache_key_depends_on_image_prompt_and_model(self):
+        key = ocr_service.build_ocr_cache_key("base64-image")
+
+        assert key == ocr_service.build_ocr_cache_key("base64-image")
+        assert key != ocr_service.build_ocr_cache_key("another-image")
+        with patch.object(ocr_service, "GEMINI_MODEL", "gemini-2.5-flash"):
+            assert key != ocr_service.build_ocr_cache_key("base64-image")
+        with patch.object(ocr_service, "OCR_PROMPT", "別のプロンプト"):
+            assert key != ocr_service.build_ocr_cache_key("base64-image")
+
+
+class TestOCRCalibrationGate:
+    BODY_TEXT = (
+        "本書では、PDFからポッドキャストを生成する方法について説明します。"
+        "まずは全体の流れを確認し、次にOCRで本文を読み取る仕組みを見ていきます。"
+        "読み取った本文は章ごとにまとめられ、二人の話者による対話形式の台本に書き換えられます。"
+        "最後に台本を音声合成にかけ、ジングルを挟んで一つの音声ファイルにつなげます。"
+    )
+
+    def test_plausible_page_skips_calibration(self):
+        result = OCRResult(extracted_string=self.BODY_TEXT)
+
+        assert needs_calibration(result, ink_ratio=0.03) is False
+
+    def test_blank_page_skips_calibration(self):
+        assert needs_calibration(OCRResult(extracted_string=""), ink_ratio=0.001) is False
+
+    def test_error_reason_needs_calibration(self):
+        result = OCRResult(extracted_string=self.BODY_TEXT, error_reason="画像がぼやけている")
+
+        assert needs_calibration(result, ink_ratio=0.06) is True
+
+    def test_missing_text_needs_calibration(self):
+        assert needs_calibration(OCRResult(extracted_string="第1章"), ink_ratio=0.06) is True
+
+    def test_too_much_text_needs_calibration(self):
+        assert needs_calibration(OCRResult(extracted_string=self.BODY_TEXT * 2), ink_ratio=0.006) is True
+
+    def test_repeated_text_needs_calibration(self):
+        result = OCRResult(extracted_string=self.BODY_TEXT + "そうですね、" * 10)
+
+        assert needs_calibration(result, ink_ratio=0.06) is True
+
+    @patch.object(ocr_service, "calibrate_result", new_callable=AsyncMock)
+    @patch.object(ocr_service, "execute_ocr", new_callable=AsyncMock)
+    async def test_workflow_skips_calibration(self, mock_execute_ocr, mock_calibrate_result, llm):
+        mock_execute_ocr.return_value = OCRResult(extracted_string=self.BODY_TEXT)
+
+        result = await ocr_service.ocr_workflow.ainvoke(
+            ocr_service.OCRWorkflowInput(base64_image="base64-image", ink_ratio=0.03, llm=llm)
+        )
+
+        assert result == self.BODY_TEXT
+        mock_calibrate_result.assert_not_called()
+
+    @patch.object(ocr_service, "calibrate_result", new_callable=AsyncMock)
+    @patch.object(ocr_service, "execute_ocr", new_callable=AsyncMock)
+    async def test_workflow_calibrates_flagged_page(self, mock_execute_ocr, mock_calibrate_result, llm):
+        mock_execute_ocr.return_value = OCRResult(extracted_string="第1章", error_reason="一部が読み取れない")
+        mock_calibrate_result.return_value = (False, "第1章 はじめに")
+
+        result = await ocr_service.ocr_workflow.ainvoke(
+            ocr_service.OCRWorkflowInput(base64_image="base64-image", ink_ratio=0.06, llm=llm)
+        )
+
+        assert result == "第1章 はじめに"
+        mock_calibrate_result.assert_awaited_once_with(llm, "base64-image", "第1章")
+
+
+class TestOCRStreaming:
+    @patch.object(ocr_service, "OCR_PAGE_WORKERS", 2)
+    @patch.object(ocr_service, "OCR_PAGE_QUEUE_SIZE", 1)
+    @patch.object(ocr_service, "OCR_BATCH_SIZE", 1)
+    @patch.object(ocr_service, "extract_text_layers", MagicMock(return_value=[]))
+    @patch.object(ocr_service.PageStore, "get_page")
+    async def test_extract_chapter_text_renders_pages_lazily(self, mock_get_page):
+        rendered = []
+
+        async def get_page(page_number):
+            rendered.append(page_number)
+            return RenderedPage(base64_image=f"page-{page_number}", ink_ratio=0.05)
+
+        mock_get_page.side_effect = get_page
+
+        project = Project(id=1, filename="test.pdf", status=ProjectStatus.start_ocr)
+        chapter = Chapter(
+            id=1, project_id=1, chapter_number=1, start_page=3, end_page=13, status=ChapterStatus.start_ocr
+        )
+        mock_chapter_service = MagicMock()
+        service = OCRService(mock_chapter_service)
+
+        max_pending = 0
+
+        async def extract_pages_text(project, pages):
+            nonlocal max_pending
+            # 描画済みで、まだOCRが終わっていないページ数
+            max_pending = max(max_pending, len(rendered) - len(done))
+            await asyncio.sleep(0.01)
+            done.extend(page.page_number for page in pages)
+            return [str(page.page_number) for page in pages]
+
+        done = []
+        service._extract_pages_text = extract_pages_text
+
+        await service._extract_chapter_text(project, chapter, pathlib.Path("test.pdf"))
+
+        assert rendered == list(range(3, 13))
+        # ワーカー数 + キューの長さ + 描画中の1ページまでしか先行して描画しない
+        assert max_pending <= 2 + 1 + 1
+        assert chapter.status == ChapterStatus.ocr_completed
+        assert chapter.extracted_text == "\n".join(str(page_number) for page_number in range(3, 13))
+        mock_chapter_service.update.assert_called_once_with(chapter)
+
+    @patch.object(ocr_service, "OCR_PAGE_WORKERS", 2)
+    @patch.object(ocr_service, "extract_text_layers", MagicMock(return_value=[]))
+    @patch.object(ocr_service.PageStore, "get_page", new_callable=AsyncMock)
+    async def test_extract_chapter_text_propagates_error(self, mock_get_page):
+        mock_get_page.return_value = RenderedPage(base64_image="base64-image", ink_ratio=0.05)
+
+        project = Project(id=1, filename="test.pdf", status=ProjectStatus.start_ocr)
+        chapter = Chapter(
+            id=1, project_id=1, chapter_number=1, start_page=1, end_page=30, status=ChapterStatus.start_ocr
+        )
+        service = OCRService(MagicMock())
+        service._extract_pages_text = AsyncMock(side_effect=RuntimeError("boom"))
+
+        with pytest.raises(RuntimeError, match="boom"):
+            await service._extract_chapter_text(project, chapter, pathlib.Path("test.pdf"))
+
+        service.chapter_service.update.assert_not_called()
+        assert ocr_service.get_ocr_page_pool().workers == []
+
+    @patch.object(ocr_service, "OCR_PAGE_WORKERS", 2)
+    @patch.object(ocr_service, "OCR_BATCH_SIZE", 4)
+    @patch.object(ocr_service, "extract_text_layers", MagicMock(return_value=[]))
+    @patch.object(ocr_service.PageStore, "get_page")
+    async def test_process_shares_page_queue_across_chapters(self, mock_get_page):
+        async def get_page(page_number):
+            await asyncio.sleep(0)
+            return RenderedPage(base64_image=f"page-{page_number}", ink_ratio=0.05)
+
+        mock_get_page.side_effect = get_page
+
+        project = Project(id=1, filename="test.pdf", status=ProjectStatus.start_ocr)
+        chapters = [
+            Chapter(id=1, project_id=1, chapter_number=1, start_page=1, end_page=3, status=ChapterStatus.start_ocr),
+            Chapter(id=2, project_id=1, chapter_number=2, start_page=3, end_page=4, status=ChapterStatus.start_ocr),
+            Chapter(id=3, project_id=1, chapter_number=3, start_page=4, end_page=7, status=ChapterStatus.start_ocr),
+            Chapter(id=4, project_id=1, chapter_number=4, start_page=7, end_page=9, status=ChapterStatus.ocr_completed),
+        ]
+        service = OCRService(MagicMock())
+        started_workers = []
+
+        async def extract_pages_text(project, pages):
+            started_workers.append(len(ocr_service.get_ocr_page_pool().workers))
+            await asyncio.sleep(0.01)
+            return [str(page.page_number) for page in pages]
+
+        service._extract_pages_text = extract_pages_text
+
+        await service._process(project, chapters, pathlib.Path("test.pdf"))
+
+        assert [chapter.extracted_text for chapter in chapters[:3]] == ["1\n2", "3", "4\n5\n6"]
+        assert all(chapter.status == ChapterStatus.ocr_completed for chapter in chapters[:3])
+        assert service.chapter_service.update.call_count == 3
+        # 章ごとではなく、全ての章で共有するワーカーだけが動く
+        assert set(started_workers) == {2}
+        assert ocr_service.get_ocr_page_pool().workers == []
+
+    @patch.object(ocr_service, "OCR_PAGE_WORKERS", 2)
+    @patch.object(ocr_service, "extract_text_layers", MagicMock(return_value=[]))
+    @patch.object(ocr_service.PageStore, "get_book_path", MagicMock(return_value=pathlib.Path("test.pdf")))
+    @patch.object(ocr_service.PageStore, "get_page")
+    async def test_concurrent_requests_share_page_workers(self, mock_get_page):
+        async def get_page(page_number):
+            await asyncio.sleep(0)
+            return RenderedPage(base64_image=f"page-{page_number}", ink_ratio=0.05)
+
+        mock_get_page.side_effect = get_page
+
+        project = Project(id=1, filename="test.pdf", status=ProjectStatus.start_ocr)
+        workers = set()
+
+        async def extract_pages_text(project, pages):
+            workers.update(ocr_service.get_ocr_page_pool().workers)
+            await asyncio.sleep(0.01)
+            return [str(page.page_number) for page in pages]
+
+        # 章ごとのリクエストはそれぞれOCRServiceを作成する
+        services = [OCRService(MagicMock()) for _ in range(3)]
+        chapters = []
+        for i, service in enumerate(services):
+            service._extract_pages_text = extract_pages_text
+            chapters.append(
+                Chapter(
+                    id=i + 1,
+                    project_id=1,
+                    chapter_number=i + 1,
+                    start_page=i * 3 + 1,
+                    end_page=i * 3 + 4,
+                    status=ChapterStatus.start_ocr,
+                )
+            )
+
+        await asyncio.gather(
+            *[service.process_chapter(project, chapter) for service, chapter in zip(services, chapters)]
+        )
+
+        assert [chapter.extracted_text for chapter in chapters] == ["1\n2\n3", "4\n5\n6", "7\n8\n9"]
+        assert len(workers) == 2
+
+    @patch.object(file_service.OCRImageFileService, "_download_from_gcs")
+    async def test_chapter_requests_reuse_downloaded_book(self, mock_download_from_gcs, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        mock_download_from_gcs.side_effect = lambda book_path: book_path.write_bytes(b"%PDF")
+        project = Project(id=1, filename="test.pdf", status=ProjectStatus.start_ocr)
+
+        # 章ごとのリクエストはそれぞれOCRServiceを作成する
+        book_paths = [await OCRService(MagicMock())._download_book(project) for _ in range(3)]
+
+        assert book_paths == [pathlib.Path("downloads/test/test.pdf")] * 3
+        mock_download_from_gcs.assert_called_once()
+
+
+class TestOCRPagePool:
+    @patch.object(ocr_service, "OCR_PAGE_WORKERS", 2)
+    async def test_attach_while_previous_job_detaches(self):
+        pool = ocr_service.OCRPagePool()
+        release = asyncio.Event()
+
+        async def first_job():
+            async with pool.attach():
+                await release.wait()
+
+        first = asyncio.create_task(first_job())
+        await asyncio.sleep(0)
+        old_workers = list(pool.workers)
+
+        release.set()
+        # 1つ目の章はワーカーを止め終わるのを待っている
+        await asyncio.sleep(0)
+        assert pool.active_jobs == 0
+
+        async def extract_pages_text(project, pages):
+            return [str(page.page_number) for page in pages]
+
+        project = Project(id=1, filename="test.pdf", status=ProjectStatus.start_ocr)
+        chapter = Chapter(id=1, project_id=1, chapter_number=1, start_page=1, end_page=2)
+        job = ocr_service.ChapterOCRJob(project, chapter, extract_pages_text)
+        async with pool.attach() as queue:
+            await first
+            assert pool.queue is queue
+            assert len(pool.workers) == 2
+            assert all(worker.cancelled() for worker in old_workers)
+
+            await queue.put((job, ocr_service.Page(page_number=1, base64_image="page-1")))
+            results = await job.done
+
+        assert [result.extracted_text for result in results] == ["1"]
+        assert pool.workers == []
+        assert pool.queue is None
+
+
+class TestBatchOCR:
+    def pages(self, count: int) -> list:
+        return [ocr_service.Page(page_number=i + 1, base64_image=f"page-{i + 1}", ink_ratio=0.05) for i in range(count)]
+
+    @patch.object(ocr_service, "OCR_BATCH_SIZE", 3)
+    async def test_consume_pages_in_batches(self):
+        project = Project(id=1, filename="test.pdf", status=ProjectStatus.start_ocr)
+        chapter = Chapter(
+            id=1, project_id=1, chapter_number=1, start_page=1, end_page=8, status=ChapterStatus.start_ocr
+        )
+        batches = []
+
+        async def extract_pages_text(project, pages):
+            batches.append([page.page_number for page in pages])
+            return [str(page.page_number) for page in pages]
+
+        job = ocr_service.ChapterOCRJob(project, chapter, extract_pages_text)
+        queue = asyncio.Queue()
+        for page in self.pages(7):
+            queue.put_nowait((job, page))
+
+        worker = asyncio.create_task(ocr_service.OCRPagePool()._consume_pages(queue))
+        results = await job.done
+        worker.cancel()
+
+        assert batches == [[1, 2, 3], [4, 5, 6], [7]]
+        assert [result.extracted_text for result in results] == [str(i) for i in range(1, 8)]
+
+    @patch.object(ocr_service, "OCR_BATCH_SIZE", 4)
+    async def test_idle_workers_batch_pages_arriving_one_by_one(self):
+        project = Project(id=1, filename="test.pdf", status=ProjectStatus.start_ocr)
+        chapter = Chapter(
+            id=1, project_id=1, chapter_number=1, start_page=1, end_page=9, status=ChapterStatus.start_ocr
+        )
+        batches = []
+
+        async def extract_pages_text(project, pages):
+            batches.append([page.page_number for page in pages])
+            return [str(page.page_number) for page in pages]
+
+        job = ocr_service.ChapterOCRJob(project, chapter, extract_pages_text)
+        async with ocr_service.OCRPagePool().attach() as queue:
+            # 描画を終えたページから1枚ずつキューに入り、その間ワーカーは空いている
+            for page in self.pages(8):
+                await queue.put((job, page))
+                await asyncio.sleep(0.001)
+            results = await job.done
+
+        assert batches == [[1, 2, 3, 4], [5, 6, 7, 8]]
+        assert [result.extracted_text for result in results] == [str(i) for i in range(1, 9)]
+
+    @patch.object(ocr_service, "ocr_workflow")
+    @patch.object(ocr_service, "batch_ocr_workflow")
+    async def test_extract_batch_falls_back_to_single_pages(self, mock_batch_ocr_workflow, mock_ocr_workflow):
+        mock_batch_ocr_workflow.ainvoke = AsyncMock(side_effect=ValueError("Batch OCR returned pages [1]"))
+        mock_ocr_workflow.ainvoke = AsyncMock(side_effect=["Text 1", "Text 2"])
+
+        result = await OCRService(MagicMock())._extract_batch(self.pages(2))
+
+        assert result == ["Text 1", "Text 2"]
+        assert mock_ocr_workflow.ainvoke.call_count == 2
+
+    async def test_execute_batch_ocr_rejects_missing_pages(self, llm):
+        structured_llm = MagicMock()
+        structured_llm.ainvoke = AsyncMock(
+            return_value=ocr_service.BatchOCRResult(
+                pages=[ocr_service.PageOCRResult(page_index=1, extracted_string="Text 1")]
+            )
+        )
+
+        with (
+            patch.object(type(llm), "with_structured_output", return_value=structured_llm),
+            pytest.raises(ValueError),
+        ):
+            await ocr_service.execute_batch_ocr.func(llm, ["page-1", "page-2"])
+
+
+class TestOCRTextLayer:
+    @patch.object(ocr_service, "OCR_PAGE_WORKERS", 2)
+    @patch.object(ocr_service, "ocr_workflow")
+    @patch.object(ocr_service.PageStore, "get_page", new_callable=AsyncMock)
+    @patch.object(ocr_service, "extract_text_layers")
+    async def test_uses_text_layer_before_vision_ocr(self, mock_extract_text_layers, mock_get_page, mock_ocr_workflow):
+        born_digital = (
+            "本書では、PDFからポッドキャストを生成する方法について説明します。まずは全体の流れを確認しましょう。"
+        )
+        mock_extract_text_layers.return_value = [born_digital, ""]
+        mock_get_page.return_value = RenderedPage(base64_image="base64-image", ink_ratio=0.05)
+        mock_ocr_workflow.ainvoke = AsyncMock(return_value="Scanned text")
+
+        project = Project(id=1, filename="test.pdf", status=ProjectStatus.start_ocr)
+        chapter = Chapter(
+            id=1, project_id=1, chapter_number=1, start_page=1, end_page=3, status=ChapterStatus.start_ocr
+        )
+        service = OCRService(MagicMock())
+
+        with (
+            patch.object(ocr_service.OCRService, "_load_cache", return_value=None),
+            patch.object(ocr_service.OCRService, "_save_cache"),
+        ):
+            await service._extract_chapter_text(project, chapter, pathlib.Path("test.pdf"))
+
+        mock_extract_text_layers.assert_called_once_with(pathlib.Path("test.pdf"), 1, 2)
+        # 2ページ目だけが描画され、OCRされる
+        mock_get_page.assert_awaited_once_with(2)
+        assert mock_ocr_workflow.ainvoke.call_count == 1
+        assert chapter.extracted_text == f"{born_digital}\nScanned text"
+
+
 class TestOCRServiceIntegration:
     @pytest.mark.integration
     @patch.object(ocr_service, "ocr_workflow")
@@ -61,15 +491,3 @@ class TestOCRServiceIntegration:
 
         assert mock_ocr_workflow.ainvoke.call_count == 3
         assert mock_chapter_service.update.call_count == 2
-
-    def test_image_to_base64_png(self):
-        test_image = Image.new("RGB", (100, 100), color="red")
-
-        base64_result = OCRService.image_to_base64_png(test_image)
-
-        assert isinstance(base64_result, str)
-        assert len(base64_result) > 0
-
-        decoded_data = base64.b64decode(base64_result)
-        decoded_image = Image.open(io.BytesIO(decoded_data))
-        assert decoded_image.size == (100, 100)
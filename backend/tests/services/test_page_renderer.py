@@ -0,0 +1,70 @@
+import base64
+import io
+import os
+from unittest.mock import patch
+
+from PIL import Image
+
+from bookcast.services import page_renderer
+from bookcast.services.page_renderer import (
+    image_to_base64_png,
+    load_rendered_page,
+    measure_ink_ratio,
+    render_page_to_file,
+)
+
+
+class TestPageRenderer:
+    def test_image_to_base64_png(self):
+        test_image = Image.new("RGB", (100, 100), color="red")
+
+        base64_result = image_to_base64_png(test_image)
+
+        assert isinstance(base64_result, str)
+        assert len(base64_result) > 0
+
+        decoded_data = base64.b64decode(base64_result)
+        decoded_image = Image.open(io.BytesIO(decoded_data))
+        assert decoded_image.size == (100, 100)
+
+    def test_measure_ink_ratio(self):
+        image = Image.new("RGB", (10, 10), color="white")
+        image.paste((0, 0, 0), (0, 0, 10, 2))
+
+        assert measure_ink_ratio(image) == 0.2
+
+    @patch.object(page_renderer, "convert_from_path")
+    def test_render_page_to_file(self, mock_convert_from_path, tmp_path):
+        mock_convert_from_path.return_value = [Image.new("RGB", (10, 10))]
+        output_path = tmp_path / "page_003.png"
+
+        result = render_page_to_file("book.pdf", 3, 200, str(output_path))
+
+        assert result.ink_ratio == 1.0
+        assert load_rendered_page(str(output_path)) == result
+        mock_convert_from_path.assert_called_once_with("book.pdf", first_page=3, last_page=3, dpi=200, fmt="RGB")
+
+    @patch.object(page_renderer, "convert_from_path")
+    def test_render_page_to_file_out_of_range(self, mock_convert_from_path, tmp_path):
+        mock_convert_from_path.return_value = []
+        output_path = tmp_path / "page_999.png"
+
+        assert render_page_to_file("book.pdf", 999, 150, str(output_path)) is None
+        assert not output_path.exists()
+
+    @patch.object(page_renderer, "convert_from_path")
+    def test_render_page_to_file_replaces_after_saving(self, mock_convert_from_path, tmp_path):
+        mock_convert_from_path.return_value = [Image.new("RGB", (10, 10))]
+        output_path = tmp_path / "page_003.png"
+        replace = os.replace
+
+        def replace_after_saving(src, dst):
+            # 保存を終えるまで出力先には何も書かれない
+            assert not output_path.exists()
+            replace(src, dst)
+
+        with patch.object(page_renderer.os, "replace", side_effect=replace_after_saving) as mock_replace:
+            render_page_to_file("book.pdf", 3, 200, str(output_path))
+
+        mock_replace.assert_called_once()
+        assert list(tmp_path.iterdir()) == [output_path]
@@ -0,0 +1,94 @@
+import asyncio
+import pathlib
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import pytest
+from PIL import Image
+
+from bookcast.services import page_renderer, page_store
+from bookcast.services.file_service import PageImageFileService
+from bookcast.services.page_renderer import RenderedPage
+from bookcast.services.page_store import PageStore
+
+
+@pytest.fixture(autouse=True)
+def local_store(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with (
+        ThreadPoolExecutor() as executor,
+        patch.object(page_store, "get_render_pool", return_value=executor),
+        patch.object(PageImageFileService, "_download_from_gcs_if_exists", return_value=False),
+        patch.object(PageImageFileService, "upload_gcs_from_file") as mock_upload,
+    ):
+        yield mock_upload
+
+
+class TestPageStore:
+    @patch.object(page_renderer, "convert_from_path")
+    async def test_renders_each_page_once_per_dpi(self, mock_convert_from_path, local_store):
+        mock_convert_from_path.return_value = [Image.new("RGB", (10, 10), color="white")]
+        store = PageStore("book.pdf", pathlib.Path("book.pdf"))
+
+        first = await store.get_page(3)
+        second = await store.get_page(3)
+        await store.get_page(3, dpi=300)
+
+        assert first == second
+        assert first.ink_ratio == 0.0
+        # 2回目はpopplerを呼ばずに保存済みの画像を返す
+        assert [call.kwargs["dpi"] for call in mock_convert_from_path.call_args_list] == [150, 300]
+        assert local_store.call_count == 2
+        assert (await store.get_page_path(3)) == pathlib.Path("downloads/book/images/150dpi/page_003.png")
+
+    @patch.object(page_renderer, "convert_from_path")
+    async def test_concurrent_requests_share_rendering(self, mock_convert_from_path, local_store):
+        mock_convert_from_path.return_value = [Image.new("RGB", (10, 10))]
+        store = PageStore("book.pdf", pathlib.Path("book.pdf"))
+
+        results = await asyncio.gather(*[store.get_page(1) for _ in range(5)])
+
+        assert all(result == results[0] for result in results)
+        mock_convert_from_path.assert_called_once()
+        local_store.assert_called_once()
+
+    async def test_waits_for_rendering_instead_of_reading_partial_file(self):
+        rendered_page = RenderedPage(base64_image="page", ink_ratio=0.0)
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def render(page_number, dpi, image_path):
+            # 描画中のPNGは書きかけ
+            image_path.write_bytes(b"partial")
+            started.set()
+            await release.wait()
+            return rendered_page
+
+        store = PageStore("book.pdf", pathlib.Path("book.pdf"))
+        with patch.object(store, "_render", side_effect=render):
+            leader = asyncio.create_task(store.get_page(1))
+            await started.wait()
+            follower = asyncio.create_task(store.get_page(1))
+            await asyncio.sleep(0.01)
+            release.set()
+
+            assert await asyncio.gather(leader, follower) == [rendered_page, rendered_page]
+
+    @patch.object(page_renderer, "convert_from_path", MagicMock(return_value=[]))
+    async def test_missing_page(self, local_store):
+        store = PageStore("book.pdf", pathlib.Path("book.pdf"))
+
+        assert await store.get_page(999) is None
+        assert await store.get_page_path(999) is None
+        local_store.assert_not_called()
+
+    @patch.object(page_store.OCRImageFileService, "download_from_gcs")
+    @patch.object(page_renderer, "convert_from_path")
+    async def test_downloads_book_only_on_miss(self, mock_convert_from_path, mock_download_from_gcs):
+        mock_convert_from_path.return_value = [Image.new("RGB", (10, 10))]
+        mock_download_from_gcs.return_value = pathlib.Path("downloads/book/book.pdf")
+
+        await PageStore("book.pdf").get_page(1)
+        await PageStore("book.pdf").get_page(1)
+
+        mock_download_from_gcs.assert_called_once_with("book.pdf")
@@ -0,0 +1,58 @@
+import subprocess
+from unittest.mock import patch
+
+from bookcast.services import pdf_outline
+from bookcast.services.pdf_outline import OutlineItem, parse_outline, read_outline
+
+PDF2XML = """<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE pdf2xml SYSTEM "pdf2xml.dtd">
+<pdf2xml producer="poppler" version="24.02.0">
+<page number="1" position="absolute" top="0" left="0" height="842" width="595">
+<text top="100" left="100" width="50" height="12" font="0">表紙 & <b>タイトル</text>
+</page>
+<outline>
+<item page="3">はじめに</item>
+<item page="7">第1章　PDFの仕組み</item>
+<outline>
+<item page="8">1.1 ページ</item>
+</outline>
+<item page="21">第2章 音声合成</item>
+<item>リンク切れ</item>
+</outline>
+</pdf2xml>
+"""
+
+
+class TestPDFOutline:
+    def test_parse_outline_uses_top_level_items(self):
+        assert parse_outline(PDF2XML) == [
+            OutlineItem(page_number=3, title="はじめに"),
+            OutlineItem(page_number=7, title="第1章 PDFの仕組み"),
+            OutlineItem(page_number=21, title="第2章 音声合成"),
+        ]
+
+    def test_parse_outline_skips_book_title_level(self):
+        xml = """<pdf2xml><outline>
+<item page="1">書名</item>
+<outline>
+<item page="5">第1章</item>
+<item page="12">第2章</item>
+</outline>
+</outline></pdf2xml>"""
+
+        assert parse_outline(xml) == [
+            OutlineItem(page_number=5, title="第1章"),
+            OutlineItem(page_number=12, title="第2章"),
+        ]
+
+    def test_parse_outline_without_outline(self):
+        assert parse_outline('<pdf2xml><page number="1"></page></pdf2xml>') == []
+
+    @patch.object(pdf_outline.subprocess, "run")
+    def test_read_outline(self, mock_run):
+        mock_run.return_value = subprocess.CompletedProcess(args=[], returncode=0, stdout=PDF2XML.encode())
+
+        result = read_outline("book.pdf")
+
+        assert len(result) == 3
+        assert mock_run.call_args.args[0][:2] == ["pdftohtml", "-xml"]
@@ -1,14 +1,16 @@
+import asyncio
+import datetime as dt
 import pathlib
 import tempfile
 import zipfile
 from io import BytesIO
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
-from bookcast.entities import Chapter, ChapterStatus, Project, ProjectStatus
-from bookcast.services import file_service
-from bookcast.services.project_service import ProjectService
+from bookcast.entities import Chapter, ChapterStatus, Project, ProjectStatus, TableOfContents, TableOfContentsItem
+from bookcast.services import file_service, project_service
+from bookcast.services.project_service import ProjectService, derive_project_status
 
 
 def create_mock_project_service():
@@ -89,6 +91,71 @@ class TestUpdateProjectStatus:
         project_service_mock.project_repo.update.assert_called_once_with(project)
 
 
+class TestRefreshProjectStatus:
+    def test_derive_project_status(self):
+        chapters = [
+            Chapter(id=1, project_id=1, chapter_number=1, start_page=1, end_page=5, status=ChapterStatus.tts_completed),
+            Chapter(id=2, project_id=1, chapter_number=2, start_page=6, end_page=10, status=ChapterStatus.start_ocr),
+        ]
+
+        assert derive_project_status(chapters) == ProjectStatus.start_ocr
+
+    def test_derive_project_status_failed(self):
+        chapters = [
+            Chapter(id=1, project_id=1, chapter_number=1, start_page=1, end_page=5, status=ChapterStatus.failed),
+            Chapter(id=2, project_id=1, chapter_number=2, start_page=6, end_page=10, status=ChapterStatus.start_ocr),
+        ]
+
+        assert derive_project_status(chapters) == ProjectStatus.failed
+
+    def test_refresh_project_status(self, project_service_mock):
+        project = Project(id=1, filename="test.pdf", status=ProjectStatus.start_ocr)
+        project_service_mock.chapter_repo.select_chapter_by_project_id.return_value = [
+            Chapter(id=1, project_id=1, chapter_number=1, start_page=1, end_page=5, status=ChapterStatus.ocr_completed),
+            Chapter(id=2, project_id=1, chapter_number=2, start_page=6, end_page=10, status=ChapterStatus.start_tts),
+        ]
+
+        project_service_mock.refresh_project_status(project)
+
+        assert project.status == ProjectStatus.ocr_completed
+        project_service_mock.project_repo.update_status_by_condition.assert_called_once_with(
+            1, ProjectStatus.start_ocr, ProjectStatus.ocr_completed
+        )
+
+    def test_refresh_project_status_unchanged(self, project_service_mock):
+        project = Project(id=1, filename="test.pdf", status=ProjectStatus.start_tts)
+        project_service_mock.chapter_repo.select_chapter_by_project_id.return_value = [
+            Chapter(id=1, project_id=1, chapter_number=1, start_page=1, end_page=5, status=ChapterStatus.start_tts),
+        ]
+
+        project_service_mock.refresh_project_status(project)
+
+        project_service_mock.project_repo.update_status_by_condition.assert_not_called()
+
+    def test_refresh_project_status_retries_on_conflict(self, project_service_mock):
+        project = Project(id=1, filename="test.pdf", status=ProjectStatus.start_ocr)
+        chapter_repo = project_service_mock.chapter_repo
+        chapter_repo.select_chapter_by_project_id.side_effect = [
+            [
+                Chapter(
+                    id=1, project_id=1, chapter_number=1, start_page=1, end_page=5, status=ChapterStatus.ocr_completed
+                )
+            ],
+            [Chapter(id=1, project_id=1, chapter_number=1, start_page=1, end_page=5, status=ChapterStatus.start_tts)],
+        ]
+        project_repo = project_service_mock.project_repo
+        # 他のワーカーが先にステータスを進めていた
+        project_repo.update_status_by_condition.side_effect = [None, project]
+        project_repo.find.return_value = Project(id=1, filename="test.pdf", status=ProjectStatus.ocr_completed)
+
+        project_service_mock.refresh_project_status(project)
+
+        assert project.status == ProjectStatus.start_tts
+        project_repo.update_status_by_condition.assert_called_with(
+            1, ProjectStatus.ocr_completed, ProjectStatus.start_tts
+        )
+
+
 class TestCreateProject:
     @patch.object(file_service.OCRImageFileService, "write", return_value="/tmp/test.pdf")
     @patch.object(file_service.OCRImageFileService, "upload_gcs_from_file")
@@ -157,3 +224,71 @@ class TestCreateDownloadArchive:
                 assert zip_file.read("chapter_002.wav") == b"dummy audio data 2"
 
             project_service_mock.chapter_repo.select_chapter_by_project_id.assert_called_once_with(project.id)
+
+
+class TestExtractTableOfContents:
+    def table_of_contents(self, model: str = "gemini-2.5-flash") -> TableOfContents:
+        return TableOfContents(
+            items=[TableOfContentsItem(page_number=5, title="第1章")],
+            model=model,
+            extracted_at=dt.datetime(2026, 10, 17, tzinfo=dt.timezone.utc),
+        )
+
+    @patch.object(project_service, "ChapterSearchService")
+    async def test_extracts_and_saves(self, mock_chapter_search_service_class, project_service_mock):
+        table_of_contents = self.table_of_contents()
+        mock_chapter_search_service_class.return_value.process = AsyncMock(return_value=table_of_contents)
+        project = Project(id=1, filename="test1.pdf")
+
+        result = await project_service_mock.extract_table_of_contents(project)
+
+        assert result == table_of_contents
+        assert project.table_of_contents == table_of_contents
+        project_service_mock.project_repo.update_table_of_contents.assert_called_once_with(1, table_of_contents)
+
+    @patch.object(project_service, "ChapterSearchService")
+    async def test_refresh(self, mock_chapter_search_service_class, project_service_mock):
+        table_of_contents = self.table_of_contents(model="pdf_outline")
+        mock_chapter_search_service_class.return_value.process = AsyncMock(return_value=table_of_contents)
+        project = Project(id=1, filename="test1.pdf", table_of_contents=self.table_of_contents())
+
+        assert await project_service_mock.extract_table_of_contents(project) == self.table_of_contents()
+        mock_chapter_search_service_class.assert_not_called()
+
+        assert await project_service_mock.extract_table_of_contents(project, refresh=True) == table_of_contents
+        mock_chapter_search_service_class.return_value.process.assert_awaited_once()
+
+    @patch.object(project_service, "ChapterSearchService")
+    async def test_concurrent_requests_share_extraction(self, mock_chapter_search_service_class, project_service_mock):
+        table_of_contents = self.table_of_contents()
+
+        async def process(project):
+            await asyncio.sleep(0.01)
+            return table_of_contents
+
+        mock_chapter_search_service_class.return_value.process = AsyncMock(side_effect=process)
+
+        results = await asyncio.gather(
+            *[project_service_mock.extract_table_of_contents(Project(id=1, filename="test1.pdf")) for _ in range(3)]
+        )
+
+        assert results == [table_of_contents] * 3
+        mock_chapter_search_service_class.return_value.process.assert_awaited_once()
+        project_service_mock.project_repo.update_table_of_contents.assert_called_once()
+
+    @patch.object(project_service, "ChapterSearchService")
+    async def test_concurrent_requests_share_error(self, mock_chapter_search_service_class, project_service_mock):
+        async def process(project):
+            await asyncio.sleep(0.01)
+            raise RuntimeError("boom")
+
+        mock_chapter_search_service_class.return_value.process = AsyncMock(side_effect=process)
+
+        results = await asyncio.gather(
+            *[project_service_mock.extract_table_of_contents(Project(id=1, filename="test1.pdf")) for _ in range(2)],
+            return_exceptions=True,
+        )
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert project_service.ChapterSearchService.return_value.process.await_count == 1
+        assert project_service._extracting_table_of_contents.calls == {}
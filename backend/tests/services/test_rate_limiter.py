@@ -0,0 +1,159 @@
+import asyncio
+import importlib
+import time
+
+import pytest
+from google.genai.errors import ServerError
+from langchain_google_genai import ChatGoogleGenerativeAI
+from prometheus_client import REGISTRY
+
+from bookcast import config
+from bookcast.services.rate_limiter import (
+    AdaptiveConcurrencyLimit,
+    AdaptiveConcurrencyLimiter,
+    RateLimit,
+    RateLimiter,
+    TokenBucket,
+    get_llm_rate_limiter,
+    get_rate_limiter,
+)
+
+
+class TestTokenBucket:
+    async def test_take_waits_for_refill(self):
+        bucket = TokenBucket(capacity=2, refill_per_second=20)
+
+        start_time = time.monotonic()
+        for _ in range(3):
+            await bucket.take(1)
+
+        assert time.monotonic() - start_time >= 0.04
+
+    async def test_take_more_than_capacity(self):
+        bucket = TokenBucket(capacity=10, refill_per_second=10)
+
+        await bucket.take(100)
+
+        assert bucket.tokens == 0
+
+
+class TestRateLimiter:
+    async def test_max_concurrency(self):
+        rate_limiter = RateLimiter(
+            "test-model", RateLimit(max_concurrency=2, requests_per_minute=6000, tokens_per_minute=6000)
+        )
+        in_flight = 0
+        max_in_flight = 0
+
+        async def call():
+            nonlocal in_flight, max_in_flight
+            async with rate_limiter.acquire(tokens=10):
+                in_flight += 1
+                max_in_flight = max(max_in_flight, in_flight)
+                await asyncio.sleep(0.01)
+                in_flight -= 1
+
+        await asyncio.gather(*[call() for _ in range(6)])
+
+        assert max_in_flight == 2
+
+    async def test_get_rate_limiter_is_shared(self):
+        assert get_rate_limiter("gemini-2.5-flash", "key") is get_rate_limiter("gemini-2.5-flash", "key")
+        assert get_rate_limiter("gemini-2.5-flash", "key") is not get_rate_limiter("gemini-2.5-flash", "other")
+        assert get_rate_limiter("gemini-2.5-flash", "key").rate_limit.max_concurrency == 10
+
+    async def test_get_llm_rate_limiter(self):
+        llm = ChatGoogleGenerativeAI(model="gemini-2.5-pro", google_api_key="key", temperature=0.2)
+
+        rate_limiter = get_llm_rate_limiter(llm)
+
+        assert rate_limiter is get_rate_limiter("gemini-2.5-pro", "key")
+        assert rate_limiter.rate_limit.max_concurrency == 5
+
+    def test_model_rate_limits_from_env(self, monkeypatch):
+        monkeypatch.setenv(
+            "MODEL_RATE_LIMITS",
+            '{"gemini-2.5-pro": {"requests_per_minute": 300}, "gemini-3-pro": {"max_concurrency": 4}}',
+        )
+        try:
+            importlib.reload(config)
+            assert config.MODEL_RATE_LIMITS["gemini-2.5-pro"] == {
+                "max_concurrency": 5,
+                "requests_per_minute": 300,
+                "tokens_per_minute": 2_000_000,
+            }
+            assert config.MODEL_RATE_LIMITS["gemini-3-pro"] == {
+                "max_concurrency": 4,
+                "requests_per_minute": 1000,
+                "tokens_per_minute": 1_000_000,
+            }
+        finally:
+            monkeypatch.delenv("MODEL_RATE_LIMITS")
+            importlib.reload(config)
+
+
+class TestAdaptiveConcurrencyLimiter:
+    async def test_increase_on_success(self):
+        limiter = AdaptiveConcurrencyLimiter(
+            "test", AdaptiveConcurrencyLimit(initial_limit=2, min_limit=1, max_limit=4)
+        )
+
+        for _ in range(10):
+            async with limiter.acquire():
+                pass
+
+        assert limiter.limit > 2
+        assert limiter.limit <= 4
+
+    async def test_decrease_on_server_error(self):
+        limiter = AdaptiveConcurrencyLimiter(
+            "test", AdaptiveConcurrencyLimit(initial_limit=8, min_limit=1, max_limit=16)
+        )
+
+        with pytest.raises(ServerError):
+            async with limiter.acquire():
+                raise ServerError(503, {"error": {"message": "overloaded"}})
+
+        assert limiter.limit == 4
+        assert REGISTRY.get_sample_value("bookcast_adaptive_concurrency_limit", {"name": "test"}) == 4.0
+
+    async def test_decrease_once_for_concurrent_failures(self):
+        limiter = AdaptiveConcurrencyLimiter(
+            "test", AdaptiveConcurrencyLimit(initial_limit=8, min_limit=1, max_limit=16)
+        )
+
+        async def call():
+            async with limiter.acquire():
+                await asyncio.sleep(0.01)
+                raise RuntimeError("429 RESOURCE_EXHAUSTED")
+
+        await asyncio.gather(*[call() for _ in range(4)], return_exceptions=True)
+
+        assert limiter.limit == 4
+
+    async def test_ignores_other_errors(self):
+        limiter = AdaptiveConcurrencyLimiter(
+            "test", AdaptiveConcurrencyLimit(initial_limit=8, min_limit=1, max_limit=16)
+        )
+
+        with pytest.raises(ValueError):
+            async with limiter.acquire():
+                raise ValueError("invalid")
+
+        assert limiter.limit == 8
+
+    async def test_limits_in_flight(self):
+        limiter = AdaptiveConcurrencyLimiter(
+            "test", AdaptiveConcurrencyLimit(initial_limit=2, min_limit=1, max_limit=2)
+        )
+        max_in_flight = 0
+
+        async def call():
+            nonlocal max_in_flight
+            async with limiter.acquire():
+                max_in_flight = max(max_in_flight, limiter.in_flight)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*[call() for _ in range(6)])
+
+        assert max_in_flight == 2
@@ -1,16 +1,27 @@
+import asyncio
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
 from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_openai import ChatOpenAI
+from langgraph.func import entrypoint
+from prometheus_client import REGISTRY
 
 from bookcast.config import GEMINI_API_KEY
 from bookcast.entities import Chapter, ChapterStatus, Project, ProjectStatus
-from bookcast.services import script_writing_service
+from bookcast.services import llm_cache, script_writing_service
 from bookcast.services.script_writing_service import (
+    EvaluateResult,
+    PodcastTopic,
+    PromptCacheStats,
     ScriptWritingService,
+    ScriptWritingWorkflowInput,
     evaluate_script,
     script_writing_workflow,
     search_topics,
+    split_sections,
     write_script,
 )
 
@@ -36,6 +47,208 @@ def test_script_writing_workflow():
     assert script_writing_workflow
 
 
+class TestSplitSections:
+    def test_short_text_is_one_section(self):
+        assert split_sections("短い章です。", 100) == ["短い章です。"]
+
+    def test_splits_at_headings(self):
+        text = "\n".join(
+            [
+                "1.1 はじめに",
+                "あ" * 60,
+                "1.2 背景",
+                "い" * 30,
+                "い" * 30,
+                "1.3 手法",
+                "う" * 60,
+            ]
+        )
+
+        sections = split_sections(text, 100)
+
+        assert [section.splitlines()[0] for section in sections] == ["1.1 はじめに", "1.2 背景", "1.3 手法"]
+        assert "\n".join(sections) == text
+
+    def test_splits_long_text_without_headings(self):
+        text = "\n".join(f"{i}行目の本文です。" + "え" * 20 for i in range(20))
+
+        sections = split_sections(text, 100)
+
+        assert len(sections) > 1
+        assert all(len(section) <= 100 for section in sections)
+        assert "\n".join(sections) == text
+
+
+class TestScriptWritingWorkflow:
+    def inputs(self, source_text: str) -> ScriptWritingWorkflowInput:
+        gemini = ChatGoogleGenerativeAI(model="gemini-2.5-flash", google_api_key="dummy")
+        return ScriptWritingWorkflowInput(
+            source_text=source_text,
+            gemini_light_model=gemini,
+            gemini_heavy_model=gemini,
+            openai_model=ChatOpenAI(model="gpt-5", api_key="dummy"),
+        )
+
+    @patch.object(script_writing_service, "SCRIPT_SECTION_CHARS", 100)
+    @patch.object(script_writing_service, "write_transition", new_callable=AsyncMock)
+    @patch.object(script_writing_service, "evaluate_script", new_callable=AsyncMock)
+    @patch.object(script_writing_service, "write_script", new_callable=AsyncMock)
+    @patch.object(script_writing_service, "search_topics", new_callable=AsyncMock)
+    async def test_writes_long_chapter_in_sections(
+        self, mock_search_topics, mock_write_script, mock_evaluate_script, mock_write_transition
+    ):
+        mock_search_topics.return_value = [PodcastTopic(title="トピック", description="概要")]
+        mock_write_script.side_effect = lambda llm, source_text, topics, feedback, **kwargs: (
+            f"Speaker1: {source_text.splitlines()[0]}"
+        )
+        mock_evaluate_script.return_value = EvaluateResult(is_valid=True, feedback_message="")
+        mock_write_transition.return_value = "Speaker2: 次に進みましょう。\n"
+        text = "\n".join(["1.1 はじめに", "あ" * 80, "1.2 背景", "い" * 80])
+
+        script = await script_writing_workflow.ainvoke(self.inputs(text))
+
+        assert script == "Speaker1: 1.1 はじめに\nSpeaker2: 次に進みましょう。\nSpeaker1: 1.2 背景"
+        assert mock_write_script.await_count == 2
+        # 各節の台本は、その節の文章だけから作られる
+        assert sorted(call.args[1] for call in mock_write_script.await_args_list) == [
+            "1.1 はじめに\n" + "あ" * 80,
+            "1.2 背景\n" + "い" * 80,
+        ]
+        mock_write_transition.assert_awaited_once()
+
+    @patch.object(script_writing_service, "SCRIPT_SECTION_CHARS", 100)
+    @patch.object(script_writing_service, "write_transition", new_callable=AsyncMock)
+    @patch.object(script_writing_service, "evaluate_script", new_callable=AsyncMock)
+    @patch.object(script_writing_service, "write_script", new_callable=AsyncMock)
+    @patch.object(script_writing_service, "search_topics", new_callable=AsyncMock)
+    async def test_emits_segments_in_script_order(
+        self, mock_search_topics, mock_write_script, mock_evaluate_script, mock_write_transition
+    ):
+        first_section_written = asyncio.Event()
+
+        async def write_script(llm, source_text, topics, feedback, **kwargs):
+            # 後ろの節が先に書き上がっても、台本の順に渡される
+            if source_text.startswith("1.1"):
+                await first_section_written.wait()
+            return f"Speaker1: {source_text.splitlines()[0]}\n"
+
+        segments = []
+
+        async def on_segment(segment: str) -> None:
+            segments.append(segment)
+
+        mock_search_topics.return_value = []
+        mock_write_script.side_effect = write_script
+        mock_evaluate_script.return_value = EvaluateResult(is_valid=True, feedback_message="")
+        mock_write_transition.return_value = "Speaker2: 次に進みましょう。"
+        text = "\n".join(["1.1 はじめに", "あ" * 80, "1.2 背景", "い" * 80])
+        inputs = self.inputs(text)
+        inputs.on_segment = on_segment
+
+        workflow = asyncio.ensure_future(script_writing_workflow.ainvoke(inputs))
+        await asyncio.sleep(0.1)
+        assert segments == []
+        first_section_written.set()
+        script = await workflow
+
+        assert segments == ["Speaker1: 1.1 はじめに", "Speaker2: 次に進みましょう。", "Speaker1: 1.2 背景"]
+        assert script == "\n".join(segments)
+
+    @patch.object(script_writing_service, "write_transition", new_callable=AsyncMock)
+    @patch.object(script_writing_service, "evaluate_script", new_callable=AsyncMock)
+    @patch.object(script_writing_service, "write_script", new_callable=AsyncMock)
+    @patch.object(script_writing_service, "search_topics", new_callable=AsyncMock)
+    async def test_retries_short_chapter_with_feedback(
+        self, mock_search_topics, mock_write_script, mock_evaluate_script, mock_write_transition
+    ):
+        mock_search_topics.return_value = []
+        mock_write_script.side_effect = ["Speaker1: 1回目", "Speaker1: 2回目"]
+        mock_evaluate_script.side_effect = [
+            EvaluateResult(is_valid=False, feedback_message="短すぎます"),
+            EvaluateResult(is_valid=True, feedback_message=""),
+        ]
+
+        script = await script_writing_workflow.ainvoke(self.inputs("短い章です。"))
+
+        assert script == "Speaker1: 2回目"
+        assert mock_write_script.await_args_list[1].args[3] == ["短すぎます"]
+        mock_write_transition.assert_not_called()
+
+
+class TestPromptCaching:
+    @patch.object(llm_cache, "LLM_CACHE_ENABLED", False)
+    @patch.object(ChatOpenAI, "_agenerate", new_callable=AsyncMock)
+    async def test_retries_share_prompt_prefix(self, mock_agenerate):
+        mock_agenerate.side_effect = [
+            ChatResult(
+                generations=[
+                    ChatGeneration(
+                        message=AIMessage(
+                            content=f"Speaker1: {i}回目",
+                            usage_metadata={
+                                "input_tokens": 2000,
+                                "output_tokens": 100,
+                                "total_tokens": 2100,
+                                "input_token_details": {"cache_read": cached_tokens},
+                            },
+                        )
+                    )
+                ]
+            )
+            for i, cached_tokens in enumerate([0, 1792], start=1)
+        ]
+        topics = [PodcastTopic(title="トピック", description="概要{説明}")]
+
+        @entrypoint()
+        async def workflow(feedback_messages: list[str]) -> str:
+            llm = ChatOpenAI(model="gpt-5", api_key="dummy")
+            return await write_script(llm, "本文です。", topics, feedback_messages)
+
+        stats = PromptCacheStats()
+        token = script_writing_service._prompt_cache_stats.set(stats)
+        try:
+            assert await workflow.ainvoke([]) == "Speaker1: 1回目"
+            assert await workflow.ainvoke(["短すぎます"]) == "Speaker1: 2回目"
+        finally:
+            script_writing_service._prompt_cache_stats.reset(token)
+
+        first, second = [call.args[0] for call in mock_agenerate.await_args_list]
+        # 再試行でも先頭のメッセージは変わらず、フィードバックは最後に付く
+        assert second[: len(first)] == first
+        assert first[1].content == "トピック: \n- タイトル: トピック, 概要: 概要{説明}\n\n文章: 本文です。"
+        assert second[-1].content == "フィードバック: 短すぎます"
+        cache_keys = {call.kwargs["prompt_cache_key"] for call in mock_agenerate.await_args_list}
+        assert len(cache_keys) == 1
+        assert (stats.input_tokens, stats.cached_tokens) == (4000, 1792)
+
+
+class TestScriptWritingService:
+    async def test_exports_chapter_prompt_cache_hit_ratio(self):
+        async def generate(chapter: Chapter) -> str:
+            for cached_tokens in (0, 1500):
+                usage = {"input_tokens": 2000, "output_tokens": 10, "total_tokens": 2010}
+                usage["input_token_details"] = {"cache_read": cached_tokens}
+                script_writing_service.record_prompt_usage("write", AIMessage(content="", usage_metadata=usage))
+            return "Speaker1: 台本"
+
+        chapter = Chapter(
+            id=1,
+            project_id=1,
+            chapter_number=1,
+            start_page=1,
+            end_page=3,
+            status=ChapterStatus.start_writing_script,
+            extracted_text="本文",
+        )
+        before_sum = REGISTRY.get_sample_value("bookcast_script_prompt_cache_hit_ratio_sum") or 0.0
+
+        with patch.object(ScriptWritingService, "_generate_with_prefetch", side_effect=generate):
+            await ScriptWritingService(MagicMock())._generate_script(chapter)
+
+        assert REGISTRY.get_sample_value("bookcast_script_prompt_cache_hit_ratio_sum") - before_sum == 0.375
+        assert chapter.status == ChapterStatus.writing_script_completed
+
+
 class TestScriptWritingServiceIntegration:
     @pytest.mark.integration
     @patch.object(script_writing_service, "script_writing_workflow")
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from bookcast.services.single_flight import SingleFlight
+
+
+class TestSingleFlight:
+    async def test_concurrent_calls_share_result(self):
+        single_flight = SingleFlight()
+        calls = 0
+
+        async def function():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "result"
+
+        results = await asyncio.gather(*[single_flight.run("key", function) for _ in range(3)])
+
+        assert results == ["result"] * 3
+        assert calls == 1
+        assert single_flight.calls == {}
+
+    async def test_concurrent_calls_share_error(self):
+        single_flight = SingleFlight()
+
+        async def function():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("boom")
+
+        results = await asyncio.gather(*[single_flight.run("key", function) for _ in range(2)], return_exceptions=True)
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert single_flight.calls == {}
+
+    async def test_follower_runs_again_when_leader_is_cancelled(self):
+        single_flight = SingleFlight()
+        calls = 0
+
+        async def function():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return calls
+
+        leader = asyncio.create_task(single_flight.run("key", function))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(single_flight.run("key", function))
+        await asyncio.sleep(0)
+        assert "key" in single_flight
+
+        leader.cancel()
+
+        # 先に実行していた呼び出しのキャンセルは、待っている呼び出しに伝わらない
+        assert await follower == 2
+        assert leader.cancelled()
+        assert single_flight.calls == {}
+
+    async def test_cancelled_follower_does_not_cancel_leader(self):
+        single_flight = SingleFlight()
+
+        async def function():
+            await asyncio.sleep(0.01)
+            return "result"
+
+        leader = asyncio.create_task(single_flight.run("key", function))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(single_flight.run("key", function))
+        await asyncio.sleep(0)
+
+        follower.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await follower
+        assert await leader == "result"
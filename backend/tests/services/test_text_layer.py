@@ -0,0 +1,44 @@
+import subprocess
+from unittest.mock import patch
+
+from bookcast.services import text_layer
+from bookcast.services.text_layer import clean_text_layer, extract_text_layers, score_text_layer
+
+BORN_DIGITAL_PAGE = """第1章 はじめに
+本書では、PDFからポッドキャストを生成する方法について説明します。
+まずは全体の流れを確認しましょう。
+"""
+
+
+class TestTextLayer:
+    @patch.object(text_layer.subprocess, "run")
+    def test_extract_text_layers(self, mock_run):
+        mock_run.return_value = subprocess.CompletedProcess(
+            args=[], returncode=0, stdout="1ページ目\n12\n\f2ページ目\n\f".encode()
+        )
+
+        result = extract_text_layers("book.pdf", 3, 4)
+
+        assert result == ["1ページ目", "2ページ目"]
+        assert mock_run.call_args.args[0][:5] == ["pdftotext", "-f", "3", "-l", "4"]
+
+    def test_clean_text_layer_removes_page_numbers(self):
+        assert clean_text_layer("本文\n  - 12 -  \n続き\n") == "本文\n続き"
+
+    def test_score_born_digital_page(self):
+        assert score_text_layer(BORN_DIGITAL_PAGE) == 1.0
+
+    def test_score_scanned_page(self):
+        assert score_text_layer("") == 0.0
+        assert score_text_layer("図1") == 0.0
+
+    def test_score_garbled_page(self):
+        # UTF-8のバイト列をLatin-1として読んでしまった文字列
+        garbled = "これは文字化けしたテキストです。ページ全体がこのような状態になります。".encode().decode("latin-1")
+
+        assert score_text_layer(garbled) < 0.5
+
+    def test_score_vertical_text_extracted_per_character(self):
+        vertical = "\n".join("縦書きの本文は一文字ずつ改行されてしまうことがあります")
+
+        assert score_text_layer(vertical) == 0.0
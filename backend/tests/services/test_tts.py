@@ -1,10 +1,13 @@
-from unittest.mock import MagicMock, patch
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
 from bookcast.entities import Chapter, ChapterStatus, Project, ProjectStatus
 from bookcast.services import text_to_speach_service
-from bookcast.services.text_to_speach_service import TextToSpeechService
+from bookcast.services import tts_cache as tts_cache_module
+from bookcast.services.file_service import TTSCacheFileService
+from bookcast.services.text_to_speach_service import AudioPrefetcher, ScriptChunker, TextToSpeechService
 
 
 class TestTextToSpeechServiceIntegration:
@@ -61,3 +64,106 @@ class TestTextToSpeechServiceIntegration:
             assert isinstance(chunks, list)
             assert len(chunks) == 1
             assert chunks[0] == short_script
+
+
+class TestScriptChunker:
+    def test_incremental_chunks_match_whole_script(self):
+        lines = [f"Speaker{i % 2 + 1}: " + "あ" * (i * 7 % 30) for i in range(40)]
+        segments = ["\n".join(lines[:13]), "\n".join(lines[13:14]), "\n".join(lines[14:])]
+
+        whole = ScriptChunker(chunk_size=100, length_function=len)
+        expected = whole.add("\n".join(lines)) + whole.flush()
+        incremental = ScriptChunker(chunk_size=100, length_function=len)
+        chunks = []
+        for segment in segments:
+            chunks.extend(incremental.add(segment))
+        chunks.extend(incremental.flush())
+
+        assert chunks == expected
+        assert len(chunks) > 1
+        assert all(len(chunk) <= 100 for chunk in chunks)
+        assert "\n".join(chunks) == "\n".join(lines)
+
+    def test_returns_chunks_only_when_full(self):
+        chunker = ScriptChunker(chunk_size=20, length_function=len)
+
+        assert chunker.add("Speaker1: はい\n\n") == []
+        assert chunker.add("Speaker2: そうですね。そうですね。") == ["Speaker1: はい"]
+        assert chunker.flush() == ["Speaker2: そうですね。そうですね。"]
+        assert chunker.flush() == []
+
+
+@pytest.fixture
+def tts_cache(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with (
+        patch.object(text_to_speach_service, "get_genai_client"),
+        patch.object(tts_cache_module, "TTS_CACHE_ENABLED", True),
+        patch.object(TTSCacheFileService, "_download_from_gcs_if_exists", return_value=False),
+        patch.object(TTSCacheFileService, "upload_gcs_from_file") as mock_upload,
+    ):
+        yield mock_upload
+
+
+class TestAudioPrefetcher:
+    @patch.object(TextToSpeechService, "_invoke", new_callable=AsyncMock)
+    async def test_prefetched_chunks_are_reused_by_tts(self, mock_invoke, tts_cache):
+        mock_invoke.side_effect = lambda script: script.encode()
+        tts_service = TextToSpeechService(MagicMock())
+        chunker = ScriptChunker(chunk_size=20, length_function=len)
+
+        async with tts_service.prefetch() as prefetcher:
+            prefetcher.chunker = chunker
+            await prefetcher.add_segment("Speaker1: 最初の話題です。")
+            # 上限に達したチャンクは、台本の作成が終わる前に合成を始める
+            await prefetcher.add_segment("Speaker2: 次の話題です。")
+            assert len(prefetcher.tasks) == 1
+
+        # 台本の作成は合成が終わるのを待たない
+        assert not all(task.done() for task in prefetcher.tasks)
+        await asyncio.gather(*prefetcher.tasks)
+        assert mock_invoke.await_count == 2
+        assert tts_cache.call_count == 2
+
+        for script in ["Speaker1: 最初の話題です。", "Speaker2: 次の話題です。"]:
+            assert await tts_service.synthesize(script) == script.encode()
+        assert mock_invoke.await_count == 2
+
+    @patch.object(TextToSpeechService, "_invoke", new_callable=AsyncMock)
+    async def test_failed_chunks_do_not_fail_script_writing(self, mock_invoke, tts_cache):
+        mock_invoke.side_effect = ValueError("boom")
+        prefetcher = AudioPrefetcher(TextToSpeechService(MagicMock()), ScriptChunker(length_function=len))
+
+        await prefetcher.add_segment("Speaker1: こんにちは。")
+        prefetcher.finish()
+        await asyncio.gather(*prefetcher.tasks, return_exceptions=True)
+
+        tts_cache.assert_not_called()
+
+    @patch.object(TextToSpeechService, "_invoke", new_callable=AsyncMock)
+    async def test_tts_waits_for_chunk_being_prefetched(self, mock_invoke, tts_cache):
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def invoke(script):
+            started.set()
+            await release.wait()
+            return script.encode()
+
+        mock_invoke.side_effect = invoke
+        tts_service = TextToSpeechService(MagicMock())
+
+        async with tts_service.prefetch() as prefetcher:
+            prefetcher.chunker = ScriptChunker(length_function=len)
+            await prefetcher.add_segment("Speaker1: こんにちは。")
+        await started.wait()
+
+        # 先読みの合成中にTTSの段階が同じチャンクを要求しても、合成は1回だけ行う
+        synthesized = asyncio.create_task(tts_service.synthesize("Speaker1: こんにちは。"))
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await synthesized == "Speaker1: こんにちは。".encode()
+        assert mock_invoke.await_count == 1
+        await asyncio.sleep(0)
+        assert text_to_speach_service._prefetch_tasks == set()
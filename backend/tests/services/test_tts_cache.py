@@ -0,0 +1,54 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from bookcast.services import tts_cache
+from bookcast.services.file_service import TTSCacheFileService
+from bookcast.services.tts_cache import build_tts_cache_key, cached_tts_audio
+
+VOICES = {"Speaker1": "Alnilam", "Speaker2": "Autonoe"}
+
+
+@pytest.fixture
+def gcs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with (
+        patch.object(TTSCacheFileService, "_download_from_gcs_if_exists", return_value=False) as mock_download,
+        patch.object(TTSCacheFileService, "upload_gcs_from_file") as mock_upload,
+    ):
+        yield mock_download, mock_upload
+
+
+class TestTTSCache:
+    def test_cache_key_depends_on_script_model_and_voices(self):
+        key = build_tts_cache_key("Speaker1: こんにちは。", "gemini-2.5-flash-preview-tts", VOICES)
+
+        assert key == build_tts_cache_key("Speaker1: こんにちは。", "gemini-2.5-flash-preview-tts", VOICES)
+        assert key != build_tts_cache_key("Speaker1: こんばんは。", "gemini-2.5-flash-preview-tts", VOICES)
+        assert key != build_tts_cache_key("Speaker1: こんにちは。", "gemini-2.5-pro-preview-tts", VOICES)
+        assert key != build_tts_cache_key(
+            "Speaker1: こんにちは。", "gemini-2.5-flash-preview-tts", {**VOICES, "Speaker2": "Puck"}
+        )
+
+    async def test_reuses_synthesized_audio(self, gcs):
+        _, mock_upload = gcs
+        synthesize = AsyncMock(return_value=b"audio")
+
+        with patch.object(tts_cache, "TTS_CACHE_ENABLED", True):
+            assert await cached_tts_audio("key", synthesize) == b"audio"
+            assert await cached_tts_audio("key", synthesize) == b"audio"
+
+        synthesize.assert_awaited_once()
+        mock_upload.assert_called_once()
+
+    async def test_disabled_cache_does_not_touch_gcs(self, gcs):
+        mock_download, mock_upload = gcs
+        synthesize = AsyncMock(return_value=b"audio")
+
+        with patch.object(tts_cache, "TTS_CACHE_ENABLED", False):
+            assert await cached_tts_audio("key", synthesize) == b"audio"
+            assert await cached_tts_audio("key", synthesize) == b"audio"
+
+        assert synthesize.await_count == 2
+        mock_download.assert_not_called()
+        mock_upload.assert_not_called()
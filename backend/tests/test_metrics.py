@@ -0,0 +1,26 @@
+import pytest
+from prometheus_client import CollectorRegistry, generate_latest
+
+from bookcast.metrics import Histogram, observe_duration
+
+
+class TestMetrics:
+    def test_observe_duration_records_success(self):
+        registry = CollectorRegistry()
+        histogram = Histogram("test_call_seconds", "Test call.", ("call", "outcome"), registry=registry)
+
+        with observe_duration(histogram, call="ocr"):
+            pass
+
+        assert registry.get_sample_value("test_call_seconds_count", {"call": "ocr", "outcome": "success"}) == 1
+
+    def test_observe_duration_records_error(self):
+        registry = CollectorRegistry()
+        histogram = Histogram("test_call_seconds", "Test call.", ("call", "outcome"), registry=registry)
+
+        with pytest.raises(RuntimeError):
+            with observe_duration(histogram, call="tts"):
+                raise RuntimeError("boom")
+
+        assert registry.get_sample_value("test_call_seconds_count", {"call": "tts", "outcome": "error"}) == 1
+        assert 'test_call_seconds_count{call="tts",outcome="error"} 1.0' in generate_latest(registry).decode()
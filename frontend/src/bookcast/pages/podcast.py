@@ -48,32 +48,30 @@ def add_download_button(project: ProjectViewModel, downloaded_path: str | None):
         st.download_button("Download Audio", data=file.read(), file_name="audio.zip")
 
 
+STATUS_MESSAGES = {
+    "not_started": "プロジェクトはまだ開始されていません。",
+    "start_ocr": "OCR処理を開始しています。",
+    "ocr_completed": "OCR処理が完了しました。次はスクリプトの作成です。",
+    "start_writing_script": "スクリプトの作成を開始しています。",
+    "writing_script_completed": "スクリプトの作成が完了しました。次はTTS処理です。",
+    "start_tts": "TTS処理を開始しています。",
+    "tts_completed": "TTS処理が完了しました。次は音声の作成です。",
+    "start_creating_audio": "音声の作成を開始してください。",
+    "creating_audio_completed": "音声の作成が完了しました！",
+    "failed": "処理に失敗しました。",
+}
+
+
 def main():
     st.write("podcast page")
     project = st.session_state.get(ss.project)
     downloaded_path = st.session_state.get(ss.downloaed_path)
 
     status = fetch_project_status(project)
-    match status:
-        case "not_started":
-            st.write("プロジェクトはまだ開始されていません。")
-        case "start_ocr":
-            st.write("OCR処理を開始しています。")
-        case "ocr_completed":
-            st.write("OCR処理が完了しました。次はスクリプトの作成です。")
-        case "start_writing_script":
-            st.write("スクリプトの作成を開始しています。")
-        case "writing_script_completed":
-            st.write("スクリプトの作成が完了しました。次はTTS処理です。")
-        case "start_tts":
-            st.write("TTS処理を開始しています。")
-        case "tts_completed":
-            st.write("TTS処理が完了しました。次は音声の作成です。")
-        case "start_creating_audio":
-            st.write("音声の作成を開始してください。")
-        case "creating_audio_completed":
-            st.write("音声の作成が完了しました！")
-            add_download_button(project, downloaded_path)
+    if status in STATUS_MESSAGES:
+        st.write(STATUS_MESSAGES[status])
+    if status == "creating_audio_completed":
+        add_download_button(project, downloaded_path)
 
 
 # Execute main function directly for Streamlit
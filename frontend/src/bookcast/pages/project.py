@@ -7,7 +7,6 @@ from streamlit.logger import get_logger
 
 from bookcast.config import BACKEND_URL
 from bookcast.page import Rooter
-from bookcast.services.image_file import ImageFileService
 from bookcast.session_state import SessionState as ss
 from bookcast.view_models import ProjectViewModel
 
@@ -47,8 +46,7 @@ def process_uploaded_file(uploaded_file: io.BytesIO):
         with st.spinner("Redirecting to project page..."):
             result = resp.json()
             st.session_state[ss.project] = ProjectViewModel(project_id=result["id"])
-            image_dir = ImageFileService.convert_pdf_to_images(uploaded_file)
-            st.session_state[ss.image_dir] = image_dir
+            st.session_state.pop(ss.page_count, None)
 
             time.sleep(3)
             st.switch_page(Rooter.chapter_page())
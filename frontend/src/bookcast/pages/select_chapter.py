@@ -1,6 +1,3 @@
-import os
-import pathlib
-
 import requests
 import streamlit as st
 from streamlit.logger import get_logger
@@ -13,7 +10,6 @@ from bookcast.view_models import ChapterStartPageNumber, ProjectViewModel
 logger = get_logger(__name__)
 
 # Constants
-DEFAULT_IMAGE_DIR = pathlib.Path("downloads/2506.04209/images")  # Default directory for debugging
 DEFAULT_PROJECT_ID = 10  # Default project ID for debugging
 BUTTON_STYLE = {"use_container_width": True}
 
@@ -33,15 +29,31 @@ def render_chapter_info(chapter_info, is_compact: bool = False):
             st.info(f"終了ページ: {end_text}")
 
 
+def fetch_page_count(project_id: int) -> int:
+    url = f"{BACKEND_URL}/api/v1/projects/{project_id}/pages"
+    resp = requests.get(url)
+    resp.raise_for_status()
+    return resp.json()["page_count"]
+
+
+@st.cache_data(max_entries=50)
+def fetch_page_image(project_id: int, page_number: int) -> bytes:
+    # ページ画像はバックエンドで一度だけ描画され、以降は保存済みの画像が返される
+    url = f"{BACKEND_URL}/api/v1/projects/{project_id}/pages/{page_number}"
+    resp = requests.get(url)
+    resp.raise_for_status()
+    return resp.content
+
+
 def get_current_state():
-    image_dir = st.session_state.get(ss.image_dir) or DEFAULT_IMAGE_DIR
-    image_files = [image_dir / filename for filename in sorted(os.listdir(image_dir))]
+    project = st.session_state.get(ss.project, ProjectViewModel(project_id=DEFAULT_PROJECT_ID))
+    if ss.page_count not in st.session_state:
+        st.session_state[ss.page_count] = fetch_page_count(project.project_id)
 
     return {
-        "image_files": image_files,
-        "max_pages": len(image_files),
+        "max_pages": st.session_state[ss.page_count],
         "current_page": st.session_state.get(ss.current_page, 1),
-        "project": st.session_state.get(ss.project, ProjectViewModel(project_id=DEFAULT_PROJECT_ID)),
+        "project": project,
         "selected_chapter": st.session_state.get(ss.selected_chapter_number),
     }
 
@@ -98,9 +110,9 @@ def manage_chapters(action: str, project: ProjectViewModel, **kwargs):
     return project
 
 
-def render_page_viewer(image_files: list[str], current_page: int, max_pages: int):
+def render_page_viewer(project: ProjectViewModel, current_page: int, max_pages: int):
     with st.container(width=400, height=600):
-        st.image(image_files[current_page - 1])
+        st.image(fetch_page_image(project.project_id, current_page))
 
     with st.container():
         left, center, right = st.columns(3)
@@ -152,10 +164,13 @@ def render_toc_extraction_section(project: ProjectViewModel, max_pages: int):
     st.session_state[ss.page_offset] = offset
 
     # Extract button
-    if st.button("目次を抽出する", type="primary", **BUTTON_STYLE):
+    # 抽出結果はバックエンドに保存されるので、再抽出しない限り2回目以降はすぐに返る
+    extract = st.button("目次を抽出する", type="primary", **BUTTON_STYLE)
+    refresh = st.button("目次を再抽出する", **BUTTON_STYLE)
+    if extract or refresh:
         with st.spinner("目次を抽出中..."):
             try:
-                results = extract_table_of_contents(project.project_id)
+                results = extract_table_of_contents(project.project_id, refresh=refresh)
                 st.session_state[ss.extracted_table_of_contents] = results
                 st.rerun()
             except Exception as e:
@@ -169,7 +184,7 @@ def render_toc_extraction_section(project: ProjectViewModel, max_pages: int):
         st.subheader("抽出結果")
 
         for item in extracted_toc:
-            adjusted_page = item.page_number + offset
+            adjusted_page = item.page_number if item.is_physical_page else item.page_number + offset
             if st.button(f"• {item.title} (P{adjusted_page})", key=f"toc_{item.page_number}_{item.title}"):
                 jump_to_page(adjusted_page, max_pages)
                 st.rerun()
@@ -259,13 +274,13 @@ def save_chapters(project: ProjectViewModel):
     return resp
 
 
-def extract_table_of_contents(project_id: int) -> list[ChapterStartPageNumber]:
+def extract_table_of_contents(project_id: int, refresh: bool = False) -> list[ChapterStartPageNumber]:
     logger.info(f"Extracting table of contents for project: {project_id}")
 
     url = f"{BACKEND_URL}/api/v1/projects/{project_id}/extract_table_of_contents"
 
     try:
-        resp = requests.post(url)
+        resp = requests.post(url, params={"refresh": "true"} if refresh else None)
         resp.raise_for_status()
 
         raw_data = resp.json()
@@ -299,7 +314,7 @@ def main():
         render_toc_extraction_section(state["project"], state["max_pages"])
 
     with col2:
-        render_page_viewer(state["image_files"], state["current_page"], state["max_pages"])
+        render_page_viewer(state["project"], state["current_page"], state["max_pages"])
 
     with col3:
         render_chapter_controls(state["selected_chapter"], state["current_page"], state["project"])
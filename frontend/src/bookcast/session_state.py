@@ -3,7 +3,7 @@ from enum import StrEnum
 
 class SessionState(StrEnum):
     project = "_project"
-    image_dir = "_image_dir"
+    page_count = "_page_count"
 
     # Chapter Page
     current_page = "_current_page"
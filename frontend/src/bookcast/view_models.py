@@ -4,6 +4,8 @@ from pydantic import BaseModel
 class ChapterStartPageNumber(BaseModel):
     page_number: int
     title: str
+    # PDFのしおりから取得した場合はPDFのページ番号なので、オフセットを足さない
+    is_physical_page: bool = False
 
 
 class ChapterViewModel(BaseModel):